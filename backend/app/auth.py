@@ -7,12 +7,11 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from . import models, schemas
 from .core.database import get_db
+from .core.tracing import tracer
 import os
 from dotenv import load_dotenv
 import logging
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 加载环境变量
@@ -49,6 +48,11 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> models.User:
+    return get_user_from_token(token, db)
+
+@tracer.traced("auth")
+def get_user_from_token(token: str, db: Session) -> models.User:
+    """校验 JWT 并返回对应用户，失败时抛出 401（WebSocket 等无法使用依赖注入的场景也复用此函数）"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
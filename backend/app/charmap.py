@@ -0,0 +1,58 @@
+"""
+字形折叠表：每两个字为一对（原字, 规范字），供 normalize 构建 str.translate 映射。
+只收录一对一的映射；一繁对多简或简体中仍独立使用的字（如 乾、著、徵）不折叠。
+"""
+
+FOLD_PAIRS = (
+    # 繁体 -> 简体（常用字）
+    "愛爱罷罢筆笔邊边別别賓宾餅饼補补參参蠶蚕殘残慚惭慘惨燦灿蒼苍艙舱倉仓廁厕層层嘗尝償偿長长場场腸肠廠厂暢畅車车塵尘陳陈襯衬"
+    "稱称誠诚懲惩遲迟馳驰齒齿熾炽衝冲蟲虫寵宠疇畴籌筹綢绸醜丑處处觸触傳传創创純纯詞词辭辞從从叢丛聰聪蔥葱錯错達达帶带貸贷單单"
+    "擔担膽胆誕诞彈弹當当擋挡黨党蕩荡島岛禱祷導导燈灯鄧邓敵敌滌涤遞递締缔點点電电墊垫彫雕釣钓調调疊叠頂顶訂订東东動动凍冻棟栋"
+    "鬥斗讀读獨独賭赌斷断鍛锻隊队對对噸吨頓顿奪夺墮堕鵝鹅額额兒儿爾尔餌饵發发髮发罰罚閥阀範范飯饭訪访紡纺飛飞廢废費费紛纷墳坟"
+    "奮奋憤愤糞粪豐丰鋒锋風风瘋疯馮冯縫缝諷讽鳳凤膚肤輻辐撫抚輔辅賦赋復复複复負负婦妇縛缚該该蓋盖幹干趕赶岡冈剛刚鋼钢綱纲崗岗"
+    "擱搁閣阁個个鴿鸽給给鞏巩貢贡溝沟構构購购夠够顧顾颳刮關关觀观館馆慣惯貫贯廣广歸归龜龟閨闺軌轨櫃柜貴贵劊刽滾滚鍋锅國国過过"
+    "駭骇韓韩漢汉號号鶴鹤賀贺橫横轟轰鴻鸿紅红後后壺壶護护滬沪戶户嘩哗華华畫画劃划話话懷怀壞坏歡欢環环還还緩缓換换喚唤瘓痪煥焕"
+    "渙涣黃黄謊谎揮挥輝辉毀毁賄贿穢秽會会燴烩匯汇諱讳誨诲繪绘葷荤渾浑夥伙獲获貨货禍祸擊击機机積积飢饥跡迹譏讥雞鸡績绩緝缉極极"
+    "輯辑級级擠挤幾几薊蓟劑剂濟济計计記记際际繼继紀纪夾夹莢荚頰颊賈贾鉀钾價价駕驾殲歼監监堅坚箋笺間间艱艰緘缄繭茧檢检鹼碱揀拣"
+    "撿捡簡简儉俭減减薦荐檻槛鑒鉴踐践賤贱見见鍵键艦舰劍剑餞饯漸渐濺溅澗涧將将漿浆蔣蒋槳桨獎奖講讲醬酱膠胶澆浇驕骄嬌娇攪搅鉸铰"
+    "矯矫僥侥腳脚餃饺繳缴絞绞轎轿較较階阶節节潔洁結结誡诫屆届緊紧錦锦僅仅謹谨進进晉晋燼烬盡尽勁劲荊荆莖茎鯨鲸驚惊經经頸颈靜静"
+    "鏡镜徑径痙痉競竞淨净糾纠廄厩舊旧駒驹舉举據据鋸锯懼惧劇剧鵑鹃絹绢傑杰覺觉決决訣诀絕绝鈞钧軍军駿骏開开凱凯顆颗殼壳課课墾垦"
+    "懇恳摳抠庫库褲裤誇夸塊块儈侩寬宽礦矿曠旷況况虧亏巋岿窺窥饋馈潰溃擴扩闊阔蠟蜡臘腊萊莱來来賴赖藍蓝欄栏攔拦籃篮闌阑蘭兰瀾澜"
+    "讕谰攬揽覽览懶懒纜缆爛烂濫滥撈捞勞劳澇涝樂乐鐳镭壘垒類类淚泪籬篱離离裏里裡里鯉鲤禮礼麗丽厲厉勵励礫砾曆历歷历瀝沥隸隶倆俩"
+    "聯联蓮莲連连鐮镰憐怜漣涟簾帘斂敛臉脸鏈链戀恋煉炼練练糧粮涼凉兩两輛辆諒谅療疗遼辽鐐镣獵猎臨临鄰邻鱗鳞凜凛賃赁齡龄鈴铃靈灵"
+    "嶺岭領领餾馏劉刘龍龙聾聋嚨咙籠笼壟垄攏拢隴陇樓楼婁娄摟搂簍篓蘆芦盧卢顱颅廬庐爐炉擄掳鹵卤虜虏魯鲁賂赂祿禄錄录陸陆驢驴呂吕"
+    "鋁铝侶侣屢屡縷缕慮虑濾滤綠绿巒峦攣挛孿孪灤滦亂乱掄抡輪轮倫伦侖仑淪沦綸纶論论蘿萝羅罗邏逻鑼锣籮箩騾骡駱骆絡络媽妈瑪玛碼码"
+    "螞蚂馬马罵骂嗎吗買买麥麦賣卖邁迈脈脉瞞瞒饅馒蠻蛮滿满謾谩貓猫錨锚鉚铆貿贸麼么沒没鎂镁門门悶闷們们錳锰夢梦謎谜彌弥覓觅冪幂"
+    "綿绵緬缅廟庙滅灭憫悯閩闽鳴鸣銘铭謬谬謀谋畝亩鈉钠納纳難难撓挠腦脑惱恼鬧闹餒馁內内擬拟膩腻攆撵釀酿鳥鸟聶聂寧宁擰拧濘泞紐纽"
+    "膿脓濃浓農农瘧疟諾诺歐欧鷗鸥毆殴嘔呕漚沤盤盘龐庞賠赔噴喷鵬鹏騙骗飄飘頻频貧贫蘋苹憑凭評评潑泼頗颇撲扑鋪铺樸朴譜谱棲栖淒凄"
+    "臍脐齊齐騎骑豈岂啟启氣气棄弃訖讫牽牵鉛铅遷迁簽签謙谦錢钱鉗钳潛潜淺浅譴谴塹堑槍枪嗆呛牆墙薔蔷強强搶抢鍬锹橋桥喬乔僑侨翹翘"
+    "竅窍竊窃欽钦親亲寢寝輕轻氫氢傾倾頃顷請请慶庆瓊琼窮穷趨趋區区軀躯驅驱齲龋顴颧權权勸劝卻却鵲鹊確确讓让饒饶擾扰繞绕熱热韌韧"
+    "認认紉纫榮荣絨绒軟软銳锐閏闰潤润灑洒薩萨鰓鳃賽赛傘伞喪丧騷骚掃扫澀涩殺杀紗纱篩筛曬晒刪删閃闪陝陕贍赡繕缮傷伤賞赏燒烧紹绍"
+    "賒赊攝摄懾慑設设紳绅審审嬸婶腎肾滲渗聲声繩绳勝胜聖圣師师獅狮濕湿詩诗屍尸時时蝕蚀實实識识駛驶勢势適适釋释飾饰視视試试壽寿"
+    "獸兽樞枢輸输書书贖赎屬属術术樹树豎竖數数帥帅雙双誰谁稅税順顺說说碩硕爍烁絲丝飼饲聳耸慫怂頌颂訟讼誦诵擻擞蘇苏訴诉肅肃雖虽"
+    "綏绥歲岁孫孙損损筍笋縮缩瑣琐鎖锁獺獭撻挞擡抬攤摊貪贪癱瘫灘滩壇坛譚谭談谈歎叹湯汤燙烫濤涛縧绦騰腾謄誊銻锑題题體体屜屉條条"
+    "貼贴鐵铁廳厅聽听烴烃銅铜統统頭头圖图塗涂團团頹颓蛻蜕脫脱鴕鸵馱驮駝驼橢椭窪洼襪袜彎弯灣湾頑顽萬万網网韋韦違违圍围為为爲为"
+    "濰潍維维葦苇偉伟偽伪緯纬謂谓衛卫溫温聞闻紋纹穩稳問问甕瓮撾挝蝸蜗渦涡窩窝臥卧嗚呜鎢钨烏乌誣诬無无蕪芜吳吴塢坞霧雾務务誤误"
+    "錫锡犧牺襲袭習习銑铣戲戏細细蝦虾轄辖峽峡俠侠狹狭廈厦嚇吓鮮鲜纖纤鹹咸賢贤銜衔閒闲閑闲顯显險险現现獻献縣县餡馅羨羡憲宪線线"
+    "廂厢鑲镶鄉乡詳详響响項项蕭萧囂嚣銷销曉晓嘯啸協协挾挟攜携脅胁諧谐寫写瀉泻謝谢鋅锌釁衅興兴洶汹鏽锈繡绣虛虚噓嘘須须許许敘叙"
+    "緒绪續续軒轩懸悬選选癬癣絢绚學学勳勋詢询尋寻馴驯訓训訊讯遜逊壓压鴉鸦鴨鸭啞哑亞亚訝讶閹阉煙烟鹽盐嚴严顏颜閻阎豔艳艷艳厭厌"
+    "硯砚彥彦諺谚驗验鴦鸯楊杨揚扬瘍疡陽阳癢痒養养樣样瑤瑶搖摇堯尧遙遥窯窑謠谣藥药爺爷頁页業业葉叶醫医銥铱頤颐遺遗儀仪蟻蚁藝艺"
+    "億亿憶忆義义詣诣議议誼谊譯译異异繹绎蔭荫陰阴銀银飲饮隱隐櫻樱嬰婴鷹鹰應应纓缨瑩莹螢萤營营熒荧蠅蝇贏赢穎颖喲哟擁拥傭佣癰痈"
+    "踴踊詠咏湧涌優优憂忧郵邮鈾铀猶犹遊游誘诱輿舆魚鱼漁渔娛娱與与嶼屿語语籲吁禦御獄狱譽誉預预馭驭鴛鸳淵渊轅辕園园員员圓圆緣缘"
+    "遠远願愿約约躍跃鑰钥嶽岳粵粤悅悦閱阅雲云鄖郧勻匀隕陨運运蘊蕴醞酝暈晕韻韵雜杂災灾載载攢攒暫暂贊赞贓赃髒脏鑿凿棗枣竈灶責责"
+    "擇择則则澤泽賊贼贈赠紮扎劄札軋轧鍘铡閘闸詐诈齋斋債债氈毡盞盏斬斩輾辗嶄崭棧栈戰战綻绽張张漲涨帳帐賬账脹胀趙赵蟄蛰轍辙鍺锗"
+    "這这貞贞針针偵侦診诊鎮镇陣阵掙挣睜睁猙狰爭争幀帧鄭郑證证織织職职執执紙纸摯挚擲掷幟帜質质滯滞鍾钟鐘钟終终種种腫肿眾众衆众"
+    "謅诌軸轴皺皱晝昼驟骤豬猪諸诸誅诛燭烛矚瞩囑嘱貯贮鑄铸築筑註注駐驻專专磚砖轉转賺赚樁桩莊庄裝装妝妆壯壮狀状錐锥贅赘墜坠綴缀"
+    "諄谆準准濁浊茲兹資资漬渍蹤踪綜综總总縱纵鄒邹詛诅組组鑽钻產产"
+    # 诗词中常见的繁体字
+    "鷺鹭鸝鹂鶯莺鷓鹧鴣鸪蟬蝉鱸鲈蓴莼蒓莼薺荠綺绮闕阙闋阕颯飒颼飕飆飙颺飏巔巅顛颠巖岩崢峥嶸嵘瀟潇鬢鬓鬚须紈纨縞缟綃绡繫系係系"
+    "絃弦箏筝簫箫韁缰轡辔驛驿騁骋驊骅騮骝驪骊閶阊闔阖闈闱闥闼閬阆謫谪濱滨潯浔漵溆瀲潋灩滟澠渑嵐岚靄霭靂雳霽霁蘚藓薈荟藹蔼穠秾"
+    "穡穑稈秆糴籴糶粜璣玑璫珰瓏珑璽玺鈿钿釵钗鐲镯鏤镂鏗铿鏘锵錚铮鑾銮鞦秋韆千餚肴饌馔饑饥餘余饗飨嬋婵嫋袅裊袅螻蝼鷲鹫鵰雕鴟鸱"
+    "鵠鹄鸞鸾鳶鸢鶩鹜鷥鸶嫵妩釧钏縈萦紆纡絳绛緗缃縹缥緲缈縵缦繽缤纏缠盃杯觴觞罈坛滄沧涇泾灕漓贛赣讎雠"
+    # 异体字 -> 规范字
+    "牀床峯峰羣群牕窗窓窗窻窗綫线鷄鸡嘆叹眞真卽即旣既靑青淸清敎教囘回廻回迴回秌秋鴈雁躭耽琱雕凴凭菓果暱昵曏向嚮向甯宁塚冢迺乃"
+    "吿告氷冰兎兔竝并並并倂并喫吃噉啖啗啖脣唇鬪斗鬭斗汙污汚污峩峨嶋岛巗岩巌岩煖暖蹟迹箇个疎疏踈疏槩概槪概棊棋碁棋椀碗盌碗甎砖"
+    "墻墙徧遍姪侄妬妒婣姻襃褒鉢钵缽钵鞵鞋覩睹睠眷蹔暂鼈鳖鱉鳖隣邻綑捆麤粗麁粗糉粽餻糕烖灾鍼针朶朵躱躲拕拖挐拿拏拿擕携掽碰翫玩"
+    "暎映呌叫咊和龢和嚐尝譁哗讚赞託托臺台檯台颱台隻只衹只秖只纔才於于鬱郁麪面麵面麫面穀谷鬆松捨舍傢家儘尽淩凌慾欲籤签餵喂剋克"
+    "尅克彊强錶表鬍胡鍊炼鑪炉黴霉"
+)
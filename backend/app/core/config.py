@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 from dotenv import load_dotenv
 
@@ -27,6 +27,60 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "诗词接龙游戏"
     LLM_API_KEY: Optional[str] = None # 保留原有的，以防万一需要切换
     DEEPSEEK_API_KEY: Optional[str] = None
+    # 大模型后端：deepseek（官方接口）或 stub（本地桩服务，见 app/llm/stub_server.py）
+    LLM_PROVIDER: str = "deepseek"
+    LLM_STUB_URL: str = "http://127.0.0.1:8100/v1/chat/completions"
+    # 相同尾字的并发AI请求合并后，跟随请求最多等待的秒数
+    LLM_COALESCE_MAX_WAIT: float = 30.0
+    # 智能接龙出题后，预先请求AI回复的候选尾字数量（0 表示关闭预取）、结果有效期（秒）及后台线程数（即预取同时占用的上游名额上限）
+    LLM_PREFETCH_CANDIDATES: int = 3
+    LLM_PREFETCH_TTL: float = 120.0
+    LLM_PREFETCH_WORKERS: int = 2
+    # 预取的优先级低于玩家提交：上游并发名额中至少要为交互请求留出这么多个空闲，否则跳过预取
+    LLM_PREFETCH_RESERVED_SLOTS: int = 4
+    # DeepSeek 上游保护：单次请求超时、重试退避基数（秒）、最大并发、排队等待上限、
+    # 每秒请求数及突发上限、熔断阈值与恢复时间，以及是否在超过近期 p95 耗时后发出对冲请求
+    LLM_REQUEST_TIMEOUT: float = 15.0
+    LLM_RETRY_BACKOFF: float = 0.5
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_QUEUE_TIMEOUT: float = 5.0
+    LLM_RATE_LIMIT: float = 10.0
+    LLM_RATE_BURST: int = 20
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_TIMEOUT: float = 30.0
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_DELAY: float = 1.0
+    # 单次请求的提示词 token 预算，超出时丢弃最早的纠正轮次（系统提示词前缀与最近一轮纠正始终保留）。
+    # 默认值约为接龙提示词前缀加一轮纠正，重试时的请求规模与只带最近一轮纠正时相当
+    LLM_PROMPT_TOKEN_BUDGET: int = 320
+    # 诗词/赛季等只读接口的响应缓存；配置 HTTP_CACHE_REDIS_URL 时改用 Redis 在多实例间共享
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_MAX_ENTRIES: int = 1024
+    HTTP_CACHE_REDIS_URL: Optional[str] = None
+    # 请求链路追踪：导出到 JSON Lines 文件（file）或日志（console），采样率作用于每个请求
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0
+    # 日志：级别、格式（json 或 text）、热路径 logger 的采样比例（只作用于 WARNING 以下级别）
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_SAMPLE_RATES: Dict[str, float] = {"app.llm_service": 0.1}
+    # 诗句索引检查诗词表是否有进程外写入（爬虫、SQL 导入、其他 worker）的间隔秒数：比较行数、最大 id 与最大更新时间，有变化时重建
+    LINE_INDEX_CHECK_INTERVAL: float = 60.0
+    # 诗句模糊匹配的最大编辑距离（0 表示关闭）：普通接龙差这么多字以内给部分分，智能接龙据此提示"您是不是想说"
+    LINE_FUZZY_MAX_DISTANCE: int = 1
+    # 是否构建全库模糊索引（智能接龙的"您是不是想说"提示需要）。索引较大（40 万句约 260MB），
+    # 开启后在启动时及诗句索引重建后于后台线程构建，不在请求中构建；普通接龙的部分分只比较标准答案，不需要索引
+    LINE_FUZZY_INDEX_ENABLED: bool = False
+    # 智能接龙本地出句的难度（按诗句接龙图中尾字的出度加权）：easy 偏向好接的诗句，hard 偏向难接但不是死路的诗句，normal 在非死路中均匀选取
+    AI_CHAIN_DIFFICULTY: str = "normal"
+    # 智能接龙开场句至少还能接龙的轮数（按诗句接龙图估算）
+    CHAIN_OPENER_MIN_DEPTH: int = 3
+    # 随机出题的难度档数：诗词按预计算的难度分等分为这么多档，difficulty=1 为最易的一档
+    POETRY_DIFFICULTY_LEVELS: int = 3
+    # 是否输出 SQLAlchemy 执行的每条 SQL（调试用）
+    DB_ECHO: bool = False
     
     # MySQL 配置
     MYSQL_HOST: str = "localhost"
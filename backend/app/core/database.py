@@ -1,26 +1,28 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 import logging
 from .config import settings
 from ..models.base import Base
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 构建数据库URL
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}?charset=utf8mb4"
+# 构建数据库URL（配置 DATABASE_URL 时优先使用，如压测用的 sqlite:///loadtest.db）
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL or f"mysql+pymysql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}?charset=utf8mb4"
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # SQLite 连接需跨线程使用（线程池中的同步接口），写锁冲突时等待而不是立即报错
+    engine_options = {"connect_args": {"check_same_thread": False, "timeout": 30}}
+else:
+    engine_options = {"pool_pre_ping": True, "pool_recycle": 3600, "max_overflow": 5, "pool_size": 5}
 
 # 创建数据库引擎
 try:
-    logger.info(f"Using database URL: {SQLALCHEMY_DATABASE_URL}")
+    logger.info("Using database: %s", make_url(SQLALCHEMY_DATABASE_URL).render_as_string(hide_password=True))
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=3600,
-        max_overflow=5,
-        pool_size=5,
-        echo=True
+        echo=settings.DB_ECHO,
+        **engine_options
     )
     logger.info("Successfully created database engine")
 except Exception as e:
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from .config import settings
+
+try:
+    import redis
+except ImportError:  # 共享缓存为可选依赖
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+class LRUBackend:
+    """进程内有界 LRU 缓存，条目带过期时间"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # key -> (过期时间, 缓存的响应)
+        self._entries: OrderedDict = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, name: str):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisBackend:
+    """多进程/多实例共享的 Redis 缓存，失效计数也存放在 Redis 中"""
+
+    def __init__(self, url: str, prefix: str = "http_cache:"):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(self._prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        self._client.set(self._prefix + key, json.dumps(value, ensure_ascii=False), px=int(ttl * 1000))
+
+    def counter(self, name: str) -> int:
+        return int(self._client.get(self._prefix + "gen:" + name) or 0)
+
+    def incr(self, name: str):
+        self._client.incr(self._prefix + "gen:" + name)
+
+    def __len__(self) -> int:
+        return 0
+
+class ResponseCache:
+    """
+    GET 响应缓存。每个条目属于一个标签（如 "poetry"、"seasons"），
+    缓存键中带有标签的代数，invalidate(tag) 使代数加一，旧条目随即不可达并由 LRU/TTL 淘汰。
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0, "invalidations": 0}
+
+    def _incr(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def key(self, tag: str, path: str, query_string: bytes) -> str:
+        return f"{tag}:{self.backend.counter(tag)}:{path}?{query_string.decode('latin-1')}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.backend.get(key)
+        self._incr("hits" if entry else "misses")
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: float):
+        self.backend.set(key, entry, ttl)
+        self._incr("stores")
+
+    def record_not_modified(self):
+        self._incr("not_modified")
+
+    def invalidate(self, *tags: str):
+        """数据写入后调用，使相关标签下的缓存全部失效"""
+        for tag in tags:
+            self.backend.incr(tag)
+            self._incr("invalidations")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["entries"] = len(self.backend)
+        return stats
+
+class CacheRule:
+    """路由缓存规则：path 正则、失效标签、服务端缓存秒数、客户端 max-age 秒数"""
+
+    def __init__(self, pattern: str, tag: str, ttl: float, max_age: int = 0):
+        self.pattern = re.compile(pattern)
+        self.tag = tag
+        self.ttl = ttl
+        self.max_age = max_age
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    weak = lambda tag: tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+    return weak(etag) in {weak(tag) for tag in if_none_match.split(",")}
+
+def _not_modified(request_headers: Dict[bytes, bytes], entry: Dict[str, Any]) -> bool:
+    if_none_match = request_headers.get(b"if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match.decode("latin-1"), entry["etag"])
+    if_modified_since = request_headers.get(b"if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(if_modified_since.decode("latin-1")) >= parsedate_to_datetime(entry["last_modified"])
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class HTTPCacheMiddleware:
+    """
+    为匹配规则的 GET 请求提供响应缓存：
+    命中时不再进入路由（不查库），并支持 ETag / Last-Modified 条件请求返回 304；
+    未命中时缓冲路由的 200 响应，计算 ETag 后写入缓存。
+    """
+
+    def __init__(self, app, cache: ResponseCache, rules: Sequence[CacheRule]):
+        self.app = app
+        self.cache = cache
+        self.rules = list(rules)
+
+    def _match(self, path: str) -> Optional[CacheRule]:
+        for rule in self.rules:
+            if rule.pattern.match(path):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        rule = self._match(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        key = self.cache.key(rule.tag, scope["path"], scope["query_string"])
+        entry = self.cache.get(key)
+        if entry is not None:
+            if _not_modified(request_headers, entry):
+                self.cache.record_not_modified()
+                await self._send(send, 304, entry, rule, b"", "HIT")
+            else:
+                await self._send(send, entry["status"], entry, rule, entry["body"].encode("utf-8"), "HIT")
+            return
+
+        start_message: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        if start_message.get("status") != 200:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        entry = {
+            "status": 200,
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in start_message.get("headers", [])
+                        if k.lower() not in (b"content-length", b"etag", b"last-modified", b"cache-control")],
+            "body": body.decode("utf-8"),
+            "etag": f'"{hashlib.md5(body).hexdigest()}"',
+            "last_modified": formatdate(usegmt=True),
+        }
+        self.cache.set(key, entry, rule.ttl)
+        if _not_modified(request_headers, entry):
+            await self._send(send, 304, entry, rule, b"", "MISS")
+        else:
+            await self._send(send, 200, entry, rule, body, "MISS")
+
+    async def _send(self, send, status: int, entry: Dict[str, Any], rule: CacheRule, body: bytes, cache_status: str):
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in entry["headers"]] if status != 304 else []
+        headers += [
+            (b"etag", entry["etag"].encode("latin-1")),
+            (b"last-modified", entry["last_modified"].encode("latin-1")),
+            (b"cache-control", f"public, max-age={rule.max_age}".encode("latin-1")),
+            (b"x-cache", cache_status.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+def create_backend():
+    if settings.HTTP_CACHE_REDIS_URL:
+        if redis is None:
+            logger.warning("HTTP_CACHE_REDIS_URL is set but the redis package is not installed; using in-memory cache.")
+        else:
+            return RedisBackend(settings.HTTP_CACHE_REDIS_URL)
+    return LRUBackend(settings.HTTP_CACHE_MAX_ENTRIES)
+
+# 全局响应缓存，诗词与赛季的写操作通过 response_cache.invalidate() 使其失效
+response_cache = ResponseCache(create_backend())
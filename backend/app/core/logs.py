@@ -0,0 +1,120 @@
+"""
+应用日志：JSON 结构化输出、队列异步写出、按 logger 采样。
+
+- 请求线程只把 LogRecord 放入内存队列，格式化与写 stderr 都在后台 QueueListener 线程完成，
+  日志 I/O 不会阻塞事件循环；因此日志参数应为不可变值（字符串、数字），而不是之后会被修改的对象
+- 始终使用 logger.info("... %s", value) 的惰性格式化，级别未开启或被采样丢弃时不产生任何字符串
+- 热路径 logger 可按比例采样（LOG_SAMPLE_RATES），WARNING 及以上级别从不采样
+- 每条 JSON 日志带上当前链路的 trace_id / span_id，可与 traces.jsonl 对照
+"""
+import atexit
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+from .config import settings
+from .tracing import tracer
+
+# LogRecord 的内置属性，其余属性视为 extra={...} 传入的结构化字段
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id", "span_id"}
+
+class JSONFormatter(logging.Formatter):
+    """每条日志一行 JSON：时间、级别、logger、消息、链路 ID、异常堆栈及 extra 字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+class SamplingFilter(logging.Filter):
+    """
+    按 logger 名称前缀采样低于 WARNING 的日志，rates 如 {"app.llm_service": 0.1}。
+    匹配最长的前缀；未配置的 logger 全部保留。
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            matches = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + ".")]
+            rate = self._cache[name] = self.rates[max(matches, key=len)] if matches else 1.0
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class ContextQueueHandler(QueueHandler):
+    """
+    只在调用线程记录链路 ID 并入队，不做格式化（标准 QueueHandler.prepare 会先格式化消息，
+    那是为跨进程队列准备的；进程内队列直接传递 LogRecord 即可）。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        span = tracer.current_span()
+        record.trace_id = span.trace_id
+        record.span_id = getattr(span, "span_id", None)
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                      sample_rates: Optional[Dict[str, float]] = None, stream=None) -> QueueListener:
+    """
+    替换根 logger 的处理器为 队列 -> 后台线程 -> stream（默认 stderr），重复调用时先停止旧的后台线程。
+    参数默认取自 LOG_LEVEL / LOG_FORMAT（json 或 text）/ LOG_SAMPLE_RATES。
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if (log_format or settings.LOG_FORMAT) == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    handler = ContextQueueHandler(queue.SimpleQueue())
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES if sample_rates is None else sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+@atexit.register
+def _flush_logs():
+    # 退出前写完队列中剩余的日志
+    if _listener is not None:
+        _listener.stop()
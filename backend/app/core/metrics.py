@@ -0,0 +1,226 @@
+"""
+轻量的 Prometheus 指标：计数器、直方图与回调指标，以文本格式在 /metrics 导出。
+每次记录只做一次字典查找、一次 bisect 和一次加锁自增，开销在微秒以内。
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache, wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [各桶计数..., +Inf 桶计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts)) for labels, counts in self._values.items()]
+        for labels, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """抓取时才调用 callback 取值的指标（如连接池占用、缓存命中数），callback 返回 [(标签值元组, 数值)]"""
+
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.collect())
+            except Exception:
+                # 单个回调指标出错不影响其余指标导出
+                continue
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")))
+LLM_REQUEST_SECONDS = registry.register(Histogram(
+    "llm_request_duration_seconds", "Upstream LLM call latency", ("kind", "outcome")))
+LLM_ATTEMPTS = registry.register(Counter(
+    "llm_attempts_total", "Upstream LLM call attempts by attempt number", ("kind", "attempt")))
+LLM_OUTCOMES = registry.register(Counter(
+    "llm_outcomes_total", "Upstream LLM call outcomes", ("kind", "outcome")))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "db_query_duration_seconds", "Database statement latency by statement fingerprint", ("statement",)))
+FUNCTION_SECONDS = registry.register(Histogram(
+    "app_function_duration_seconds", "Latency of selected application functions", ("function",)))
+
+def register_callback(name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                      callback: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+    return registry.register(CallbackMetric(name, documentation, metric_type, labelnames, callback))
+
+def timed(function_name: str):
+    """记录被装饰（同步）函数的耗时到 app_function_duration_seconds"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                FUNCTION_SECONDS.observe(time.perf_counter() - started_at, function_name)
+        return wrapper
+    return decorator
+
+# ---- 数据库语句耗时 ----
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|\?|:\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def statement_fingerprint(statement: str) -> str:
+    """语句指纹：去掉字面量与绑定参数、合并空白，截断到 160 字符"""
+    fingerprint = _WHITESPACE_RE.sub(" ", _LITERAL_RE.sub("?", statement)).strip()
+    return _IN_LIST_RE.sub("(?)", fingerprint)[:160]
+
+def instrument_engine(engine: Engine):
+    """为引擎注册语句计时，并导出连接池占用"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started_at")
+        if started:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started.pop(), statement_fingerprint(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        started = context.connection.info.get("query_started_at") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def pool_usage():
+        pool = engine.pool
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            getter = getattr(pool, name, None)
+            if callable(getter):
+                yield (name,), getter()
+
+    register_callback("db_pool_connections", "Database connection pool usage", "gauge", ("state",), pool_usage)
+
+# ---- 请求耗时 ----
+
+class MetricsMiddleware:
+    """按路由模板（而非实际 path）记录请求耗时，避免 /poetry/1、/poetry/2 各占一个序列"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[Dict[Callable, str]] = None
+
+    def _route_path(self, scope) -> str:
+        routes = getattr(scope.get("app"), "routes", [])
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # 未进入路由（如被响应缓存直接返回）时按路由表匹配
+            for route in routes:
+                if route.matches(scope)[0] == Match.FULL:
+                    return route.path
+            return "unmatched"
+        if self._route_paths is None:
+            paths: Dict[Callable, str] = {}
+            for route in routes:
+                paths.setdefault(getattr(route, "endpoint", None), getattr(route, "path", ""))
+            self._route_paths = paths
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started_at, scope["method"], self._route_path(scope), str(status_code[0]))
@@ -0,0 +1,230 @@
+"""
+请求级链路追踪，结构参照 OpenTelemetry（trace_id / span_id / parent_id / attributes / status）。
+当前 span 保存在 contextvars 中，跨 await 和线程池（run_in_threadpool 会复制上下文）自动关联父子关系；
+结束的 span 由后台线程写到本地 JSON Lines 文件或控制台，无需外部采集器：
+
+    with tracer.span("battle.load", battle_id=battle_id) as span:
+        battle = get_battle(db, battle_id)
+        span.set_attribute("battle.status", battle.status)
+
+未启用（TRACING_ENABLED=False）或未被采样时，span() 返回空操作对象，不分配 span 也不导出。
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_time", "duration", "status", "_started_at")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.duration = 0.0
+        self.status = "ok"
+        self._started_at = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": round(self.start_time, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """未启用或未采样时使用，也作为未采样链路在上下文中的标记，使其子 span 同样不记录"""
+    trace_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = nullcontext(NOOP_SPAN)
+
+class FileSpanExporter:
+    """每个 span 一行 JSON，追加写入文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            self._file.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+class ConsoleSpanExporter:
+    """每个 span 输出一行日志，便于开发时直接查看"""
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+            logger.info("trace=%s span=%s parent=%s %s %.1fms %s %s", span.trace_id[:8], span.span_id[:8],
+                        (span.parent_id or "-")[:8], span.name, span.duration * 1000, span.status, attributes)
+
+class Tracer:
+    """
+    创建 span 并交给后台线程批量导出，导出（磁盘 I/O）不占用请求线程和事件循环。
+    sample_rate 作用于根 span，子 span 跟随根 span 的采样结果。
+    """
+
+    def __init__(self, exporter=None, sample_rate: float = 1.0, max_queue: int = 10000):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._current: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._dropped = 0
+        if exporter is not None:
+            threading.Thread(target=self._export_loop, name="span-exporter", daemon=True).start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self):
+        """当前上下文中的 span；不在任何链路中时返回空操作对象"""
+        return self._current.get() or NOOP_SPAN
+
+    def span(self, name: str, **attributes: Any):
+        """with tracer.span(...) as span；未启用时返回共享的空操作上下文"""
+        if self.exporter is None:
+            return _NOOP_CONTEXT
+        return self._span(name, attributes)
+
+    @contextmanager
+    def _span(self, name: str, attributes: Dict[str, Any]) -> Iterator[Any]:
+        parent = self._current.get()
+        if parent is NOOP_SPAN or (parent is None and random.random() >= self.sample_rate):
+            token = self._current.set(NOOP_SPAN)
+            try:
+                yield NOOP_SPAN
+            finally:
+                self._current.reset(token)
+            return
+
+        span = Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                    parent.span_id if parent else None, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error.type"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started_at
+            self._current.reset(token)
+            self._enqueue(span)
+
+    def traced(self, name: str):
+        """把整个（同步或异步）函数调用记为一个 span"""
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _enqueue(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # 导出跟不上时丢弃，不阻塞请求
+            self._dropped += 1
+
+    def _export_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception:
+                logger.exception("Failed to export %d spans.", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待已结束的 span 全部导出（用于测试和进程退出前）"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "queued": self._queue.qsize(), "dropped": self._dropped}
+
+class TracingMiddleware:
+    """为每个 HTTP 请求创建根 span，并在响应头 X-Trace-Id 中返回链路 ID，便于在导出文件中查找"""
+
+    def __init__(self, app, tracer: "Tracer"):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with self.tracer.span("http.request", **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if span.trace_id:
+                        message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", span.trace_id.encode("latin-1"))]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+def create_exporter():
+    if not settings.TRACING_ENABLED:
+        return None
+    if settings.TRACING_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    return FileSpanExporter(settings.TRACING_FILE)
+
+tracer = Tracer(create_exporter(), sample_rate=settings.TRACING_SAMPLE_RATE)
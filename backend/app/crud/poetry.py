@@ -1,16 +1,19 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from datetime import datetime
 from typing import Optional, List
 from .. import models, schemas
+from ..services.line_index import line_index
+from ..core.http_cache import response_cache
+from ..services.poetry_facets import poetry_facets
+from ..services.poetry_difficulty import difficulty_sampler
 
 def get_poetry(db: Session, poetry_id: int) -> Optional[models.Poetry]:
     return db.query(models.Poetry).filter(models.Poetry.id == poetry_id).first()
 
 def get_random_poetry(db: Session, difficulty: int = 1) -> Optional[models.Poetry]:
-    return db.query(models.Poetry).filter(
-        models.Poetry.difficulty <= difficulty
-    ).order_by(func.random()).first()
+    """从难度第 1..difficulty 档中随机取一首（分档见 services/poetry_difficulty.py）"""
+    poetry_id = difficulty_sampler.ensure_built(db).sample(difficulty, up_to=True)
+    return get_poetry(db, poetry_id) if poetry_id is not None else None
 
 def create_poetry(db: Session, poetry: schemas.PoetryCreate) -> models.Poetry:
     db_poetry = models.Poetry(
@@ -21,6 +24,10 @@ def create_poetry(db: Session, poetry: schemas.PoetryCreate) -> models.Poetry:
     db.add(db_poetry)
     db.commit()
     db.refresh(db_poetry)
+    poetry_facets.on_insert(db_poetry.dynasty, db_poetry.type)
+    line_index.invalidate()
+    difficulty_sampler.invalidate()
+    response_cache.invalidate("poetry")
     return db_poetry
 
 def update_poetry(db: Session, poetry_id: int, poetry: schemas.PoetryUpdate) -> Optional[models.Poetry]:
@@ -28,6 +35,7 @@ def update_poetry(db: Session, poetry_id: int, poetry: schemas.PoetryUpdate) ->
     if not db_poetry:
         return None
     
+    old_facet = (db_poetry.dynasty, db_poetry.type)
     update_data = poetry.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_poetry, field, value)
@@ -35,6 +43,10 @@ def update_poetry(db: Session, poetry_id: int, poetry: schemas.PoetryUpdate) ->
     db_poetry.updated_at = datetime.now()
     db.commit()
     db.refresh(db_poetry)
+    poetry_facets.on_update(old_facet, (db_poetry.dynasty, db_poetry.type))
+    line_index.invalidate()
+    difficulty_sampler.invalidate()
+    response_cache.invalidate("poetry")
     return db_poetry
 
 def delete_poetry(db: Session, poetry_id: int) -> bool:
@@ -42,8 +54,13 @@ def delete_poetry(db: Session, poetry_id: int) -> bool:
     if not db_poetry:
         return False
     
+    old_facet = (db_poetry.dynasty, db_poetry.type)
     db.delete(db_poetry)
     db.commit()
+    poetry_facets.on_delete(*old_facet)
+    line_index.invalidate()
+    difficulty_sampler.invalidate()
+    response_cache.invalidate("poetry")
     return True
 
 def get_poetry_by_content(db: Session, content: str) -> Optional[models.Poetry]:
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, List
 from .. import models, schemas
+from ..core.http_cache import response_cache
 
 def get_season(db: Session, season_id: int) -> Optional[models.Season]:
     return db.query(models.Season).filter(models.Season.id == season_id).first()
@@ -21,6 +22,7 @@ def create_season(db: Session, season: schemas.SeasonCreate) -> models.Season:
     db.add(db_season)
     db.commit()
     db.refresh(db_season)
+    response_cache.invalidate("seasons")
     return db_season
 
 def update_season(db: Session, season_id: int, season: schemas.SeasonUpdate) -> Optional[models.Season]:
@@ -35,6 +37,7 @@ def update_season(db: Session, season_id: int, season: schemas.SeasonUpdate) ->
     db_season.updated_at = datetime.now()
     db.commit()
     db.refresh(db_season)
+    response_cache.invalidate("seasons")
     return db_season
 
 def delete_season(db: Session, season_id: int) -> bool:
@@ -44,4 +47,5 @@ def delete_season(db: Session, season_id: int) -> bool:
     
     db.delete(db_season)
     db.commit()
+    response_cache.invalidate("seasons")
     return True 
\ No newline at end of file
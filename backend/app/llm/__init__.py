@@ -0,0 +1 @@
+# LLM 相关的基础组件（请求合并、限流熔断、提示词组装等），由 llm_service 统一调用
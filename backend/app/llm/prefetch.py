@@ -0,0 +1,90 @@
+import time
+import itertools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PrefetchBuffer:
+    """
+    AI回复的预取缓冲区。
+    出题后在后台线程中为最可能的用户接句预先请求AI的下一句，
+    结果按对战存放，键为用户诗句的尾字，超过 ttl 秒后失效。
+    """
+
+    def __init__(self, ttl: float, max_workers: int):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-prefetch")
+        self._lock = threading.Lock()
+        # battle_id -> {尾字: (AI诗句, 过期时间)}
+        self._buffers: Dict[int, Dict[str, Tuple[str, float]]] = {}
+        # battle_id -> (当前题目的代数, 出题时间)，新题目发出后旧的预取结果被丢弃；代数全局递增，不会与已清理的对战重复
+        self._generations: Dict[int, Tuple[int, float]] = {}
+        self._generation_counter = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+        self.scheduled = 0
+
+    def schedule(self, battle_id: int, candidate_lines: List[str], resolver: Callable[[str], Optional[str]]):
+        """为对战的新题目提交预取任务，resolver(候选用户诗句) 返回AI诗句或 None"""
+        with self._lock:
+            self._prune_expired()
+            generation = next(self._generation_counter)
+            self._generations[battle_id] = (generation, time.monotonic())
+            self._buffers[battle_id] = {}
+            self.scheduled += len(candidate_lines)
+        for line in candidate_lines:
+            self._executor.submit(self._run, battle_id, generation, line, resolver)
+
+    def _run(self, battle_id: int, generation: int, candidate_line: str, resolver: Callable[[str], Optional[str]]):
+        try:
+            ai_line = resolver(candidate_line)
+        except Exception as e:
+            logger.warning("Prefetch for battle %s (candidate '%s') failed: %s", battle_id, candidate_line, e)
+            return
+        if not ai_line:
+            return
+        with self._lock:
+            current = self._generations.get(battle_id)
+            if current is None or current[0] != generation:
+                return
+            self._buffers.setdefault(battle_id, {})[candidate_line[-1]] = (ai_line, time.monotonic() + self.ttl)
+
+    def take(self, battle_id: int, last_char: str) -> Optional[str]:
+        """取出与用户诗句尾字匹配的预取结果（取出后即移除）"""
+        with self._lock:
+            entry = self._buffers.get(battle_id, {}).pop(last_char, None)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def discard(self, battle_id: int):
+        """对战结束后丢弃其全部预取结果"""
+        with self._lock:
+            self._buffers.pop(battle_id, None)
+            self._generations.pop(battle_id, None)
+
+    def _prune_expired(self):
+        """清理过期结果；玩家未放弃就离开的对战不会被 discard，出题超过 ttl 且已无结果时一并清理"""
+        now = time.monotonic()
+        for battle_id in list(self._generations):
+            entries = self._buffers.get(battle_id, {})
+            for char in [c for c, (_, expires_at) in entries.items() if expires_at <= now]:
+                del entries[char]
+            if not entries and self._generations[battle_id][1] + self.ttl <= now:
+                self._buffers.pop(battle_id, None)
+                del self._generations[battle_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "buffered": sum(len(entries) for entries in self._buffers.values()),
+                "battles": len(self._generations),
+            }
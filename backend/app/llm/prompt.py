@@ -0,0 +1,93 @@
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数：
+    汉字及全角标点约 0.6 token/字，其余（ASCII 等）约 0.3 token/字符，每条消息另加 4 个 token 的固定开销。
+    """
+    if not text:
+        return 4
+    wide = sum(1 for ch in text if ch >= '⺀')
+    return int(wide * 0.6 + (len(text) - wide) * 0.3) + 4
+
+class Conversation:
+    """
+    重试对话的提示词组装。
+    系统提示词与首个用户提示词构成固定前缀，每次请求都原样放在最前面，
+    以便命中 DeepSeek 的前缀缓存（上下文硬盘缓存）；
+    之后的纠正轮次（AI回答 + 纠正提示）只保留在 token 预算内的最近几轮；最近一轮总是保留，
+    以免超出预算时重试请求丢掉纠正提示。
+    """
+
+    def __init__(self, system_prompt: str, prompt: str, token_budget: int):
+        self.token_budget = token_budget
+        self._prefix = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        self._prefix_tokens = sum(estimate_tokens(m["content"]) for m in self._prefix)
+        self._turns: List[Tuple[Dict[str, str], Dict[str, str], int]] = []
+
+    def add_turn(self, assistant_reply: str, correction: str):
+        """记录一轮AI回答及随后的纠正提示"""
+        assistant = {"role": "assistant", "content": assistant_reply}
+        user = {"role": "user", "content": correction}
+        self._turns.append((assistant, user, estimate_tokens(assistant_reply) + estimate_tokens(correction)))
+
+    def messages(self) -> List[Dict[str, str]]:
+        """固定前缀 + 预算内最近的纠正轮次"""
+        remaining = self.token_budget - self._prefix_tokens
+        kept = []
+        for assistant, user, tokens in reversed(self._turns):
+            if tokens > remaining and kept:
+                break
+            kept.append((assistant, user))
+            remaining -= tokens
+        messages = list(self._prefix)
+        for assistant, user in reversed(kept):
+            messages.extend((assistant, user))
+        return messages
+
+class PromptStats:
+    """记录最近的每次请求：提示词估算 token 数、实际 prompt/缓存命中 token 数及耗时"""
+
+    def __init__(self, maxlen: int = 500):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, attempt: int, messages: List[Dict[str, str]], latency: float, usage: Optional[Dict[str, Any]]):
+        usage = usage or {}
+        record = {
+            "kind": kind,
+            "attempt": attempt,
+            "messages": len(messages),
+            "estimated_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "cache_hit_tokens": usage.get("prompt_cache_hit_tokens"),
+            "latency": round(latency, 3),
+        }
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._records)[-limit:]
+
+    def summary(self) -> Dict[str, Any]:
+        """按请求类型和第几次尝试汇总平均估算 token 数与平均耗时"""
+        with self._lock:
+            records = list(self._records)
+        groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault((record["kind"], record["attempt"]), []).append(record)
+        return {
+            f"{kind}#{attempt}": {
+                "count": len(items),
+                "avg_estimated_tokens": round(sum(r["estimated_tokens"] for r in items) / len(items), 1),
+                "avg_latency": round(sum(r["latency"] for r in items) / len(items), 3),
+            }
+            for (kind, attempt), items in sorted(groups.items())
+        }
@@ -0,0 +1,119 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+
+class LLMProvider(ABC):
+    """
+    大模型后端接口：接收 OpenAI 风格的 chat/completions 请求体，返回解析后的 JSON。
+    llm_service 只依赖这个接口，具体后端由 settings.LLM_PROVIDER 决定；子类须实现 chat()。
+    """
+    name = "base"
+    api_url = ""
+
+    def is_configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    def chat(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        ...
+
+    def chat_stream(self, payload: Dict[str, Any], timeout: float, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        """
+        流式请求：每收到一段内容即回调 on_token，结束后返回与 chat() 相同结构的完整结果。
+        默认实现退化为一次性返回。
+        """
+        result = self.chat(payload, timeout)
+        content = (result.get("choices") or [{}])[0].get("message", {}).get("content")
+        if content:
+            on_token(content)
+        return result
+
+class OpenAICompatibleProvider(LLMProvider):
+    """通过 HTTP 调用任意 OpenAI 兼容的 chat/completions 接口"""
+
+    def __init__(self, api_url: str, api_key: Optional[str] = None):
+        self.api_url = api_url
+        self.api_key = api_key
+
+    def get_api_key(self) -> Optional[str]:
+        return self.api_key
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        api_key = self.get_api_key()
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        return headers
+
+    def chat(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        response = requests.post(self.api_url, headers=self.headers(), json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def chat_stream(self, payload: Dict[str, Any], timeout: float, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        parts = []
+        usage = None
+        with requests.post(self.api_url, headers=self.headers(), json=payload, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            # SSE：每个事件形如 "data: {...}"，以 "data: [DONE]" 结束
+            for raw_line in response.iter_lines(decode_unicode=False):
+                if not raw_line.startswith(b"data:"):
+                    continue
+                data = raw_line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices") or ():
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        parts.append(text)
+                        on_token(text)
+        return {"choices": [{"message": {"role": "assistant", "content": "".join(parts)}}], "usage": usage}
+
+class DeepSeekProvider(OpenAICompatibleProvider):
+    """DeepSeek 官方接口，需要配置 DEEPSEEK_API_KEY"""
+    name = "deepseek"
+
+    def __init__(self, api_url: str = DEEPSEEK_API_URL):
+        super().__init__(api_url)
+
+    def get_api_key(self) -> Optional[str]:
+        # 每次读取配置，便于运行时更换 Key
+        return settings.DEEPSEEK_API_KEY
+
+    def is_configured(self) -> bool:
+        if not self.get_api_key():
+            logger.warning("DEEPSEEK_API_KEY not found in settings. LLM features will be disabled.")
+            return False
+        return True
+
+class StubProvider(OpenAICompatibleProvider):
+    """本地桩服务（python -m app.llm.stub_server），用于离线压测，无需 API Key"""
+    name = "stub"
+
+    def __init__(self, api_url: Optional[str] = None):
+        super().__init__(api_url or settings.LLM_STUB_URL)
+
+PROVIDERS = {
+    DeepSeekProvider.name: DeepSeekProvider,
+    StubProvider.name: StubProvider,
+}
+
+def create_provider(name: Optional[str] = None) -> LLMProvider:
+    name = (name or settings.LLM_PROVIDER).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of: {', '.join(PROVIDERS)}")
+    provider = PROVIDERS[name]()
+    logger.info("Using LLM provider '%s' at %s", provider.name, provider.api_url)
+    return provider
@@ -0,0 +1,221 @@
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class UpstreamUnavailable(Exception):
+    """上游不可用（熔断打开、排队超时或被限流），调用方应直接走本地降级逻辑"""
+
+class TokenBucket:
+    """令牌桶限流：每秒补充 rate 个令牌，最多累积 burst 个"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_time = (1 - self._tokens) / self.rate
+            if now + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝；
+    之后进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开。
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def cancel(self):
+        """放行后并未实际调用上游（排队超时或被限流），归还半开状态的试探名额"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit breaker opened after %d consecutive failures.", self._failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+class UpstreamGuard:
+    """
+    上游调用保护：并发上限（信号量）+ 令牌桶限流 + 熔断器，
+    并可在请求耗时超过近期 p95 时发出一个对冲请求，取先返回的结果。
+    对冲请求同样占用并发名额，每个名额在对应请求结束后才归还，上游实际并发不超过 max_concurrency。
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float, rate: float, burst: int,
+                 breaker: CircuitBreaker, hedge_enabled: bool = False, hedge_min_delay: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst)
+        self._latencies = deque(maxlen=200)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-hedge") if hedge_enabled else None
+        self._lock = threading.Lock()
+        self._counters = {"queued": 0, "in_flight": 0, "rejected_open": 0, "rejected_busy": 0,
+                          "rejected_rate": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _incr(self, name: str, delta: int = 1):
+        with self._lock:
+            self._counters[name] += delta
+
+    def has_headroom(self, reserve: int) -> bool:
+        """再占用一个并发名额后是否仍至少空出 reserve 个（供预取等低优先级请求判断是否让路）"""
+        with self._lock:
+            busy = self._counters["in_flight"] + self._counters["queued"]
+        return busy + reserve < self.max_concurrency
+
+    def hedge_delay(self) -> float:
+        """对冲延迟：近期调用耗时的 p95（样本不足时使用 hedge_min_delay）"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 20:
+            return self.hedge_min_delay
+        return max(self.hedge_min_delay, samples[int(len(samples) * 0.95) - 1])
+
+    def call(self, fn: Callable[[], Any], hedge: bool = True) -> Any:
+        """hedge=False 时不发对冲请求（如流式请求，对冲会导致重复输出）"""
+        if not self.breaker.allow():
+            self._incr("rejected_open")
+            raise UpstreamUnavailable("circuit breaker is open")
+
+        self._incr("queued")
+        acquired = self._semaphore.acquire(timeout=self.queue_timeout)
+        self._incr("queued", -1)
+        if not acquired:
+            self._incr("rejected_busy")
+            self.breaker.cancel()
+            raise UpstreamUnavailable("too many concurrent upstream requests")
+
+        self._incr("in_flight")
+        # 对冲时名额交给执行请求的 future，在请求真正结束时归还（落败的请求可能在本方法返回后仍在运行）
+        slot_owned = True
+        try:
+            if not self._bucket.acquire(timeout=self.queue_timeout):
+                self._incr("rejected_rate")
+                self.breaker.cancel()
+                raise UpstreamUnavailable("upstream rate limit exceeded")
+            started_at = time.monotonic()
+            try:
+                if self.hedge_enabled and hedge:
+                    slot_owned = False
+                    result = self._call_hedged(fn)
+                else:
+                    result = fn()
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            with self._lock:
+                self._latencies.append(time.monotonic() - started_at)
+            self.breaker.record_success()
+            return result
+        finally:
+            if slot_owned:
+                self._release_slot()
+
+    def _release_slot(self, _future=None):
+        self._incr("in_flight", -1)
+        self._semaphore.release()
+
+    def _submit_holding_slot(self, fn: Callable[[], Any]):
+        """在线程池中执行已占用一个并发名额的请求，请求结束时归还名额"""
+        future = self._executor.submit(fn)
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def _call_hedged(self, fn: Callable[[], Any]) -> Any:
+        primary = self._submit_holding_slot(fn)
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        # 对冲请求另占一个并发名额（不排队）和一个令牌，任一不足时只等主请求
+        if done or not self._semaphore.acquire(blocking=False):
+            return primary.result()
+        if not self._bucket.try_acquire():
+            self._semaphore.release()
+            return primary.result()
+
+        self._incr("in_flight")
+        self._incr("hedges")
+        hedge = self._submit_holding_slot(fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._incr("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._counters)
+        metrics["breaker_state"] = self.breaker.state
+        metrics["hedge_delay"] = round(self.hedge_delay(), 3)
+        return metrics
@@ -0,0 +1,80 @@
+import threading
+import logging
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from ..core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """一次进行中的上游调用，跟随者在 done 上等待其结果"""
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    请求合并：相同 key 的并发调用只有第一个（leader）真正执行，
+    其余调用（follower）等待并共享其结果。
+    follower 最多等待 max_wait 秒，超时后自行调用。
+    """
+
+    def __init__(self, name: str, max_wait: float):
+        self.name = name
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # 每个 key 的统计: leaders(实际上游调用)、shared(共享结果的调用)、timeouts、max_fanout
+        self._stats: Dict[Hashable, Dict[str, int]] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            stats = self._stats.setdefault(key, {"leaders": 0, "shared": 0, "timeouts": 0, "max_fanout": 0})
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                stats["leaders"] += 1
+                is_leader = True
+            else:
+                call.followers += 1
+                stats["max_fanout"] = max(stats["max_fanout"], call.followers + 1)
+                is_leader = False
+        # 在当前链路上标明本次调用是实际请求上游还是共享了进行中的结果
+        tracer.current_span().set_attribute("singleflight.role", "leader" if is_leader else "follower")
+
+        if is_leader:
+            try:
+                call.result = fn(*args, **kwargs)
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        if not call.done.wait(self.max_wait):
+            with self._lock:
+                stats["timeouts"] += 1
+            logger.warning("[%s] Waited %.1fs for in-flight call on key %r, calling upstream directly.", self.name, self.max_wait, key)
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            stats["shared"] += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[Hashable, Dict[str, int]]:
+        """返回每个 key 的合并统计快照"""
+        with self._lock:
+            return {key: dict(value) for key, value in self._stats.items()}
@@ -0,0 +1,206 @@
+"""
+本地 OpenAI 兼容桩服务，代替 DeepSeek 用于离线压测智能接龙。
+回答直接取自诗词库的诗句索引，可注入延迟与错误率：
+
+    python -m app.llm.stub_server --port 8100 --latency 0.3 --jitter 0.1 --error-rate 0.02
+
+后端配置 LLM_PROVIDER=stub、LLM_STUB_URL=http://127.0.0.1:8100/v1/chat/completions 即可使用。
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ..core.logs import configure_logging
+from ..services.line_index import LineIndex
+from .prompt import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 接龙提示词中的上一句，见 llm_service.RESPONSE_PROMPT_TEMPLATE
+_PREVIOUS_LINE_RE = re.compile(r"上一句的诗句是 '([^']+)'")
+
+class StubResponder:
+    """
+    根据请求的消息生成回答：
+    - 接龙请求：从索引中选一句以上一句尾字（或同音字）开头的诗句
+    - 其他（开场）请求：随机选一句5-7字的诗句
+    同一组消息总是得到同一个回答；已在对话中回答过的诗句不会重复。
+    延迟与错误按 seed 初始化的随机数注入，便于复现压测结果。
+    """
+
+    def __init__(self, index: LineIndex, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.index = index
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def inject(self) -> bool:
+        """按配置休眠一段时间，返回本次请求是否应当失败"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        return failed
+
+    def answer(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        rng = random.Random(zlib.crc32(json.dumps(messages, ensure_ascii=False).encode("utf-8")) ^ self.seed)
+        used = {m["content"] for m in messages if m.get("role") == "assistant"}
+        first_prompt = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        match = _PREVIOUS_LINE_RE.search(first_prompt)
+        if match:
+            candidates = [line for line in self.index.lines_starting_with(match.group(1)[-1])
+                          if 4 <= len(line) <= 8 and line not in used]
+            candidates.sort()
+            return rng.choice(candidates) if candidates else None
+        for _ in range(20):
+            line = self.index.random_line(min_len=5, max_len=7, rng=rng)
+            if line and line not in used:
+                return line
+        return None
+
+    def completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        messages = payload.get("messages") or []
+        content = self.answer(messages) or "无"
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        return {
+            "id": f"stub-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": prompt_tokens + estimate_tokens(content),
+            },
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "lines": len(self.index)}
+
+def make_handler(responder: StubResponder):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, responder.stats())
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"message": "invalid JSON body"}})
+                return
+            if responder.inject():
+                self._send_json(503, {"error": {"message": "injected upstream error"}})
+                return
+            completion = responder.completion(payload)
+            if payload.get("stream"):
+                self._send_stream(completion)
+            else:
+                self._send_json(200, completion)
+
+        def _send_stream(self, completion: Dict[str, Any]):
+            """按 OpenAI 流式格式逐字返回，最后一个事件携带 usage"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            base = {k: completion[k] for k in ("id", "object", "created", "model")}
+            base["object"] = "chat.completion.chunk"
+            for char in completion["choices"][0]["message"]["content"]:
+                chunk = dict(base, choices=[{"index": 0, "delta": {"content": char}, "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=completion["usage"])
+            self.wfile.write(f"data: {json.dumps(final, ensure_ascii=False)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return StubHandler
+
+def create_server(responder: StubResponder, host: str = "127.0.0.1", port: int = 8100) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(responder))
+    server.daemon_threads = True
+    return server
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server backed by the poetry line index")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=None, help="defaults to the application's MySQL database")
+    args = parser.parse_args(argv)
+
+    configure_logging(log_format="text")
+    if args.database_url:
+        session_factory = sessionmaker(bind=create_engine(args.database_url))
+    else:
+        from ..core.database import SessionLocal as session_factory
+
+    index = LineIndex()
+    db = session_factory()
+    try:
+        index.ensure_built(db)
+    finally:
+        db.close()
+
+    responder = StubResponder(index, latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, seed=args.seed)
+    server = create_server(responder, args.host, args.port)
+    logger.info("Stub LLM server listening on http://%s:%d (%d lines)", args.host, args.port, len(index))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
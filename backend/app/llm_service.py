@@ -3,161 +3,189 @@ import requests # 保留导入
 # from openai import OpenAI # 移除导入
 from .core.config import settings
 import logging
-import re
+import random
+import time
 from sqlalchemy.orm import Session # 导入 Session
-from .models import Poetry # 导入 Poetry 模型
 # from .core.database import get_db # 暂时不需要在这里获取db，由调用方传入
-from typing import Optional, List, Set
-from pypinyin import lazy_pinyin, Style # <--- 新增导入
+from typing import Callable, Container, Optional, List
+from .llm.singleflight import SingleFlight
+from .llm.prefetch import PrefetchBuffer
+from .llm.resilience import UpstreamGuard, CircuitBreaker, UpstreamUnavailable
+from .llm.prompt import Conversation, PromptStats
+from .llm.providers import create_provider
+from .core.metrics import LLM_ATTEMPTS, LLM_OUTCOMES, LLM_REQUEST_SECONDS, timed
+from .core.tracing import tracer
+from .core.database import SessionLocal
+from .services.line_index import line_index
+from .normalize import canonical_line, char_readings, are_chars_homophones_or_same
+
+logger = logging.getLogger(__name__)
 
-print("########## llm_service.py TOP LEVEL CHECKPOINT 1 ##########") # 新增顶层打印
+MAX_RETRIES = 3
 
-# 确保logging配置在模块级别尽早生效，以捕获可能的早期问题
-logging.basicConfig(level=logging.INFO) # 可以考虑在这里也配置一下，尽管main.py也有
-logger = logging.getLogger(__name__) # logger获取应该在basicConfig之后
+# 开场诗句的系统提示词
+STARTING_LINE_SYSTEM_PROMPT = (
+    "你是一位顶级中国古诗词专家，你的任务是为诗词接龙游戏提供开场诗句。"
+    "你提供的诗句必须是【真实存在于中国古古诗词中的原句片段】。"
+    "诗句必须是【5到7个汉字】。"
+    "诗句必须是【广为流传、有据可查的经典名句】，这样更容易被大众所知晓。"
+    "你的回答必须【绝对纯净】，【只包含诗句本身的文字内容】，不包含任何诗名、作者、标点、序号、解释或任何其他字符。"
+    "严格遵守上述所有规则。"
+)
 
-print("########## llm_service.py TOP LEVEL CHECKPOINT 2 - Logger configured ##########") # 新增顶层打印
+# 接龙的系统提示词（支持同音字）。保持不变，以便命中 DeepSeek 的前缀缓存
+RESPONSE_SYSTEM_PROMPT = """你是一位才华横溢、富有创造力的中国古诗词接龙大师。你的核心目标是运用你的智慧，让诗词接龙游戏尽可能地持续下去，同时严格遵守接龙规则。
 
-MAX_RETRIES = 3
-DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions" # 和test.py一致
+【重要接龙规则】:
 
-def get_deepseek_api_key() -> Optional[str]: # 函数名和职责变更
-    """获取DeepSeek API Key"""
-    api_key = settings.DEEPSEEK_API_KEY
-    if not api_key:
-        logger.warning("DEEPSEEK_API_KEY not found in settings. LLM features will be disabled.")
-        return None
-    logger.info("DEEPSEEK_API_KEY found in settings.")
-    return api_key
+1. 你需要接一个大约【5到7个汉字】的纯粹的诗句。
 
-def _clean_line(line: str) -> str:
-    """
-    清理诗句，尝试移除常见干扰信息（如括号内容、常见前缀），然后提取汉字。
-    过短的清理后结果视为空。
-    """
-    if not line:
-        return ""
-
-    # 1. 尝试移除括号及其内容（包括中文和英文圆括号、方括号、花括号）
-    line = re.sub(r"[（\(\[].*?[）\)\]]", "", line) 
-    line = re.sub(r"\{.*?\}", "", line)
-
-    # 2. 移除一些常见的前缀和后缀短语
-    common_prefixes = [
-        "好的，请看：", "好的，这句是：", "请看：", "这句是：", 
-        "我接的是：", "我的是：", "答案是：", "当然，这是下一句：",
-        "没问题，请看下句：", "我来了：", "这是我的回答：", "诗句是："
-    ]
-    common_suffixes = [
-        "你看如何？", "怎么样？", "希望你喜欢。", "请指正。"
-    ]
-    for prefix in common_prefixes:
-        if re.match(f"^{re.escape(prefix)}", line, re.IGNORECASE):
-            line = line[len(prefix):].lstrip()
-    for suffix in common_suffixes:
-        if line.lower().endswith(suffix.lower()):
-            line = line[:-len(suffix)].rstrip()
-    
-    # 3. 移除中英文引号
-    line = line.replace('"', '').replace("'", "").replace("`", "")
-    line = line.replace('"', '').replace('"', '').replace('"', '').replace('"', '') # 添加中文引号移除
+2. 这个诗句必须是某一句较为常见或有据可查的【真实古诗词的片段】。
 
-    # 4. 提取所有汉字
-    cleaned = "".join(re.findall(r'[一-鿿]+', line))
-    
-    # 5. 长度校验
-    if len(cleaned) <= 1 and cleaned not in ['一', '二', '三', '四', '五', '六', '七', '八', '九', '十']:
-        return ""
-    return cleaned.strip()
+3. 你的诗句的【首字】必须与上一句诗词的【尾字】相同，或者是其【同音字】（声调不同也没关系，只要读音相似即可）。
+
+4. 你的回答必须【仅仅包含诗句本身】，【绝对不能】包含任何其他文字，比如诗名、作者、标点符号、括号、解释、序号或者任何形式的聊天内容！
+
+请沉思片刻，发挥你的文学积累，相信你能找到合适的诗句！"""
+
+RESPONSE_PROMPT_TEMPLATE = """上一句的诗句是 '{user_line_placeholder}'，它的最后一个字是 '{last_char_placeholder}'{pinyin_hint_placeholder}。
+
+现在，请你接一句以 '{last_char_placeholder}' 或其【同音字】开头的、符合所有系统指令中重要接龙规则的诗句："""
+
+# 并发的相同接龙请求只向DeepSeek发起一次（按用户诗句尾字合并）。
+# 开场诗句不合并：同时开局的对战若共用一个结果，会拿到同一句开场
+_response_flight = SingleFlight("ai_response", max_wait=settings.LLM_COALESCE_MAX_WAIT)
+
+# DeepSeek 上游保护：并发上限、限流、熔断与对冲请求
+upstream_guard = UpstreamGuard(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    rate=settings.LLM_RATE_LIMIT,
+    burst=settings.LLM_RATE_BURST,
+    breaker=CircuitBreaker(settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_TIMEOUT),
+    hedge_enabled=settings.LLM_HEDGE_ENABLED,
+    hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+)
+
+# 智能接龙的AI回复预取缓冲区
+prefetch_buffer = PrefetchBuffer(ttl=settings.LLM_PREFETCH_TTL, max_workers=settings.LLM_PREFETCH_WORKERS)
+
+def get_coalescing_stats() -> dict:
+    """请求合并的统计信息：每个key的上游调用次数、共享结果次数、超时次数和最大扇出"""
+    return {
+        "ai_response": _response_flight.stats(),
+    }
+
+# 大模型后端（DeepSeek 或本地桩服务）
+provider = create_provider()
+
+# 每次请求的提示词规模与耗时记录
+prompt_stats = PromptStats()
+
+def get_upstream_metrics() -> dict:
+    """上游保护的状态：熔断器状态、排队数、进行中请求数及各类拒绝/对冲计数"""
+    return upstream_guard.metrics()
+
+def get_prompt_stats() -> dict:
+    """最近各类请求（按第几次尝试）的平均提示词规模与耗时"""
+    return prompt_stats.summary()
 
+def _post_chat(payload: dict, kind: str, attempt: int, on_token: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    经上游保护调用大模型后端的 chat/completions，返回解析后的 JSON，并记录本次提示词规模与耗时。
+    传入 on_token 时以流式请求，每收到一段内容即回调。
+    """
+    LLM_ATTEMPTS.inc(kind, str(attempt))
+    started_at = time.monotonic()
+    outcome = "error"
+    with tracer.span("llm.chat", **{"llm.provider": provider.name, "llm.kind": kind, "llm.attempt": attempt,
+                                     "llm.stream": bool(on_token)}) as span:
+        try:
+            if on_token:
+                result = upstream_guard.call(lambda: provider.chat_stream(payload, settings.LLM_REQUEST_TIMEOUT, on_token), hedge=False)
+            else:
+                result = upstream_guard.call(lambda: provider.chat(payload, settings.LLM_REQUEST_TIMEOUT))
+            outcome = "success"
+        except UpstreamUnavailable:
+            outcome = "unavailable"
+            raise
+        except requests.exceptions.Timeout:
+            outcome = "timeout"
+            raise
+        finally:
+            latency = time.monotonic() - started_at
+            LLM_OUTCOMES.inc(kind, outcome)
+            LLM_REQUEST_SECONDS.observe(latency, kind, outcome)
+            span.set_attribute("llm.outcome", outcome)
+        record = prompt_stats.record(kind, attempt, payload["messages"], latency, result.get("usage"))
+        span.set_attributes(**{"llm.estimated_tokens": record["estimated_tokens"], "llm.prompt_tokens": record["prompt_tokens"],
+                               "llm.cache_hit_tokens": record["cache_hit_tokens"]})
+    logger.debug("LLM %s attempt %d: %s", kind, attempt, record)
+    return result
+
+def _backoff(attempt: int):
+    """网络错误后的指数退避（带随机抖动）"""
+    time.sleep(settings.LLM_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def _fallback_starting_line(db: Session) -> Optional[str]:
+    """从本地诗词库随机选一句之后至少还能接 CHAIN_OPENER_MIN_DEPTH 轮的5-7字诗句作为开场"""
+    return line_index.ensure_built(db).random_opener(settings.CHAIN_OPENER_MIN_DEPTH, min_len=5, max_len=7)
+
+def _fallback_response(last_char: str, db: Session) -> Optional[str]:
+    """从本地诗词库选一句以尾字（或其同音字）开头的4-8字诗句，按 AI_CHAIN_DIFFICULTY 依出度加权"""
+    return line_index.ensure_built(db).pick_continuation(last_char, settings.AI_CHAIN_DIFFICULTY, min_len=4, max_len=8)
+
+@timed("is_line_in_db")
 def is_line_in_db(line: str, db: Session) -> bool:
-    logger.debug(f"[is_line_in_db] Received line for DB check: '{line}'")
+    """
+    诗句是否为诗词库中的某一句：在字形折叠后的内存诗句索引中做一次哈希查找，
+    繁体、异体字写法与简体视为同一句。
+    """
     if not line or not db:
-        logger.debug("[is_line_in_db] Empty line or no db session, returning False.")
         return False
-    cleaned_line_for_query = line
-    if not cleaned_line_for_query:
-        logger.debug(f"[is_line_in_db] Cleaned line for query is empty. Original line: '{line}'. Returning False.")
+    canonical = canonical_line(line)
+    if not canonical:
         return False
-    like_pattern = "%" + "%".join(list(cleaned_line_for_query)) + "%"
-    logger.debug(f"[is_line_in_db] Constructed LIKE pattern: '{like_pattern}'")
     try:
-        exists = db.query(Poetry.id).filter(Poetry.content.like(like_pattern)).limit(1).scalar() is not None
-        logger.debug(f"[is_line_in_db] Query result for pattern '{like_pattern}' (original line: '{line}') in DB: {exists}")
+        with tracer.span("is_line_in_db", **{"line.length": len(canonical)}) as span:
+            exists = canonical in line_index.ensure_built(db)
+            span.set_attribute("line.found", exists)
+        logger.debug("[is_line_in_db] '%s' (canonical '%s') in corpus: %s", line, canonical, exists)
         return exists
     except Exception as e:
-        logger.error(f"Database check failed for line '{line}' with pattern '{like_pattern}': {e}", exc_info=True)
+        logger.error("Corpus check failed for line '%s': %s", line, e, exc_info=True)
         return False
 
-def get_lazy_pinyin_set(char: str) -> Set[str]:
-    """获取单个汉字所有读音的不带声调拼音集合。"""
-    if not char or not '\u4e00' <= char <= '\u9fff': #确保是单个汉字
-        return set()
-    # 使用NORMAL风格获取所有读音的拼音列表，然后转换为集合
-    pinyin_list = lazy_pinyin(char, style=Style.NORMAL)
-    return set(p for sublist in pinyin_list for p in sublist) # lazy_pinyin返回[[p1],[p2]]或[[p]]
-
-def are_chars_homophones_or_same(char1: str, char2: str) -> bool:
-    """
-    判断两个汉字是否相同，或者它们是否为游戏规则下的同音字（忽略声调）。
-    """
-    if not char1 or not char2 or not '\u4e00' <= char1 <= '\u9fff' or not '\u4e00' <= char2 <= '\u9fff':
-        return False # 不是有效汉字输入
-    if char1 == char2:
-        return True
-    
-    pinyin_set1 = get_lazy_pinyin_set(char1)
-    pinyin_set2 = get_lazy_pinyin_set(char2)
-    
-    # 检查两个拼音集合是否有交集
-    return not pinyin_set1.isdisjoint(pinyin_set2)
-
+@tracer.traced("get_ai_starting_line")
 def get_ai_starting_line(db: Session) -> Optional[str]:
-    logger.info("!!!!!!!!!!!! get_ai_starting_line (USING REQUESTS) CALLED !!!!!!!!!!!!")
-    api_key = get_deepseek_api_key()
-    if not api_key:
+    logger.debug("get_ai_starting_line called")
+    if not provider.is_configured():
         return "抱歉，AI服务API Key未配置。"
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    # 基于之前的优化建议修改提示词
-    system_content = (
-        "你是一位顶级中国古诗词专家，你的任务是为诗词接龙游戏提供开场诗句。"
-        "你提供的诗句必须是【真实存在于中国古古诗词中的原句片段】。"
-        "诗句必须是【5到7个汉字】。"
-        "诗句必须是【广为流传、有据可查的经典名句】，这样更容易被大众所知晓。"
-        "你的回答必须【绝对纯净】，【只包含诗句本身的文字内容】，不包含任何诗名、作者、标点、序号、解释或任何其他字符。"
-        "严格遵守上述所有规则。"
-    )
     prompt_text = "请提供一句适合作为诗词接龙开头的、符合上述所有要求的诗句。"
+    conversation = Conversation(STARTING_LINE_SYSTEM_PROMPT, prompt_text, settings.LLM_PROMPT_TOKEN_BUDGET)
     
     payload = {
         "model": "deepseek-chat",
-        "messages": [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt_text}
-        ],
         "max_tokens": 100,
         "temperature": 0.6, # 之前讨论过降低此值
         "stream": False
     }
 
     for attempt in range(MAX_RETRIES + 1): # MAX_RETRIES 可以设为 1 或 2
-        logger.info(f"Attempt {attempt + 1}/{MAX_RETRIES + 1} to get starting line from DeepSeek (requests).")
+        logger.debug("Attempt %d/%d to get starting line from %s.", attempt + 1, MAX_RETRIES + 1, provider.name)
+        payload["messages"] = conversation.messages()
         try:
-            logger.info(f"Calling DeepSeek API (requests). URL: {DEEPSEEK_API_URL}, Payload: {str(payload)[:200]}...")
-            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=15) # 稍微增加单次timeout
-            response.raise_for_status()
-            
-            result = response.json()
-            logger.info(f"DeepSeek API response (requests): {str(result)[:200]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Calling %s: %s", provider.api_url, str(payload)[:200])
+            result = _post_chat(payload, "starting_line", attempt + 1)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("LLM response: %s", str(result)[:200])
 
             if result.get('choices') and result['choices'][0].get('message') and result['choices'][0]['message'].get('content'):
                 ai_line_raw = result['choices'][0]['message']['content'].strip()
-                ai_line_cleaned = _clean_line(ai_line_raw)
-                logger.info(f"LLM raw response: '{ai_line_raw}', Cleaned: '{ai_line_cleaned}'")
+                ai_line_cleaned = canonical_line(ai_line_raw)
+                logger.debug("LLM raw response: '%s', cleaned: '%s'", ai_line_raw, ai_line_cleaned)
 
                 if not ai_line_cleaned:
                     logger.warning("LLM returned empty or too short line after cleaning.")
@@ -165,210 +193,249 @@ def get_ai_starting_line(db: Session) -> Optional[str]:
                     else: return "抱歉，AI大模型未能生成有效的诗句内容。"
 
                 if is_line_in_db(ai_line_cleaned, db):
-                    logger.info(f"Line '{ai_line_cleaned}' FOUND in DB. Returning this line.")
+                    logger.info("Starting line '%s' found in DB.", ai_line_cleaned)
+                    if line_index.continuation_depth(ai_line_cleaned[-1]) < settings.CHAIN_OPENER_MIN_DEPTH:
+                        # 尾字之后接不了几轮，开局就可能让玩家无句可接
+                        logger.info("Starting line '%s' has too little continuation depth.", ai_line_cleaned)
+                        if attempt < MAX_RETRIES:
+                            conversation.add_turn(ai_line_raw, "这句诗的尾字很难往下接。请换一句尾字常见、容易接龙的5-7字开场诗句。")
+                            continue
+                        return _fallback_starting_line(db) or ai_line_cleaned
                     return ai_line_cleaned
                 else:
-                    logger.warning(f"Line '{ai_line_cleaned}' NOT found in DB.")
+                    logger.warning("Starting line '%s' not found in DB.", ai_line_cleaned)
                     if attempt < MAX_RETRIES:
                         # 反馈给AI，让它尝试生成更常见的诗句
-                        payload["messages"].append({"role": "assistant", "content": ai_line_raw}) # 添加AI上一次的回答
-                        payload["messages"].append({"role": "user", "content": "这句诗句很好，但不够广为人知或不在常用诗词库中。请再提供一句【更经典、更常见】的、符合所有原始要求的5-7字开场诗句。"})
+                        conversation.add_turn(ai_line_raw, "这句诗句很好，但不够广为人知或不在常用诗词库中。请再提供一句【更经典、更常见】的、符合所有原始要求的5-7字开场诗句。")
                         continue
                     else: 
-                        logger.error(f"Line '{ai_line_cleaned}' not in DB after all retries. LLM might be returning it, or a very similar one despite feedback.")
+                        logger.error("Starting line '%s' not in DB after all retries. LLM might be returning it, or a very similar one despite feedback.", ai_line_cleaned)
                         # 如果多次重试AI都给不在库中的，可以考虑返回一个预设的或者记录这个情况
                         # 为了游戏能开始，这里可以考虑返回ai_line_cleaned，即使它不在库中，并标记
                         # 但当前严格要求在库中，所以返回None或错误
                         return "抱歉，AI尽力了，但生成的诗句未能在我们的诗词库中得到广泛确认。请稍后再试。"
             else:
-                logger.warning(f"LLM did not return valid content structure. Response: {str(result)[:200]}")
+                logger.warning("LLM did not return valid content structure. Response: %.200s", result)
                 if attempt < MAX_RETRIES: continue
                 else: return "抱歉，AI大模型未能生成诗句。"
 
+        except UpstreamUnavailable as e:
+            logger.warning("LLM upstream unavailable (%s), falling back to local corpus for starting line.", e)
+            return _fallback_starting_line(db) or "抱歉，AI服务暂时繁忙，请稍后再试。"
         except requests.exceptions.Timeout:
-            logger.error(f"Timeout during DeepSeek call (Attempt {attempt + 1}) after 15s.", exc_info=True)
+            logger.error("Timeout during LLM call (attempt %d) after %ss.", attempt + 1, settings.LLM_REQUEST_TIMEOUT, exc_info=True)
             if attempt == MAX_RETRIES:
                 return "抱歉，连接AI服务超时，请稍后再试。"
+            _backoff(attempt)
         except requests.exceptions.RequestException as e:
-            logger.error(f"RequestException during DeepSeek call (Attempt {attempt + 1}): {type(e).__name__} - {str(e)}", exc_info=True)
+            logger.error("RequestException during LLM call (attempt %d): %s - %s", attempt + 1, type(e).__name__, e, exc_info=True)
             if attempt == MAX_RETRIES:
                 return "抱歉，连接AI服务时发生网络错误。"
+            _backoff(attempt)
         except Exception as e:
-            logger.error(f"Generic exception during DeepSeek call processing (Attempt {attempt + 1}): {type(e).__name__} - {str(e)}", exc_info=True)
+            logger.error("Generic exception during LLM call processing (attempt %d): %s - %s", attempt + 1, type(e).__name__, e, exc_info=True)
             if attempt == MAX_RETRIES:
                 return "抱歉，AI大模型服务暂时出现问题。"
     
-    logger.error("Exhausted all attempts to get a valid starting line (requests). Returning None.")
+    logger.error("Exhausted all attempts to get a valid starting line.")
     return "抱歉，AI多次尝试后仍未能提供合适的开场诗句。"
 
-def get_ai_response_to_line(user_line: str, db: Session) -> Optional[str]:
-    logger.info(f"!!!!!!!!!!!! get_ai_response_to_line (USING REQUESTS) CALLED with user_line: '{user_line}' !!!!!!!!!!!!")
-    api_key = get_deepseek_api_key()
-    if not api_key:
-        return "抱歉，AI服务API Key未配置。"
-
-    cleaned_user_line = _clean_line(user_line)
-    if not cleaned_user_line:
-        logger.warning(f"User line '{user_line}' is empty after cleaning. Cannot get AI response.")
-        return "您的输入无效，AI无法接龙。"
-    
+def _response_conversation(cleaned_user_line: str) -> Conversation:
     last_char = cleaned_user_line[-1]
     # 获取尾字的无声调拼音，用于更明确地指导AI
-    last_char_pinyins = get_lazy_pinyin_set(last_char)
-    pinyin_hint = f"（提示：它的拼音是 '{next(iter(last_char_pinyins))}'，注意寻找同音字哦！）" if last_char_pinyins else ""
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    # 修改提示词以支持同音字
-    system_content = """你是一位才华横溢、富有创造力的中国古诗词接龙大师。你的核心目标是运用你的智慧，让诗词接龙游戏尽可能地持续下去，同时严格遵守接龙规则。
+    last_char_pinyins = char_readings(last_char)
+    pinyin_hint = f"（提示：它的拼音是 '{'/'.join(sorted(last_char_pinyins))}'，注意寻找同音字哦！）" if last_char_pinyins else ""
 
-【重要接龙规则】:
-
-1. 你需要接一个大约【5到7个汉字】的纯粹的诗句。
-
-2. 这个诗句必须是某一句较为常见或有据可查的【真实古诗词的片段】。
+    prompt_text = RESPONSE_PROMPT_TEMPLATE.format(
+        user_line_placeholder=cleaned_user_line,
+        last_char_placeholder=last_char,
+        pinyin_hint_placeholder=pinyin_hint
+    )
+    # 固定的系统提示词 + 首个提示词作为前缀，重试时只追加预算内的最近纠正轮次
+    return Conversation(RESPONSE_SYSTEM_PROMPT, prompt_text, settings.LLM_PROMPT_TOKEN_BUDGET)
 
-3. 你的诗句的【首字】必须与上一句诗词的【尾字】相同，或者是其【同音字】（声调不同也没关系，只要读音相似即可）。
+def _response_payload() -> dict:
+    return {
+        "model": "deepseek-chat",
+        "max_tokens": 50,
+        "temperature": 0.7, # 可以尝试调整
+        "stop": ["\n", "（", "(", "【", "答：", "解：", "。", "！", "？"], # 增加常见标点作为停止符
+        "stream": False
+    }
 
-4. 你的回答必须【仅仅包含诗句本身】，【绝对不能】包含任何其他文字，比如诗名、作者、标点符号、括号、解释、序号或者任何形式的聊天内容！
+@tracer.traced("get_ai_response_to_line")
+def get_ai_response_to_line(user_line: str, db: Session) -> Optional[str]:
+    # 接龙结果只取决于尾字（首字需与其同音或相同），因此以尾字为key合并并发请求；
+    # 合并的结果会交给其他对战，_get_ai_response_to_line 的返回值（包括提示信息）不能含有用户诗句本身
+    cleaned_user_line = canonical_line(user_line)
+    if not cleaned_user_line:
+        return _get_ai_response_to_line(user_line, db)
+    return _response_flight.do(cleaned_user_line[-1], _get_ai_response_to_line, user_line, db)
 
-请沉思片刻，发挥你的文学积累，相信你能找到合适的诗句！"""
-    
-    base_prompt_text_template = """上一句的诗句是 '{user_line_placeholder}'，它的最后一个字是 '{last_char_placeholder}'{pinyin_hint_placeholder}。
+def _get_ai_response_to_line(user_line: str, db: Session) -> Optional[str]:
+    logger.debug("get_ai_response_to_line called with user_line: '%s'", user_line)
+    if not provider.is_configured():
+        return "抱歉，AI服务API Key未配置。"
 
-现在，请你接一句以 '{last_char_placeholder}' 或其【同音字】开头的、符合所有系统指令中重要接龙规则的诗句："""
+    cleaned_user_line = canonical_line(user_line)
+    if not cleaned_user_line:
+        logger.warning("User line '%s' is empty after cleaning. Cannot get AI response.", user_line)
+        return "您的输入无效，AI无法接龙。"
     
-    current_prompt_text = base_prompt_text_template.format(
-        user_line_placeholder=cleaned_user_line,
-        last_char_placeholder=last_char,
-        pinyin_hint_placeholder=pinyin_hint
-    )
+    last_char = cleaned_user_line[-1]
+    if line_index.ensure_built(db).out_degree(last_char) == 0:
+        # 库中没有以该字（或其同音字）开头的诗句，大模型给出的诗句也不可能通过校验，不必请求
+        logger.info("No corpus line continues '%s', AI concedes without calling the LLM.", cleaned_user_line)
+        return None
+    conversation = _response_conversation(cleaned_user_line)
+    payload = _response_payload()
 
     for attempt in range(MAX_RETRIES + 1): # MAX_RETRIES 可以设为 1 或 2
-        logger.info(f"Attempt {attempt + 1}/{MAX_RETRIES + 1} for AI response to '{cleaned_user_line}' (requests). Current prompt: {current_prompt_text[:150]}...")
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": current_prompt_text}
-            ],
-            "max_tokens": 50,
-            "temperature": 0.7, # 可以尝试调整
-            "stop": ["\n", "（", "(", "【", "答：", "解：", "。", "！", "？"], # 增加常见标点作为停止符
-            "stream": False
-        }
+        payload["messages"] = conversation.messages()
+        logger.debug("Attempt %d/%d for AI response to '%s'.", attempt + 1, MAX_RETRIES + 1, cleaned_user_line)
         
         try:
-            logger.info(f"Calling DeepSeek API for response (requests). URL: {DEEPSEEK_API_URL}, Payload: {str(payload)[:200]}...")
-            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=15) # 增加timeout
-            response.raise_for_status()
-
-            result = response.json()
-            logger.info(f"DeepSeek API response for AI line (requests): {str(result)[:200]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Calling %s: %s", provider.api_url, str(payload)[:200])
+            result = _post_chat(payload, "response", attempt + 1)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("LLM response: %s", str(result)[:200])
 
             if result.get('choices') and result['choices'][0].get('message') and result['choices'][0]['message'].get('content'):
                 ai_line_raw = result['choices'][0]['message']['content'].strip()
                 
                 if any(phrase in ai_line_raw for phrase in ["我接不上", "接不上", "无法接龙", "抱歉"]):
-                    logger.info(f"LLM explicitly stated it cannot chain. Response: '{ai_line_raw}'")
+                    logger.info("LLM explicitly stated it cannot chain. Response: '%s'", ai_line_raw)
                     if attempt < MAX_RETRIES:
                         # 尝试给更具体的反馈
-                        payload["messages"].append({"role": "assistant", "content": ai_line_raw})
-                        payload["messages"].append({"role": "user", "content": f"再努力一下，大师！这对你来说肯定不难。请严格按照规则，接一个以'{last_char}'或其同音字开头的5-7字纯诗句。"})
-                        current_prompt_text = payload["messages"][-1]["content"] # 更新prompt给下一次尝试
+                        conversation.add_turn(ai_line_raw, f"再努力一下，大师！这对你来说肯定不难。请严格按照规则，接一个以'{last_char}'或其同音字开头的5-7字纯诗句。")
                         continue 
                     return "抱歉，AI多次尝试后仍表示无法接龙。"
 
-                ai_line_cleaned = _clean_line(ai_line_raw) 
-                logger.info(f"LLM raw response: '{ai_line_raw}', Cleaned: '{ai_line_cleaned}'")
+                ai_line_cleaned = canonical_line(ai_line_raw) 
+                logger.debug("LLM raw response: '%s', cleaned: '%s'", ai_line_raw, ai_line_cleaned)
 
                 if not ai_line_cleaned:
                     logger.warning("LLM returned empty or too short line for AI response.")
                     if attempt < MAX_RETRIES:
-                        payload["messages"].append({"role": "assistant", "content": ai_line_raw})
-                        payload["messages"].append({"role": "user", "content": f"返回的诗句清理后内容太少。请确保返回的是约5-7个汉字的纯诗句部分，且以'{last_char}'或其同音字开头。"})
-                        current_prompt_text = payload["messages"][-1]["content"]
+                        conversation.add_turn(ai_line_raw, f"返回的诗句清理后内容太少。请确保返回的是约5-7个汉字的纯诗句部分，且以'{last_char}'或其同音字开头。")
                         continue
                     else: return "抱歉，AI大模型未能生成有效的诗句来接龙。"
                 
                 if not (4 <= len(ai_line_cleaned) <= 8):
-                    logger.warning(f"AI response '{ai_line_cleaned}' length {len(ai_line_cleaned)} not ideal.")
+                    logger.warning("AI response '%s' length %d not ideal.", ai_line_cleaned, len(ai_line_cleaned))
                     if attempt < MAX_RETRIES:
-                        payload["messages"].append({"role": "assistant", "content": ai_line_raw})
-                        payload["messages"].append({"role": "user", "content": f"诗句长度 '{len(ai_line_cleaned)}' 不太符合期望的5-7字。请重新生成一个以'{last_char}'或其同音字开头的【纯粹的】5到7个汉字的诗句片段。"})
-                        current_prompt_text = payload["messages"][-1]["content"]
+                        conversation.add_turn(ai_line_raw, f"诗句长度 '{len(ai_line_cleaned)}' 不太符合期望的5-7字。请重新生成一个以'{last_char}'或其同音字开头的【纯粹的】5到7个汉字的诗句片段。")
                         continue
 
                 # 使用新的同音字判断逻辑
                 if not are_chars_homophones_or_same(ai_line_cleaned[0], last_char):
-                    logger.warning(f"AI response '{ai_line_cleaned}' (first char: {ai_line_cleaned[0]}) does not start with expected char '{last_char}' or its homophone.")
+                    logger.warning("AI response '%s' does not start with expected char '%s' or its homophone.", ai_line_cleaned, last_char)
                     if attempt < MAX_RETRIES:
-                        payload["messages"].append({"role": "assistant", "content": ai_line_raw})
-                        payload["messages"].append({"role": "user", "content": f"首字 '{ai_line_cleaned[0]}' 不对哦！必须是以 '{last_char}' 或其同音字开头的纯诗句。再想想看。"})
-                        current_prompt_text = payload["messages"][-1]["content"]
+                        conversation.add_turn(ai_line_raw, f"首字 '{ai_line_cleaned[0]}' 不对哦！必须是以 '{last_char}' 或其同音字开头的纯诗句。再想想看。")
                         continue
                     else: return f"抱歉，AI暂时未能找到以 '{last_char}' 或其同音字开头的诗句。"
 
                 if is_line_in_db(ai_line_cleaned, db):
-                    logger.info(f"AI response line '{ai_line_cleaned}' FOUND in DB. Returning.")
+                    logger.info("AI response line '%s' found in DB.", ai_line_cleaned)
+                    if line_index.out_degree(ai_line_cleaned[-1]) == 0:
+                        # 死路：库中没有诗句能接这句，玩家必输
+                        logger.info("AI response line '%s' is a dead end.", ai_line_cleaned)
+                        if attempt < MAX_RETRIES:
+                            conversation.add_turn(ai_line_raw, f"这句 '{ai_line_cleaned}' 的尾字几乎没有诗句能接。请换一个以 '{last_char}' 或其同音字开头、尾字常见的5-7字纯诗句。")
+                            continue
+                        return _fallback_response(last_char, db) or ai_line_cleaned
                     return ai_line_cleaned
                 else:
-                    logger.warning(f"AI response line '{ai_line_cleaned}' NOT found in DB.")
+                    logger.warning("AI response line '%s' not found in DB.", ai_line_cleaned)
                     if attempt < MAX_RETRIES:
-                        payload["messages"].append({"role": "assistant", "content": ai_line_raw})
-                        payload["messages"].append({"role": "user", "content": f"这句 '{ai_line_cleaned}' 很有趣，但在我的常见诗词库中未能确认。能否换一个以 '{last_char}' 或其同音字开头的、更广为人知或明确有出处的5-7字纯诗句呢？"})
-                        current_prompt_text = payload["messages"][-1]["content"]
+                        conversation.add_turn(ai_line_raw, f"这句 '{ai_line_cleaned}' 很有趣，但在我的常见诗词库中未能确认。能否换一个以 '{last_char}' 或其同音字开头的、更广为人知或明确有出处的5-7字纯诗句呢？")
                         continue
                     else: 
-                        logger.error(f"AI response line '{ai_line_cleaned}' not in DB after all retries.")
+                        logger.error("AI response line '%s' not in DB after all retries.", ai_line_cleaned)
                         # 如果多次尝试AI都给不在库中的，可以考虑返回ai_line_cleaned，即使它不在库中，并标记
                         return f"AI给出了诗句'{ai_line_cleaned}'，但它不在我们的常用诗词库中。您觉得算接上了吗？（可选择返回此句或判AI失败）" # 这是一个需要产品层面决定的点
             else:
-                logger.warning(f"LLM did not return valid content structure for AI response. Response: {str(result)[:200]}")
+                logger.warning("LLM did not return valid content structure for AI response. Response: %.200s", result)
                 if attempt < MAX_RETRIES:
-                    payload["messages"].append({"role": "assistant", "content": result.get('choices')[0].get('message').get('content') if result.get('choices') and result['choices'][0].get('message') else "Empty response"})
-                    payload["messages"].append({"role": "user", "content": f"返回内容似乎是空的或格式不对。请给出一个以'{last_char}'或其同音字开头的5-7字纯诗句。"})
-                    current_prompt_text = payload["messages"][-1]["content"]
+                    conversation.add_turn(result.get('choices')[0].get('message').get('content') if result.get('choices') and result['choices'][0].get('message') else "Empty response", f"返回内容似乎是空的或格式不对。请给出一个以'{last_char}'或其同音字开头的5-7字纯诗句。")
                     continue
                 else: return "抱歉，AI大模型未能生成诗句来接龙。"
 
+        except UpstreamUnavailable as e:
+            logger.warning("LLM upstream unavailable (%s), falling back to local corpus for '%s'.", e, last_char)
+            return _fallback_response(last_char, db) or f"抱歉，AI暂时未能找到以 '{last_char}' 或其同音字开头的诗句。"
         except requests.exceptions.Timeout:
-            logger.error(f"Timeout during DeepSeek call for AI response (Attempt {attempt + 1}) after 15s.", exc_info=True)
+            logger.error("Timeout during LLM call for AI response (attempt %d) after %ss.", attempt + 1, settings.LLM_REQUEST_TIMEOUT, exc_info=True)
             if attempt == MAX_RETRIES:
                 return "抱歉，连接AI服务超时，请稍后再试。"
+            _backoff(attempt)
         except requests.exceptions.RequestException as e:
-            logger.error(f"RequestException during DeepSeek call for AI response (Attempt {attempt + 1}): {type(e).__name__} - {str(e)}", exc_info=True)
+            logger.error("RequestException during LLM call for AI response (attempt %d): %s - %s", attempt + 1, type(e).__name__, e, exc_info=True)
             if attempt == MAX_RETRIES:
                 return "抱歉，连接AI服务时发生网络错误。"
+            _backoff(attempt)
         except Exception as e:
-            logger.error(f"Generic exception during DeepSeek call for AI response (Attempt {attempt + 1}): {type(e).__name__} - {str(e)}", exc_info=True)
+            logger.error("Generic exception during LLM call for AI response (attempt %d): %s - %s", attempt + 1, type(e).__name__, e, exc_info=True)
             if attempt == MAX_RETRIES:
                 return "抱歉，AI大模型服务在接龙时出现问题。"
 
-    logger.error(f"Exhausted all attempts to get a valid AI response for '{cleaned_user_line}' (requests). Returning None.")
-    return f"抱歉，AI多次尝试后仍未能为'{cleaned_user_line}'接上合适的诗句。"
+    logger.error("Exhausted all attempts to get a valid AI response for '%s'.", cleaned_user_line)
+    return f"抱歉，AI多次尝试后仍未能接上以 '{last_char}' 结尾的诗句。"
 
+@tracer.traced("stream_ai_response_to_line")
+def stream_ai_response_to_line(user_line: str, db: Session, on_token: Callable[[str], None]) -> Optional[str]:
+    """
+    流式接龙：以 "stream": true 请求一次，每收到一段内容即回调 on_token（供前端边收边显示）。
+    结果按与 get_ai_response_to_line 相同的规则校验（长度、首字同音、在库中、不是死路），通过则直接返回；
+    否则（或流式请求失败时）退回到带重试的 get_ai_response_to_line。
+    on_token 收到的只是草稿，以返回值为准。
+    """
+    cleaned_user_line = canonical_line(user_line)
+    if not cleaned_user_line or not provider.is_configured() or line_index.ensure_built(db).out_degree(cleaned_user_line[-1]) == 0:
+        return get_ai_response_to_line(user_line, db)
+
+    last_char = cleaned_user_line[-1]
+    payload = _response_payload()
+    payload["messages"] = _response_conversation(cleaned_user_line).messages()
+    try:
+        result = _post_chat(payload, "response_stream", 1, on_token=on_token)
+        ai_line_cleaned = canonical_line(result["choices"][0]["message"]["content"] or "")
+    except UpstreamUnavailable as e:
+        logger.warning("LLM upstream unavailable (%s), falling back to local corpus for '%s'.", e, last_char)
+        return _fallback_response(last_char, db) or f"抱歉，AI暂时未能找到以 '{last_char}' 或其同音字开头的诗句。"
+    except Exception as e:
+        logger.warning("Streaming AI response for '%s' failed: %s - %s", cleaned_user_line, type(e).__name__, e)
+        return get_ai_response_to_line(user_line, db)
+
+    if (ai_line_cleaned and 4 <= len(ai_line_cleaned) <= 8
+            and are_chars_homophones_or_same(ai_line_cleaned[0], last_char)
+            and is_line_in_db(ai_line_cleaned, db)
+            and line_index.out_degree(ai_line_cleaned[-1]) > 0):
+        return ai_line_cleaned
+    logger.info("Streamed AI response '%s' rejected, retrying without streaming.", ai_line_cleaned)
+    return get_ai_response_to_line(user_line, db)
+
+@tracer.traced("judge_user_line_by_ai")
 async def judge_user_line_by_ai(ai_previous_line: str, user_current_line_raw: str, db: Session) -> tuple[bool, str]:
     """
     AI 判断用户当前的接龙诗句是否有效。
     主要基于首字规则（同音或同字）和数据库校验。
     返回一个元组 (is_correct: bool, message: str)
     """
-    logger.info(f"!!!!!!!!!!!! judge_user_line_by_ai CALLED (Homophone Rule) !!!!!!!!!!!! AI_Prev: '{ai_previous_line}', User_Raw: '{user_current_line_raw}'")
+    logger.debug("judge_user_line_by_ai called. AI_Prev: '%s', User_Raw: '%s'", ai_previous_line, user_current_line_raw)
     
-    cleaned_user_line = _clean_line(user_current_line_raw)
-    cleaned_ai_previous_line = _clean_line(ai_previous_line)
+    cleaned_user_line = canonical_line(user_current_line_raw)
+    cleaned_ai_previous_line = canonical_line(ai_previous_line)
+    tracer.current_span().set_attributes(**{"line.raw_length": len(user_current_line_raw or ""),
+                                            "line.cleaned_length": len(cleaned_user_line)})
 
     if not cleaned_user_line:
-        logger.warning(f"User line '{user_current_line_raw}' cleaned to empty.")
+        logger.warning("User line '%s' cleaned to empty.", user_current_line_raw)
         return False, "您的回答似乎是空的或无效的，请输入一句诗词。"
 
     if not cleaned_ai_previous_line:
-        logger.error(f"Critical: AI's previous line '{ai_previous_line}' cleaned to empty. This should not happen.")
+        logger.error("Critical: AI's previous line '%s' cleaned to empty. This should not happen.", ai_previous_line)
         return False, "系统内部错误：AI的上一句诗词记录无效，无法判断您的回答。"
 
     # 1. 基本规则校验：首字是否接上（同字或同音字）
@@ -377,16 +444,77 @@ async def judge_user_line_by_ai(ai_previous_line: str, user_current_line_raw: st
     
     # 使用新的同音字判断逻辑
     if not are_chars_homophones_or_same(actual_first_char_of_user_line, expected_char_for_next_line):
-        pinyins_expected = get_lazy_pinyin_set(expected_char_for_next_line)
-        pinyin_hint_expected = f"(读音参考: {next(iter(pinyins_expected)) if pinyins_expected else '未知'})"
-        logger.info(f"User line first char '{actual_first_char_of_user_line}' does not match AI prev last char '{expected_char_for_next_line}' or its homophones.")
+        pinyins_expected = char_readings(expected_char_for_next_line)
+        pinyin_hint_expected = f"(读音参考: {'/'.join(sorted(pinyins_expected)) if pinyins_expected else '未知'})"
+        logger.info("User line first char '%s' does not match AI prev last char '%s' or its homophones.", actual_first_char_of_user_line, expected_char_for_next_line)
         return False, f"首字不对哦！应该是以'{expected_char_for_next_line}'{pinyin_hint_expected}或其同音字开头的诗句，但您的是以'{actual_first_char_of_user_line}'开头。"
 
     # 2. 数据库校验：用户回答的诗句是否在库中
     if not is_line_in_db(cleaned_user_line, db):
-        logger.info(f"User line '{cleaned_user_line}' NOT found in DB.")
-        return False, f"您回答的诗句'{cleaned_user_line}'很有意境，但在我的诗词库中未能查证到呢。"
+        logger.info("User line '%s' not found in DB.", cleaned_user_line)
+        message = f"您回答的诗句'{cleaned_user_line}'很有意境，但在我的诗词库中未能查证到呢。"
+        suggestion = line_index.closest_line(cleaned_user_line)
+        if suggestion and are_chars_homophones_or_same(suggestion[0][0], expected_char_for_next_line):
+            message += f"您是不是想说'{suggestion[0]}'？"
+        return False, message
         
-    logger.info(f"User line '{cleaned_user_line}' passed all checks (first char homophone/same & DB).")
+    logger.info("User line '%s' passed all checks (first char homophone/same & DB).", cleaned_user_line)
     return True, "接得漂亮！"
 
+def _is_ai_line(result: Optional[str]) -> bool:
+    """AI返回的是否为有效诗句（提示信息都含有标点等非汉字字符）"""
+    return bool(result) and canonical_line(result) == result
+
+def avoid_used_line(ai_line: Optional[str], user_line: str, used: Container[str], db: Session) -> Optional[str]:
+    """
+    AI接出的诗句（大模型、预取或合并请求的结果，不区分对战）在本局已出现过时，
+    改从本地诗词库选一句未用过的诗句接上；没有可用的诗句时返回 None（AI词穷）。
+    """
+    if not _is_ai_line(ai_line) or ai_line not in used:
+        return ai_line
+    cleaned_user_line = canonical_line(user_line)
+    if not cleaned_user_line:
+        return None
+    logger.info("AI line '%s' was already used in this battle, picking a local continuation.", ai_line)
+    return line_index.ensure_built(db).pick_continuation(cleaned_user_line[-1], settings.AI_CHAIN_DIFFICULTY,
+                                                         min_len=4, max_len=8, exclude=used)
+
+def _prefetch_has_headroom() -> bool:
+    """上游繁忙时预取让路，为玩家提交保留 LLM_PREFETCH_RESERVED_SLOTS 个并发名额"""
+    return upstream_guard.has_headroom(settings.LLM_PREFETCH_RESERVED_SLOTS)
+
+def _resolve_prefetch(candidate_line: str) -> Optional[str]:
+    # 任务排队期间上游可能已变忙，开始前再检查一次
+    if not _prefetch_has_headroom():
+        logger.debug("Upstream busy, skipping prefetch for candidate '%s'.", candidate_line)
+        return None
+    db = SessionLocal()
+    try:
+        ai_line = get_ai_response_to_line(candidate_line, db)
+    finally:
+        db.close()
+    return ai_line if _is_ai_line(ai_line) else None
+
+def prefetch_ai_responses(battle_id: int, question: str, db: Session):
+    """
+    出题后（玩家思考期间）在后台为最可能的玩家接句预先请求AI的下一句。
+    候选接句取自诗词库中以题目尾字（或其同音字）开头的诗句，按尾字频率取前几名。
+    预取与玩家提交共用上游名额和限流，上游接近满载时跳过，同时进行的预取不超过 LLM_PREFETCH_WORKERS 个。
+    """
+    cleaned_question = canonical_line(question)
+    if settings.LLM_PREFETCH_CANDIDATES <= 0 or not cleaned_question:
+        return
+    if not _prefetch_has_headroom():
+        logger.debug("Upstream busy, skipping prefetch for battle %s.", battle_id)
+        return
+    candidates = line_index.ensure_built(db).continuation_candidates(cleaned_question[-1], settings.LLM_PREFETCH_CANDIDATES)
+    if candidates:
+        logger.debug("Prefetching AI responses for battle %s, candidates: %s", battle_id, candidates)
+        prefetch_buffer.schedule(battle_id, candidates, _resolve_prefetch)
+
+def take_prefetched_response(battle_id: int, user_line: str) -> Optional[str]:
+    """若已预取到与玩家诗句尾字匹配的AI回复，则直接返回"""
+    cleaned_user_line = canonical_line(user_line)
+    if not cleaned_user_line:
+        return None
+    return prefetch_buffer.take(battle_id, cleaned_user_line[-1])
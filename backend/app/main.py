@@ -1,34 +1,53 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Form, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Form, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, desc
+from sqlalchemy.orm.attributes import flag_modified
 from datetime import timedelta, datetime
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
-from typing import List, Optional, Tuple, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Tuple, Dict, Any, Union
+import asyncio
+import json
 import logging
-import re # For parsing poem lines
 
-from .core.database import engine, get_db, Base
+from .core.logs import configure_logging
+
+# 配置日志（需在导入数据库等模块之前，使其导入时的日志也按统一格式输出）
+configure_logging()
+
+from .core.database import engine, get_db, Base, SessionLocal
 from .core.init_database import init_database
+from .core.config import settings
+from .core.http_cache import HTTPCacheMiddleware, CacheRule, response_cache
+from .core.metrics import MetricsMiddleware, instrument_engine, register_callback, registry
+from .core.tracing import TracingMiddleware, tracer
 from . import schemas, auth
 from .models import User, Battle, Season, Poetry, UserFavoritePoetry
 from .core.init_db import init_poetry_data, init_season_data
 from . import llm_service
 from .llm_service import judge_user_line_by_ai, get_ai_response_to_line
 import random
-from .schemas.battle import BattleCreate, BattleResponse, ChainSubmitRequest, ChainSubmitResponse, BattleUpdate
+from .schemas.rankings import RankingListResponse
+from .schemas.battle import BattleCreate, BattleResponse, ChainSubmitRequest, ChainSubmitResponse, BattleUpdate, BattleRoundDelta
 from .crud.battle import get_active_battle, get_battle
+from .services.battle_session import battle_writer
+from .services.poetry_facets import poetry_facets
+from .services.fuzzy_match import bounded_edit_distance
+from .services.line_index import line_index
+from .services.used_lines import used_lines_of, UsedLines
+from .services.poetry_difficulty import difficulty_sampler
+from .normalize import parse_poem_lines, canonical_line, check_poetry_chain_valid, check_rhyme_chain_valid
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 try:
-    # 初始化数据库
-    init_database()
+    # 初始化数据库（创建 MySQL 库；SQLite 等无需此步）
+    if engine.dialect.name == "mysql":
+        init_database()
     
     # 创建所有表
     Base.metadata.create_all(bind=engine)
@@ -39,6 +58,10 @@ try:
     init_poetry_data(db)
     init_season_data(db)
     logger.info("Initial data loaded successfully")
+
+    # 开启全库模糊索引时在启动时构建诗句索引，模糊索引随即在后台构建，不占用请求
+    if settings.LINE_FUZZY_INDEX_ENABLED:
+        line_index.ensure_built(db)
 except Exception as e:
     logger.error(f"Error during initialization: {str(e)}")
     raise
@@ -48,9 +71,23 @@ app = FastAPI(
     description="诗词接龙游戏的后端API服务",
     version="1.0.0",
     docs_url=None,  # 禁用默认的 docs
-    redoc_url=None  # 禁用默认的 redoc
+    redoc_url=None,  # 禁用默认的 redoc
+    default_response_class=ORJSONResponse
 )
 
+# 只读接口的响应缓存（诗词详情/列表、赛季列表），写操作时按标签失效
+if settings.HTTP_CACHE_ENABLED:
+    app.add_middleware(
+        HTTPCacheMiddleware,
+        cache=response_cache,
+        rules=[
+            CacheRule(r"^/api/v1/poetry/list$", tag="poetry", ttl=60, max_age=30),
+            CacheRule(r"^/api/v1/poetry/facets$", tag="poetry", ttl=60, max_age=30),
+            CacheRule(r"^/api/v1/poetry/\d+$", tag="poetry", ttl=300, max_age=300),
+            CacheRule(r"^(/api)?/v1/seasons$", tag="seasons", ttl=60, max_age=0),
+        ],
+    )
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -60,6 +97,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求链路追踪（根 span 包含缓存命中的请求）
+app.add_middleware(TracingMiddleware, tracer=tracer)
+# 请求耗时指标（最外层，包含缓存与CORS在内的完整耗时）
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+
+def _cache_events():
+    """各级缓存的命中/未命中计数，供 /metrics 计算命中率"""
+    http_stats = response_cache.stats()
+    for event_name in ("hits", "misses", "not_modified"):
+        yield ("http_response", event_name), http_stats[event_name]
+    prefetch_stats = llm_service.prefetch_buffer.stats()
+    yield ("llm_prefetch", "hits"), prefetch_stats["hits"]
+    yield ("llm_prefetch", "misses"), prefetch_stats["misses"]
+    for name, flight_stats in llm_service.get_coalescing_stats().items():
+        yield (f"llm_coalesce_{name}", "misses"), sum(s["leaders"] for s in flight_stats.values())
+        yield (f"llm_coalesce_{name}", "hits"), sum(s["shared"] for s in flight_stats.values())
+
+register_callback("app_cache_events_total", "Cache hits and misses by cache", "counter", ("cache", "event"), _cache_events)
+
 # 自定义 OpenAPI 文档
 def custom_openapi():
     if app.openapi_schema:
@@ -119,19 +176,27 @@ async def root():
     }
 
 
+# Prometheus 指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # API 健康检查
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "llm_upstream": llm_service.get_upstream_metrics(),
+        "llm_prompts": llm_service.get_prompt_stats(),
+        "http_cache": response_cache.stats()
     }
 
 # 用户注册
 @app.post("/api/v1/register", response_model=schemas.User)
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     try:
-        logger.info(f"Attempting to register user: {user.username}")
+        logger.info("Attempting to register user: %s", user.username)
         
         # 检查用户名是否已存在
         db_user = db.query(User).filter(User.username == user.username).first()
@@ -160,7 +225,7 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(db_user)
         
-        logger.info(f"Successfully registered user: {user.username}")
+        logger.info("Successfully registered user: %s", user.username)
         return db_user
     except Exception as e:
         logger.error(f"Error during registration: {str(e)}")
@@ -170,7 +235,7 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 @app.post("/api/v1/token", response_model=schemas.Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     try:
-        logger.info(f"Attempting login for user: {form_data.username}")
+        logger.debug("Attempting login for user: %s", form_data.username)
         user = db.query(User).filter(User.username == form_data.username).first()
         if not user:
             logger.warning(f"Login failed: User not found - {form_data.username}")
@@ -192,7 +257,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
         access_token = auth.create_access_token(
             data={"sub": user.username}, expires_delta=access_token_expires
         )
-        logger.info(f"Login successful for user: {form_data.username}")
+        logger.info("Login successful for user: %s", form_data.username)
         return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
@@ -233,8 +298,9 @@ async def start_battle_endpoint(
         active_battle.status = "aborted"
         db.add(active_battle) # Ensure SQLAlchemy tracks the change
         db.commit() # Commit the change for the aborted battle
+        llm_service.prefetch_buffer.discard(active_battle.id)
         # It might be good to refresh active_battle here if its state is used later before reassigning, but we are creating a new one.
-        logger.info(f"User {current_user.id} aborted battle {active_battle.id} to start a new one.")
+        logger.info("User %s aborted battle %s to start a new one.", current_user.id, active_battle.id)
         # Option 2: Raise error (Now commented out)
         # raise HTTPException(status_code=400, detail=f"User already has an active battle (ID: {active_battle.id}). Finish or abort it first.")
 
@@ -257,21 +323,10 @@ async def start_battle_endpoint(
     }
 
     if battle_create.battle_type == "normal_chain":
-        random_poetry = db.query(Poetry).order_by(func.random()).first() # func needs to be imported from sqlalchemy
-        if not random_poetry or not random_poetry.content:
-            raise HTTPException(status_code=500, detail="Could not fetch a poem for normal chain mode.")
-        
-        lines = parse_poem_lines(random_poetry.content)
-        if len(lines) < 2: # Need at least two lines for a question and an answer
-            # Try to find another poem if the first one is too short
-            for _ in range(5): # Try a few times
-                random_poetry = db.query(Poetry).order_by(func.random()).first()
-                if random_poetry and random_poetry.content:
-                    lines = parse_poem_lines(random_poetry.content)
-                    if len(lines) >= 2:
-                        break
-            if len(lines) < 2:
-                 raise HTTPException(status_code=500, detail="Selected poem does not have enough lines for normal chain mode after multiple tries.")
+        # Need at least two lines for a question and an answer; try a few poems
+        random_poetry, lines = _random_poem_with_lines(db, attempts=6)
+        if not random_poetry:
+            raise HTTPException(status_code=500, detail="Could not fetch a poem with enough lines for normal chain mode.")
 
         new_battle_data["current_poetry_id"] = random_poetry.id
         new_battle_data["current_question"] = lines[0] # First line as question
@@ -286,15 +341,15 @@ async def start_battle_endpoint(
 
     elif battle_create.battle_type == "smart_chain":
         # 智能接龙模式
-        logger.info("Entering smart_chain battle type logic.")
+        logger.debug("Entering smart_chain battle type logic.")
         try:
             if not hasattr(llm_service, 'get_ai_starting_line'):
                 logger.error("llm_service module loaded, but get_ai_starting_line function is missing!")
                 raise HTTPException(status_code=500, detail="AI服务组件配置错误。")
 
-            logger.info("Attempting to call llm_service.get_ai_starting_line...")
-            ai_starting_line = llm_service.get_ai_starting_line(db)
-            logger.info(f"llm_service.get_ai_starting_line returned: {'<empty_or_None>' if not ai_starting_line else str(ai_starting_line)[:50]}")
+            logger.debug("Attempting to call llm_service.get_ai_starting_line...")
+            ai_starting_line = await run_in_threadpool(llm_service.get_ai_starting_line, db)
+            logger.debug("llm_service.get_ai_starting_line returned: %.50s", ai_starting_line or "<empty_or_None>")
 
             if not ai_starting_line:
                 logger.error("Failed to get starting line from AI for smart_chain (returned empty/None).")
@@ -330,24 +385,42 @@ async def start_battle_endpoint(
         except Exception as e_main_llm_call:
             logger.error(f"CRITICAL UNHANDLED ERROR in smart_chain logic: {type(e_main_llm_call).__name__} - {str(e_main_llm_call)}", exc_info=True)
             raise HTTPException(status_code=500, detail="智能接龙服务发生严重内部错误。")
+
+    elif battle_create.battle_type == "rhyme_chain":
+        # 韵脚接龙：题目与AI回合都从诗句索引的韵部表中选取，不调用大模型
+        question = _random_rhyme_question(db)
+        if not question:
+            raise HTTPException(status_code=500, detail="Could not fetch a line for rhyme chain mode.")
+
+        new_battle_data["current_question"] = question
+        new_battle_data["expected_answer"] = None # 押韵的诗句都算对，没有唯一答案
+        new_battle_data["current_poetry_id"] = line_index.poetry_id_of(question)
+        new_battle_data["battle_records"].append(
+            schemas.RoundRecord(round_num=1, question=question).model_dump()
+        )
     else:
         raise HTTPException(status_code=400, detail="Invalid battle_type specified.")
 
     battle = Battle(**new_battle_data)
+    used_lines_of(battle).add(battle.current_question)
     db.add(battle)
     db.commit()
     db.refresh(battle)
-    logger.info(f"Battle {battle.id} started for user {current_user.id}, type: {battle.battle_type}")
+    logger.info("Battle %s started for user %s, type: %s", battle.id, current_user.id, battle.battle_type)
+    if battle.battle_type == "smart_chain":
+        llm_service.prefetch_ai_responses(battle.id, battle.current_question, db)
     return battle
 
 @app.get("/api/v1/battle/random-poetry", response_model=schemas.Poetry)
 async def get_random_poetry_endpoint(
-    difficulty: int = 1,
+    difficulty: int = Query(1, description="难度档，1 为最易，共 POETRY_DIFFICULTY_LEVELS 档"),
     db: Session = Depends(get_db)
 ):
     try:
         poetry = get_random_poetry(db, difficulty)
         return poetry
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting random poetry: {str(e)}")
         raise HTTPException(status_code=500, detail="获取随机诗词失败")
@@ -408,28 +481,15 @@ async def update_battle(
 
 # 辅助函数
 def get_random_poetry(db: Session, difficulty: int = 1) -> Poetry:
-    """获取随机诗词"""
-    poetry = db.query(Poetry).order_by(
-        func.random()
-    ).first()
+    """从指定难度档（1 最易，共 POETRY_DIFFICULTY_LEVELS 档）中随机获取一首诗词"""
+    poetry_id = difficulty_sampler.ensure_built(db).sample(difficulty)
+    poetry = db.get(Poetry, poetry_id) if poetry_id is not None else None
     
     if not poetry:
         raise HTTPException(status_code=404, detail="没有可用的诗词")
     
     return poetry
 
-def check_poetry_chain_valid(poetry1: str, poetry2: str) -> tuple[bool, str]:
-    """检查诗词接龙是否有效"""
-    # 去除标点符号和空格
-    p1 = ''.join(c for c in poetry1 if c.isalnum())
-    p2 = ''.join(c for c in poetry2 if c.isalnum())
-    
-    # 检查首尾字接龙
-    if p1[-1] == p2[0]:
-        return True, "首尾字接龙"
-    
-    return False, "无效接龙"
-
 # 获取赛季列表
 @app.get("/api/v1/seasons", response_model=List[schemas.Season], tags=["Rankings", "Seasons"])
 @app.get("/v1/seasons", response_model=List[schemas.Season], include_in_schema=False)
@@ -472,6 +532,7 @@ async def create_new_season(db: Session = Depends(get_db)):
         db.add(new_season)
         db.commit()
         db.refresh(new_season)
+        response_cache.invalidate("seasons")
         logger.info(f"New season '{new_season.name}' created and activated.")
         return new_season
     except Exception as e:
@@ -480,7 +541,7 @@ async def create_new_season(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"创建新赛季失败: {str(e)}")
 
 # 获取排行榜
-@app.get("/api/v1/rankings", tags=["Rankings", "Seasons"])
+@app.get("/api/v1/rankings", response_model=RankingListResponse, tags=["Rankings", "Seasons"])
 @app.get("/v1/rankings", include_in_schema=False)
 async def get_rankings(
     season: Optional[int] = None,
@@ -520,28 +581,38 @@ async def get_rankings(
         # 格式化结果
         result = []
         for r in rankings:
+            # MySQL 的 SUM 返回 Decimal，orjson 不能编码，先转为 int 再参与计算
+            win_count = int(r.winCount or 0)
+            total_battles = int(r.totalBattles or 0)
             result.append({
                 "id": r.id,
                 "username": r.username,
                 "nickname": r.nickname,
                 "avatar": r.avatar,
-                "score": r.score or 0,
-                "totalBattles": r.totalBattles or 0,
-                "winCount": r.winCount or 0,
-                "loseCount": r.loseCount or 0,
-                "winRate": round((r.winCount or 0) / (r.totalBattles or 1) * 100, 2)
+                "score": int(r.score or 0),
+                "totalBattles": total_battles,
+                "winCount": win_count,
+                "loseCount": int(r.loseCount or 0),
+                "winRate": round(win_count / (total_battles or 1) * 100, 2)
             })
 
-        return {
+        # 数据直接来自数据库行，结构已符合 RankingListResponse，跳过响应模型校验直接用 orjson 序列化
+        return ORJSONResponse({
             "success": True,
             "rankings": result,
             "total": total
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting rankings: {str(e)}")
         raise HTTPException(status_code=500, detail="获取排行榜失败")
 
 # 诗词库相关API
+# 诗词列表返回的列，与 schemas.Poetry 的字段一一对应
+POETRY_LIST_COLUMNS = (
+    Poetry.title, Poetry.author, Poetry.dynasty, Poetry.content, Poetry.type, Poetry.tags,
+    Poetry.difficulty, Poetry.id, Poetry.created_at, Poetry.updated_at,
+)
+
 @app.get("/api/v1/poetry/list", response_model=schemas.PoetryListResponse)
 async def get_poetry_list(
     page: int = 1,
@@ -552,8 +623,8 @@ async def get_poetry_list(
     db: Session = Depends(get_db)
 ):
     try:
-        # 构建基础查询
-        query = db.query(Poetry)
+        # 构建基础查询（只取列，不构造ORM对象）
+        query = db.query(*POETRY_LIST_COLUMNS)
 
         # 添加过滤条件
         if dynasty:
@@ -567,25 +638,35 @@ async def get_poetry_list(
                 Poetry.author.contains(keyword)
             )
 
-        # 计算总数
-        total = query.count()
+        # 计算总数：仅按朝代/体裁筛选时直接取计数缓存，关键词搜索才需要 COUNT
+        if keyword:
+            total = query.count()
+        else:
+            total = poetry_facets.ensure_built(db).count(dynasty, type)
 
         # 分页
         poetry_list = query.offset((page - 1) * pageSize)\
                           .limit(pageSize)\
                           .all()
 
-        return {
+        # 数据直接来自数据库行，结构已符合 PoetryListResponse，跳过响应模型校验直接用 orjson 序列化
+        return ORJSONResponse({
             "success": True,
-            "data": poetry_list,
+            "data": [row._asdict() for row in poetry_list],
             "total": total,
             "page": page,
             "pageSize": pageSize
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting poetry list: {str(e)}")
         raise HTTPException(status_code=500, detail="获取诗词列表失败")
 
+# 注意：必须注册在 /api/v1/poetry/{poetry_id} 之前
+@app.get("/api/v1/poetry/facets", response_model=schemas.PoetryFacetsResponse)
+async def get_poetry_facets(db: Session = Depends(get_db)):
+    """诗词总数及按朝代、体裁、(朝代, 体裁) 的诗词数，供诗词库筛选使用"""
+    return ORJSONResponse({"success": True, **poetry_facets.ensure_built(db).facets()})
+
 @app.get("/api/v1/poetry/{poetry_id}", response_model=schemas.PoetryResponse)
 async def get_poetry_detail(
     poetry_id: int,
@@ -608,38 +689,44 @@ async def get_ai_starting_line(db: Session = Depends(get_db)) -> str:
     # Implementation of get_ai_starting_line function
     pass
 
-def clean_poem_line(line: str) -> str:
-    """Removes common punctuation and leading/trailing spaces from a poem line."""
-    if not line: 
-        return ""
-    # 移除常见标点符号： 中文的 ，。！？； 和英文的 ,.!?; 以及空格
-    cleaned_line = re.sub(r"[，。！？；,.!?;\s]+", "", line)
-    return cleaned_line.strip()
-
-@app.post("/api/v1/battles/{battle_id}/submit", response_model=ChainSubmitResponse, tags=["Battle Modes"])
-async def submit_battle_answer(
-    battle_id: int,
-    submission: ChainSubmitRequest,
-    current_user: User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
-):
-    battle = get_battle(db, battle_id=battle_id)
+def _random_poem_with_lines(db: Session, attempts: int, used: Optional[UsedLines] = None) -> Tuple[Optional[Poetry], List[str]]:
+    """随机抽取一首至少两句、首句不在本局已用诗句 used 中的诗，最多尝试 attempts 次；抽不到时返回 (None, [])"""
+    with tracer.span("random_poem_selection", **{"poem.max_attempts": attempts}) as span:
+        for attempt in range(1, attempts + 1):
+            poetry_id = difficulty_sampler.ensure_built(db).sample()
+            poetry = db.get(Poetry, poetry_id) if poetry_id is not None else None
+            if poetry and poetry.content:
+                lines = parse_poem_lines(poetry.content)
+                if len(lines) >= 2 and not (used and lines[0] in used):
+                    span.set_attributes(**{"poem.attempts": attempt, "poem.id": poetry.id})
+                    return poetry, lines
+        span.set_attribute("poem.attempts", attempts)
+        return None, []
+
+def _random_rhyme_question(db: Session, attempts: int = 20) -> Optional[str]:
+    """随机抽取一句五言或七言、且库中有其他诗句与之押韵的诗句作为韵脚接龙的题目"""
+    index = line_index.ensure_built(db)
+    for _ in range(attempts):
+        line = index.random_line(min_len=5, max_len=7)
+        if line and index.random_rhyming_line(line[-1], exclude={line}):
+            return line
+    return None
+
+def _get_battle_for_submit(db: Session, battle_id: int, current_user: User) -> Battle:
+    with tracer.span("battle_load", **{"battle.id": battle_id}) as span:
+        battle = get_battle(db, battle_id=battle_id)
+        if battle:
+            span.set_attributes(**{"battle.type": battle.battle_type, "battle.rounds": battle.rounds})
     if not battle:
         raise HTTPException(status_code=404, detail="Battle not found.")
     if battle.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to submit to this battle.")
     if battle.status != "active":
         raise HTTPException(status_code=400, detail=f"Battle is not active (current status: {battle.status}).")
+    return battle
 
-    user_answer_raw = submission.answer
-    user_answer_cleaned = clean_poem_line(user_answer_raw)
-    is_correct_answer = False
-    message = ""
-    # next_q_for_normal is effectively battle.current_question for the *next* round
-    # ai_next_line_for_smart is effectively battle.current_question for the *next* round in smart mode
-    points_this_round = 0
-    
-    round_data_for_append = {
+def _new_round_record(battle: Battle, user_answer_raw: str) -> Dict[str, Any]:
+    return {
         "round_num": battle.current_round_num,
         "question": battle.current_question, # Question for the round being submitted
         "user_answer": user_answer_raw,
@@ -648,110 +735,445 @@ async def submit_battle_answer(
         "points_awarded": 0
     }
 
-    if battle.battle_type == "normal_chain":
-        if not battle.expected_answer:
-            logger.error(f"Normal chain battle {battle.id} has no expected_answer for question '{battle.current_question}'")
-            # This might happen if a poem ends and expected_answer was set to None, 
-            # but the logic for continuous random poems should prevent this specific state 
-            # from being the primary check after the first round.
-            # For now, let's assume if expected_answer is None, it's an error for continuous mode before a new Q is set.
-            # However, the original design for single poem did have expected_answer=None for the last line.
-            # For this new continuous mode, every active round *must* have an expected_answer.
-            raise HTTPException(status_code=500, detail="Error in battle state: no expected answer for normal chain.")
-        
-        expected_answer_cleaned = clean_poem_line(battle.expected_answer)
-        
-        if user_answer_cleaned == expected_answer_cleaned:
-            is_correct_answer = True
+@tracer.traced("judge_normal_chain")
+def _judge_normal_chain(battle: Battle, user_answer_raw: str, db: Session) -> Tuple[bool, str, int]:
+    """判定普通接龙的回答，答对时直接出下一题；返回 (是否正确, 提示信息, 本轮得分)"""
+    if not battle.expected_answer:
+        logger.error("Normal chain battle %s has no expected_answer for question '%s'", battle.id, battle.current_question)
+        # This might happen if a poem ends and expected_answer was set to None, 
+        # but the logic for continuous random poems should prevent this specific state 
+        # from being the primary check after the first round.
+        # For now, let's assume if expected_answer is None, it's an error for continuous mode before a new Q is set.
+        # However, the original design for single poem did have expected_answer=None for the last line.
+        # For this new continuous mode, every active round *must* have an expected_answer.
+        raise HTTPException(status_code=500, detail="Error in battle state: no expected answer for normal chain.")
+    
+    user_answer_cleaned = canonical_line(user_answer_raw)
+    expected_answer_cleaned = canonical_line(battle.expected_answer)
+    
+    near_miss = False
+    if user_answer_cleaned and user_answer_cleaned != expected_answer_cleaned and settings.LINE_FUZZY_MAX_DISTANCE > 0:
+        # 只差个别字（编辑距离在阈值内）时给部分分，并告知正确答案
+        near_miss = bounded_edit_distance(user_answer_cleaned, expected_answer_cleaned,
+                                          settings.LINE_FUZZY_MAX_DISTANCE) <= settings.LINE_FUZZY_MAX_DISTANCE
+
+    if user_answer_cleaned and (user_answer_cleaned == expected_answer_cleaned or near_miss):
+        if near_miss:
+            message = f"差一点！正确答案为：{battle.expected_answer}。"
+            points_this_round = 5
+        else:
             message = "回答正确！"
             points_this_round = 10 
-            battle.score += points_this_round
-            
-            # --- New logic for continuous random poems --- 
-            new_question_generated = False
-            for _ in range(5): # Try a few times to get a valid new poem
-                new_random_poetry = db.query(Poetry).order_by(func.random()).first()
-                if new_random_poetry and new_random_poetry.content:
-                    new_lines = parse_poem_lines(new_random_poetry.content)
-                    if len(new_lines) >= 2:
-                        battle.current_question = new_lines[0]
-                        battle.expected_answer = new_lines[1]
-                        battle.current_poetry_id = new_random_poetry.id
-                        new_question_generated = True
-                        break 
-            
-            if not new_question_generated:
-                # Could not find a suitable new poem/question after retries
-                message += " 系统暂时没有更多题目了，恭喜你完成了本次挑战！"
-                battle.status = "completed_win" # User wins as system can't provide more questions
-                battle.current_question = None # Clear question as game is over
-                battle.expected_answer = None
-            # --- End of new logic --- 
-
-        else: # Answer is incorrect
-            is_correct_answer = False
-            message = f"回答错误。正确答案应为：{battle.expected_answer}"
-            points_this_round = -5 
-            battle.score = max(0, battle.score + points_this_round)
-            battle.status = "completed_lose"
+        battle.score += points_this_round
+        
+        # --- New logic for continuous random poems --- 
+        new_question_generated = False
+        new_random_poetry, new_lines = _random_poem_with_lines(db, attempts=5, used=used_lines_of(battle))
+        if new_random_poetry:
+            battle.current_question = new_lines[0]
+            battle.expected_answer = new_lines[1]
+            battle.current_poetry_id = new_random_poetry.id
+            new_question_generated = True
+        
+        if not new_question_generated:
+            # Could not find a suitable new poem/question after retries
+            message += " 系统暂时没有更多题目了，恭喜你完成了本次挑战！"
+            battle.status = "completed_win" # User wins as system can't provide more questions
             battle.current_question = None # Clear question as game is over
             battle.expected_answer = None
+        # --- End of new logic --- 
+        return True, message, points_this_round
+
+    # Answer is incorrect
+    message = f"回答错误。正确答案应为：{battle.expected_answer}"
+    points_this_round = -5 
+    battle.score = max(0, battle.score + points_this_round)
+    battle.status = "completed_lose"
+    battle.current_question = None # Clear question as game is over
+    battle.expected_answer = None
+    return False, message, points_this_round
+
+async def _judge_smart_chain(battle: Battle, user_answer_raw: str, round_data: Dict[str, Any], db: Session) -> Tuple[bool, str, int]:
+    """判定智能接龙的回答（不含AI接下一句）；返回 (是否正确, 提示信息, 本轮得分)"""
+    used = used_lines_of(battle)
+    if user_answer_raw in used:
+        ai_is_correct, ai_message = False, "这句诗本局已经出现过了，不能重复使用。"
+    else:
+        ai_is_correct, ai_message = await judge_user_line_by_ai(battle.current_question, user_answer_raw, db=db)
+    round_data["ai_judgement"] = ai_message
+
+    if ai_is_correct:
+        points_this_round = 15
+        battle.score += points_this_round
+        # AI接下一句时不能重复玩家这句
+        used.add(user_answer_raw)
+    else:
+        points_this_round = -7
+        battle.score = max(0, battle.score + points_this_round)
+        battle.status = "completed_lose"
+        battle.current_question = None # Clear question
+    return ai_is_correct, ai_message, points_this_round
+
+@tracer.traced("judge_rhyme_chain")
+def _judge_rhyme_chain(battle: Battle, user_answer_raw: str, db: Session) -> Tuple[bool, str, int]:
+    """
+    判定韵脚接龙的回答：须是库中诗句，且尾字与题目尾字押韵；答对时AI从同韵诗句中接出下一题。
+    判定与AI接句都是诗句索引上的哈希查找。返回 (是否正确, 提示信息, 本轮得分)
+    """
+    index = line_index.ensure_built(db)
+    used = used_lines_of(battle)
+    question = canonical_line(battle.current_question or "")
+    user_answer_cleaned = canonical_line(user_answer_raw)
+
+    if user_answer_cleaned not in index:
+        reason = "诗词库中没有这句诗"
+    elif user_answer_cleaned in used:
+        reason = "这句诗本局已经出现过"
+    elif not check_rhyme_chain_valid(question, user_answer_cleaned)[0]:
+        reason = "韵脚不押"
+    else:
+        points_this_round = 10
+        battle.score += points_this_round
+        used.add(user_answer_cleaned)
+        ai_next_line = index.random_rhyming_line(user_answer_cleaned[-1], exclude=used)
+        if ai_next_line:
+            battle.current_poetry_id = index.poetry_id_of(ai_next_line)
+        return True, _apply_ai_next_line(battle, ai_next_line, "回答正确！"), points_this_round
+
+    example = index.random_rhyming_line(question[-1], exclude=used) if question else None
+    message = f"回答错误：{reason}。" + (f"可以接：{example}" if example else "")
+    points_this_round = -5
+    battle.score = max(0, battle.score + points_this_round)
+    battle.status = "completed_lose"
+    battle.current_question = None
+    return False, message, points_this_round
+
+def _apply_ai_next_line(battle: Battle, ai_next_line: Optional[str], message: str) -> str:
+    """AI接出的下一句作为新题目；AI接不上时玩家获胜"""
+    if not ai_next_line:
+        message += " AI已词穷，恭喜你获胜！"
+        battle.status = "completed_win"
+        battle.current_question = None # Clear question
+    else:
+        battle.current_question = ai_next_line
+    return message
 
-    elif battle.battle_type == "smart_chain":
-        # Smart chain logic
-        # ai_is_correct, ai_message = await check_ai_poetry_chain(battle.current_question, user_answer_raw, db=db) # <--- 注释或删除错误的调用
-        ai_is_correct, ai_message = await judge_user_line_by_ai(battle.current_question, user_answer_raw, db=db) # <--- 使用新的正确函数
-        is_correct_answer = ai_is_correct
-        message = ai_message
-        round_data_for_append["ai_judgement"] = ai_message
-
-        if is_correct_answer:
-            points_this_round = 15
-            battle.score += points_this_round
-            # ai_next_line_for_smart = await get_ai_response_to_line(user_answer_raw, db=db) # <--- 修改这里
-            ai_next_line_for_smart = llm_service.get_ai_response_to_line(user_answer_raw, db=db) # <---确保通过模块名调用，如果未单独导入
-            if not ai_next_line_for_smart:
-                message += " AI已词穷，恭喜你获胜！"
-                battle.status = "completed_win"
-                battle.current_question = None # Clear question
-            else:
-                battle.current_question = ai_next_line_for_smart
-        else:
-            points_this_round = -7
-            battle.score = max(0, battle.score + points_this_round)
-            battle.status = "completed_lose"
-            battle.current_question = None # Clear question
-    
-    round_data_for_append["is_correct"] = is_correct_answer
-    round_data_for_append["points_awarded"] = points_this_round
+def _record_round(battle: Battle, round_data: Dict[str, Any], is_correct_answer: bool, points_this_round: int):
+    """把本轮结果记入对战（不提交）"""
+    round_data["is_correct"] = is_correct_answer
+    round_data["points_awarded"] = points_this_round
     
     battle.rounds += 1
     if not isinstance(battle.battle_records, list):
         battle.battle_records = []
-    battle.battle_records.append(round_data_for_append)
+    battle.battle_records.append(round_data)
+    # 答对的诗句与新题目记入已用诗句，之后出题、接句都不再重复
+    used = used_lines_of(battle)
+    if is_correct_answer:
+        used.add(round_data["user_answer"])
+    if battle.status == "active":
+        used.add(battle.current_question)
+    # JSON 列的原地修改不会被自动追踪，需显式标记
+    flag_modified(battle, "battle_records")
+    flag_modified(battle, "used_lines")
 
     if battle.status == "active":
         battle.current_round_num += 1
         # For normal_chain, current_question and expected_answer are already updated if correct
         # For smart_chain, current_question is already updated if AI can respond
     else: 
-        logger.info(f"Battle {battle.id} ended. Status: {battle.status}, Score: {battle.score}")
+        logger.info("Battle %s ended. Status: %s, Score: %s", battle.id, battle.status, battle.score)
 
-    db.add(battle) 
-    db.commit()
-    db.refresh(battle)
+def _after_round_committed(battle: Battle, db: Session):
+    if battle.battle_type == "smart_chain":
+        if battle.status == "active":
+            llm_service.prefetch_ai_responses(battle.id, battle.current_question, db)
+        else:
+            llm_service.prefetch_buffer.discard(battle.id)
+
+def _round_delta(battle: Battle, round_data: Optional[Dict[str, Any]], is_correct_answer: bool, message: str) -> BattleRoundDelta:
+    return BattleRoundDelta(
+        battle_id=battle.id,
+        is_correct=is_correct_answer,
+        message=message,
+        round=schemas.RoundRecord(**round_data) if round_data else None,
+        score=battle.score,
+        status=battle.status,
+        current_round_num=battle.current_round_num,
+        next_question=battle.current_question if battle.status == "active" else None,
+    )
+
+def _commit_round(db: Session, battle: Battle, round_data: Dict[str, Any], is_correct_answer: bool,
+                  message: str, points_this_round: int, compact: bool = False) -> Union[ChainSubmitResponse, BattleRoundDelta]:
+    _record_round(battle, round_data, is_correct_answer, points_this_round)
 
-    final_round_record_obj = schemas.RoundRecord(**round_data_for_append)
+    with tracer.span("commit", **{"battle.id": battle.id, "battle.status": battle.status}):
+        db.add(battle) 
+        db.commit()
+        db.refresh(battle)
+    _after_round_committed(battle, db)
+
+    if compact:
+        return _round_delta(battle, round_data, is_correct_answer, message)
+
+    final_round_record_obj = schemas.RoundRecord(**round_data)
 
     return ChainSubmitResponse(
         is_correct=is_correct_answer,
         message=message,
         next_question=battle.current_question if battle.status == "active" else None, 
-        ai_next_line=battle.current_question if battle.status == "active" and battle.battle_type == "smart_chain" else None, 
+        ai_next_line=battle.current_question if battle.status == "active" and battle.battle_type in ("smart_chain", "rhyme_chain") else None, 
         updated_battle_state=BattleResponse.model_validate(battle),
         current_round_record=final_round_record_obj
     )
 
+@app.get("/api/v1/battles/{battle_id}", response_model=BattleResponse, tags=["Battle Modes"])
+async def get_battle_detail(
+    battle_id: int,
+    request: Request,
+    current_user: User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    对战的完整状态（含全部回合记录）。
+    带 ETag，客户端以 If-None-Match 重新验证，状态未变时返回 304，不再序列化回合记录。
+    """
+    battle = get_battle(db, battle_id=battle_id)
+    if not battle:
+        raise HTTPException(status_code=404, detail="Battle not found.")
+    if battle.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this battle.")
+
+    updated_at = battle.updated_at.isoformat() if battle.updated_at else ""
+    etag = f'W/"battle-{battle.id}-{battle.rounds}-{battle.current_round_num}-{battle.status}-{battle.score}-{updated_at}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=BattleResponse.model_validate(battle).model_dump(mode="json"), headers=headers)
+
+@app.post("/api/v1/battles/{battle_id}/submit", response_model=Union[ChainSubmitResponse, BattleRoundDelta], tags=["Battle Modes"])
+async def submit_battle_answer(
+    battle_id: int,
+    submission: ChainSubmitRequest,
+    compact: bool = Query(False, description="只返回本轮增量（BattleRoundDelta），完整状态通过 GET /api/v1/battles/{battle_id} 获取"),
+    current_user: User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    battle = _get_battle_for_submit(db, battle_id, current_user)
+
+    user_answer_raw = submission.answer
+    is_correct_answer = False
+    message = ""
+    points_this_round = 0
+    round_data_for_append = _new_round_record(battle, user_answer_raw)
+
+    if battle.battle_type == "normal_chain":
+        is_correct_answer, message, points_this_round = _judge_normal_chain(battle, user_answer_raw, db)
+
+    elif battle.battle_type == "smart_chain":
+        is_correct_answer, message, points_this_round = await _judge_smart_chain(battle, user_answer_raw, round_data_for_append, db)
+        if is_correct_answer:
+            # 优先使用出题时预取的AI回复；未命中时在线程池中调用，避免阻塞事件循环，并让相同尾字的并发请求得以合并
+            ai_next_line_for_smart = llm_service.take_prefetched_response(battle.id, user_answer_raw)
+            if not ai_next_line_for_smart:
+                ai_next_line_for_smart = await run_in_threadpool(llm_service.get_ai_response_to_line, user_answer_raw, db)
+            ai_next_line_for_smart = llm_service.avoid_used_line(ai_next_line_for_smart, user_answer_raw, used_lines_of(battle), db)
+            message = _apply_ai_next_line(battle, ai_next_line_for_smart, message)
+
+    elif battle.battle_type == "rhyme_chain":
+        is_correct_answer, message, points_this_round = _judge_rhyme_chain(battle, user_answer_raw, db)
+
+    return _commit_round(db, battle, round_data_for_append, is_correct_answer, message, points_this_round, compact)
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _stream_ai_next_line(user_answer_raw: str, db: Session):
+    """在线程池中流式请求AI的下一句，依次产出 ("token", 片段)，最后产出 ("line", 校验后的诗句)"""
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+    on_token = lambda text: loop.call_soon_threadsafe(tokens.put_nowait, text)
+    task = asyncio.ensure_future(run_in_threadpool(llm_service.stream_ai_response_to_line, user_answer_raw, db, on_token))
+    while not task.done() or not tokens.empty():
+        getter = asyncio.ensure_future(tokens.get())
+        done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            yield "token", getter.result()
+        else:
+            getter.cancel()
+    yield "line", task.result()
+
+@app.post("/api/v1/battles/{battle_id}/submit/stream", tags=["Battle Modes"])
+async def submit_battle_answer_stream(
+    battle_id: int,
+    submission: ChainSubmitRequest,
+    compact: bool = Query(False, description="state 事件只包含本轮增量（BattleRoundDelta）"),
+    current_user: User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    提交回答的流式版本（Server-Sent Events），依次推送：
+    - judgement：判定结果（是否正确、提示信息、本轮得分），判定完成后立即发送
+    - token：智能接龙中AI下一句的草稿片段（随大模型输出逐段到达，以最终状态为准）
+    - state：提交完成后的结果，结构同 /submit 的返回（compact=true 时为本轮增量）
+    - error：处理过程中出错
+    """
+    battle = _get_battle_for_submit(db, battle_id, current_user)
+    user_answer_raw = submission.answer
+    round_data_for_append = _new_round_record(battle, user_answer_raw)
+
+    async def events():
+        try:
+            is_correct_answer, message, points_this_round = False, "", 0
+            if battle.battle_type == "normal_chain":
+                is_correct_answer, message, points_this_round = _judge_normal_chain(battle, user_answer_raw, db)
+            elif battle.battle_type == "smart_chain":
+                is_correct_answer, message, points_this_round = await _judge_smart_chain(battle, user_answer_raw, round_data_for_append, db)
+            elif battle.battle_type == "rhyme_chain":
+                is_correct_answer, message, points_this_round = _judge_rhyme_chain(battle, user_answer_raw, db)
+
+            yield _sse_event("judgement", {
+                "round_num": round_data_for_append["round_num"],
+                "is_correct": is_correct_answer,
+                "message": message,
+                "points_awarded": points_this_round,
+            })
+
+            if battle.battle_type == "smart_chain" and is_correct_answer:
+                ai_next_line_for_smart = llm_service.take_prefetched_response(battle.id, user_answer_raw)
+                if ai_next_line_for_smart:
+                    yield _sse_event("token", {"text": ai_next_line_for_smart})
+                else:
+                    async for kind, value in _stream_ai_next_line(user_answer_raw, db):
+                        if kind == "token":
+                            yield _sse_event("token", {"text": value})
+                        else:
+                            ai_next_line_for_smart = value
+                ai_next_line_for_smart = llm_service.avoid_used_line(ai_next_line_for_smart, user_answer_raw, used_lines_of(battle), db)
+                message = _apply_ai_next_line(battle, ai_next_line_for_smart, message)
+
+            response = _commit_round(db, battle, round_data_for_append, is_correct_answer, message, points_this_round, compact)
+            yield _sse_event("state", response.model_dump(mode="json"))
+        except Exception as e:
+            db.rollback()
+            logger.error("Streaming submit for battle %s failed: %s", battle_id, e, exc_info=True)
+            detail = e.detail if isinstance(e, HTTPException) else "提交回答失败"
+            yield _sse_event("error", {"detail": detail})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _close_stale_battle_websocket(websocket: WebSocket, battle_id: int):
+    """对战已通过 HTTP 接口提交或放弃，会话手上的副本已过期：通知客户端后关闭连接"""
+    logger.info("Battle %s was changed outside its WebSocket session, closing.", battle_id)
+    await websocket.send_json({"type": "error", "detail": "对战已在其他地方更新或结束，请重新加载对战。"})
+    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+
+@app.websocket("/api/v1/battles/{battle_id}/ws")
+async def battle_websocket(websocket: WebSocket, battle_id: int):
+    """
+    对战的 WebSocket 通道：连接期间只认证一次，对战状态保存在服务端，每轮只交换增量。
+    协议（JSON 消息）：
+    - 客户端先发 {"type": "auth", "token": "<JWT>"}，服务端回 {"type": "state", "battle": 完整对战}
+    - {"type": "submit", "answer": "..."}：服务端依次回 judgement、token（智能接龙AI下一句的草稿片段）、
+      round（BattleRoundDelta）；对战结束后服务端关闭连接
+    - {"type": "abort"}：放弃对战，回 round 后关闭连接
+    - {"type": "ping"}：回 {"type": "pong"}
+    出错时回 {"type": "error", "detail": "..."}。状态变更经单写线程 battle_writer 落库；
+    对战在连接期间被 HTTP 接口提交或放弃时，回 error 并关闭连接，不覆盖其结果。
+    """
+    await websocket.accept()
+    try:
+        message = await websocket.receive_json()
+        db = SessionLocal()
+        try:
+            if not isinstance(message, dict) or message.get("type") != "auth":
+                raise HTTPException(status_code=401, detail="请先认证")
+            current_user = auth.get_user_from_token(message.get("token") or "", db)
+            battle = _get_battle_for_submit(db, battle_id, current_user)
+            db.expunge(battle)
+        finally:
+            db.close()
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    except WebSocketDisconnect:
+        return
+
+    await websocket.send_json({"type": "state", "battle": BattleResponse.model_validate(battle).model_dump(mode="json")})
+
+    try:
+        while battle.status == "active":
+            message = await websocket.receive_json()
+            message_type = message.get("type") if isinstance(message, dict) else None
+            if message_type == "ping":
+                await websocket.send_json({"type": "pong"})
+                continue
+            if message_type == "abort":
+                expected_round_num = battle.current_round_num
+                battle.status = "aborted"
+                battle.current_question = None
+                battle.expected_answer = None
+                if not await asyncio.wrap_future(battle_writer.save(battle, expected_round_num)):
+                    await _close_stale_battle_websocket(websocket, battle_id)
+                    return
+                llm_service.prefetch_buffer.discard(battle.id)
+                await websocket.send_json({"type": "round", **_round_delta(battle, None, False, "对战已放弃").model_dump(mode="json")})
+                break
+            if message_type != "submit" or not isinstance(message.get("answer"), str):
+                await websocket.send_json({"type": "error", "detail": "无法识别的消息"})
+                continue
+
+            user_answer_raw = message["answer"]
+            expected_round_num = battle.current_round_num
+            round_data = _new_round_record(battle, user_answer_raw)
+            # WebSocket 不经过 HTTP 中间件，每轮提交单独作为一条链路
+            with tracer.span("ws.submit", **{"battle.id": battle.id, "battle.round": round_data["round_num"]}):
+                db = SessionLocal()
+                try:
+                    is_correct_answer, result_message, points_this_round = False, "", 0
+                    if battle.battle_type == "normal_chain":
+                        is_correct_answer, result_message, points_this_round = _judge_normal_chain(battle, user_answer_raw, db)
+                    elif battle.battle_type == "smart_chain":
+                        is_correct_answer, result_message, points_this_round = await _judge_smart_chain(battle, user_answer_raw, round_data, db)
+                    elif battle.battle_type == "rhyme_chain":
+                        is_correct_answer, result_message, points_this_round = _judge_rhyme_chain(battle, user_answer_raw, db)
+                    await websocket.send_json({"type": "judgement", "round_num": round_data["round_num"], "is_correct": is_correct_answer,
+                                               "message": result_message, "points_awarded": points_this_round})
+
+                    if battle.battle_type == "smart_chain" and is_correct_answer:
+                        ai_next_line = llm_service.take_prefetched_response(battle.id, user_answer_raw)
+                        if ai_next_line:
+                            await websocket.send_json({"type": "token", "text": ai_next_line})
+                        else:
+                            async for kind, value in _stream_ai_next_line(user_answer_raw, db):
+                                if kind == "token":
+                                    await websocket.send_json({"type": "token", "text": value})
+                                else:
+                                    ai_next_line = value
+                        ai_next_line = llm_service.avoid_used_line(ai_next_line, user_answer_raw, used_lines_of(battle), db)
+                        result_message = _apply_ai_next_line(battle, ai_next_line, result_message)
+
+                    _record_round(battle, round_data, is_correct_answer, points_this_round)
+                    with tracer.span("commit", **{"battle.id": battle.id, "battle.status": battle.status}):
+                        saved = await asyncio.wrap_future(battle_writer.save(battle, expected_round_num))
+                    if not saved:
+                        await _close_stale_battle_websocket(websocket, battle_id)
+                        return
+                    _after_round_committed(battle, db)
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "detail": e.detail})
+                    break
+                finally:
+                    db.close()
+            await websocket.send_json({"type": "round", **_round_delta(battle, round_data, is_correct_answer, result_message).model_dump(mode="json")})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("WebSocket for battle %s disconnected.", battle_id)
+    except Exception as e:
+        logger.error("WebSocket session for battle %s failed: %s", battle_id, e, exc_info=True)
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
 @app.post("/api/v1/battles/{battle_id}/abort", response_model=BattleResponse, tags=["Battle Modes"])
 async def abort_battle(
     battle_id: int,
@@ -784,13 +1206,6 @@ async def abort_battle(
     db.add(battle)
     db.commit()
     db.refresh(battle)
-    logger.info(f"Battle {battle.id} for user {current_user.id} was aborted by the user.")
+    llm_service.prefetch_buffer.discard(battle.id)
+    logger.info("Battle %s for user %s was aborted by the user.", battle.id, current_user.id)
     return battle
-
-# Helper function to parse poem content into lines
-def parse_poem_lines(content: str) -> List[str]:
-    if not content:
-        return []
-    # Splits by common Chinese and English delimiters, keeps non-empty lines
-    lines = re.split(r'[，。！？；,.!?;\n\r]+', content) 
-    return [line.strip() for line in lines if line.strip()]
\ No newline at end of file
@@ -1,18 +1,24 @@
 # backend/app/models/battle.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
 
 class Battle(Base):
     __tablename__ = "battles"
+    __table_args__ = (
+        # get_active_battle: user_id = ? AND status = 'active'
+        Index("ix_battles_user_status", "user_id", "status"),
+        # 排行榜: season_id = ? GROUP BY user_id，覆盖 score/status 聚合列
+        Index("ix_battles_season_user", "season_id", "user_id", "status", "score"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     season_id = Column(Integer, ForeignKey("seasons.id"), nullable=False)
     score = Column(Integer, default=0)
     status = Column(String(20), default="pending")  # pending, active, completed_win, completed_lose, aborted
-    battle_type = Column(String(50), nullable=False) # e.g., "normal_chain", "smart_chain"
+    battle_type = Column(String(50), nullable=False) # e.g., "normal_chain", "smart_chain", "rhyme_chain"
     
     current_question = Column(String(500), nullable=True)
     expected_answer = Column(String(500), nullable=True)  # For normal_chain mode
@@ -21,6 +27,7 @@ class Battle(Base):
     rounds = Column(Integer, default=0)  # Total rounds played in this battle
     current_round_num = Column(Integer, default=1) # Renamed from current_round
     battle_records = Column(JSON, default=list) # Default to list for easier appending
+    used_lines = Column(JSON, default=list) # 本局已出现诗句的哈希（见 services/used_lines.py），防止重复出题/接句
     
     total_time = Column(Integer, default=0) 
     avg_response_time = Column(Float, default=0.0) 
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
 
 class Poetry(Base):
     __tablename__ = "poetry"
+    __table_args__ = (
+        # 诗词库筛选: dynasty = ? [AND type = ?]，以及单独按 type 筛选
+        Index("ix_poetry_dynasty_type", "dynasty", "type"),
+        Index("ix_poetry_type", "type"),
+        # 爬虫查重: title = ? AND author = ?
+        Index("ix_poetry_title_author", "title", "author"),
+        # 按难度分档抽题: ORDER BY difficulty_score
+        Index("ix_poetry_difficulty_score", "difficulty_score"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
@@ -14,6 +23,8 @@ class Poetry(Base):
     type = Column(String(20), nullable=False)
     tags = Column(String(200))
     difficulty = Column(Integer, default=1)
+    # 预计算的难度分（0 最易，1 最难），见 services/poetry_difficulty.py；未计算时为空
+    difficulty_score = Column(Float, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
 
 class Season(Base):
     __tablename__ = "seasons"
+    __table_args__ = (
+        # 当前赛季: status = 'active' ORDER BY id DESC
+        Index("ix_seasons_status_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -0,0 +1,198 @@
+"""
+诗句规范化。普通接龙、智能接龙、诗句索引和同音判断共用同一规范形式：
+
+    canonical_line("好的，請看：「床前明月光」") == "床前明月光"
+
+规范形式 = 繁体/异体字折叠为简体规范字 -> 去掉括号注释与 LLM 客套前后缀 -> 只保留汉字。
+canonical_line 带缓存，同一请求中对同一输入的多次调用只计算一次；批量处理（建索引）用不缓存的 normalize_line。
+韵脚按《中华新韵》十四韵由拼音韵母归部（char_rhyme），供韵脚接龙使用。
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from pypinyin import pinyin, Style
+
+from .charmap import FOLD_PAIRS
+
+# 诗句分隔符：中英文逗号、句号、问号、感叹号、分号及换行
+_LINE_SPLIT_RE = re.compile(r'[，。！？；,.!?;\n\r]+')
+# 非汉字字符（CJK 统一表意文字基本区之外）
+_NON_CJK_RE = re.compile(r'[^一-鿿]+')
+
+# LLM 回复中的注释：圆括号/方括号内容，以及花括号内容（两者依次各做一遍，顺序影响嵌套时的结果）
+_BRACKET_RE = re.compile(r"[（\(\[].*?[）\)\]]")
+_BRACE_RE = re.compile(r"\{.*?\}")
+# LLM 常用的客套前缀/后缀；按顺序逐个剥离，元组形式可先用一次 startswith/endswith 判断是否需要剥离
+_LLM_PREFIXES = (
+    "好的，请看：", "好的，这句是：", "请看：", "这句是：",
+    "我接的是：", "我的是：", "答案是：", "当然，这是下一句：",
+    "没问题，请看下句：", "我来了：", "这是我的回答：", "诗句是：",
+)
+_LLM_SUFFIXES = ("你看如何？", "怎么样？", "希望你喜欢。", "请指正。")
+# 清理后只剩一个字时仍视为有效的数字
+_SINGLE_CHAR_NUMERALS = frozenset("一二三四五六七八九十")
+
+def _build_fold_table() -> Dict[int, str]:
+    table = {ord(FOLD_PAIRS[i]): FOLD_PAIRS[i + 1] for i in range(0, len(FOLD_PAIRS), 2)}
+    # CJK 兼容表意文字（U+F900-FAFF）按 NFKC 映射到统一表意文字，否则会被当作非汉字丢弃
+    for code in range(0xF900, 0xFB00):
+        mapped = unicodedata.normalize("NFKC", chr(code))
+        if mapped != chr(code) and len(mapped) == 1 and '一' <= mapped <= '鿿':
+            table[code] = table.get(ord(mapped), mapped)
+    return table
+
+_FOLD_TABLE = _build_fold_table()
+_FOLD_CHARS_RE = re.compile("[" + "".join(sorted(chr(code) for code in _FOLD_TABLE)) + "]")
+
+def parse_poem_lines(content: str) -> List[str]:
+    """将诗词正文拆分为诗句，保留非空的句子"""
+    if not content:
+        return []
+    # Splits by common Chinese and English delimiters, keeps non-empty lines
+    lines = _LINE_SPLIT_RE.split(content)
+    return [line.strip() for line in lines if line.strip()]
+
+def fold_chars(text: str) -> str:
+    """繁体字、异体字与兼容表意文字折叠为简体规范字，其余字符不变"""
+    # 绝大多数输入已是简体，先用一次正则扫描判断，避免逐字查表
+    if not _FOLD_CHARS_RE.search(text):
+        return text
+    return text.translate(_FOLD_TABLE)
+
+def clean_llm_line(line: str) -> str:
+    """
+    清理 LLM 返回或用户输入的诗句：移除括号注释和常见前缀/后缀，然后只保留汉字。
+    清理后不足两个汉字（单个数字除外）视为空。
+    """
+    if not line:
+        return ""
+    line = _BRACE_RE.sub("", _BRACKET_RE.sub("", line))
+    if line.startswith(_LLM_PREFIXES):
+        for prefix in _LLM_PREFIXES:
+            if line.startswith(prefix):
+                line = line[len(prefix):].lstrip()
+    if line.endswith(_LLM_SUFFIXES):
+        for suffix in _LLM_SUFFIXES:
+            if line.endswith(suffix):
+                line = line[:-len(suffix)].rstrip()
+    # 引号、标点、字母等都不是汉字，统一在这一步去掉
+    cleaned = _NON_CJK_RE.sub("", line)
+    if len(cleaned) <= 1 and cleaned not in _SINGLE_CHAR_NUMERALS:
+        return ""
+    return cleaned
+
+def normalize_line(line: str) -> str:
+    """诗句的规范形式（不缓存）；先折叠字形，使繁体的客套前缀也能被识别"""
+    if not line:
+        return ""
+    return clean_llm_line(fold_chars(line))
+
+@lru_cache(maxsize=65536)
+def canonical_line(line: str) -> str:
+    """诗句的规范形式；所有诗句比较与索引查找都应使用它"""
+    return normalize_line(line)
+
+@lru_cache(maxsize=65536)
+def char_readings(char: str) -> frozenset:
+    """单个汉字（折叠后）的所有无声调读音（含多音字）"""
+    char = fold_chars(char)
+    if not char or not '一' <= char <= '鿿':
+        return frozenset()
+    return frozenset(pinyin(char, style=Style.NORMAL, heteronym=True)[0])
+
+# 声母，按长度降序排列，保证 zh/ch/sh 先于 z/c/s 匹配；y/w 单独处理
+_INITIALS = ("zh", "ch", "sh", "b", "p", "m", "f", "d", "t", "n", "l", "g", "k", "h", "j", "q", "x", "r", "z", "c", "s")
+# 舌尖元音 -i 自成一部（支），不与 i（齐）相押
+_APICAL_SYLLABLES = frozenset(("zhi", "chi", "shi", "ri", "zi", "ci", "si"))
+# 韵母 -> 《中华新韵》韵部；ü 写作 v，与 pypinyin 一致
+_RHYME_GROUPS = {
+    **dict.fromkeys(("a", "ia", "ua"), "麻"),
+    **dict.fromkeys(("o", "uo", "e", "io"), "波"),
+    **dict.fromkeys(("ie", "ve"), "皆"),
+    **dict.fromkeys(("ai", "uai"), "开"),
+    **dict.fromkeys(("ei", "uei"), "微"),
+    **dict.fromkeys(("ao", "iao"), "豪"),
+    **dict.fromkeys(("ou", "iou"), "尤"),
+    **dict.fromkeys(("an", "ian", "uan", "van"), "寒"),
+    **dict.fromkeys(("en", "in", "uen", "vn"), "文"),
+    **dict.fromkeys(("ang", "iang", "uang"), "唐"),
+    **dict.fromkeys(("eng", "ing", "ueng", "ong", "iong"), "庚"),
+    **dict.fromkeys(("i", "v", "er"), "齐"),
+    "u": "姑",
+}
+
+def syllable_rhyme(syllable: str) -> Optional[str]:
+    """无声调拼音音节所属的韵部；叹词（n、ng、hm 等）没有韵部，返回 None"""
+    if syllable in _APICAL_SYLLABLES:
+        return "支"
+    initial = next((i for i in _INITIALS if syllable.startswith(i)), "")
+    final = syllable[len(initial):]
+    if initial == "" and final.startswith("y"):
+        # yu/yue/yuan/yun 是 ü 行，其余 y 开头的补回 i：ya -> ia，yi -> i
+        final = final[1:]
+        if final.startswith("u"):
+            final = "v" + final[1:]
+        elif not final.startswith("i"):
+            final = "i" + final
+    elif initial == "" and final.startswith("w"):
+        final = final[1:] if final == "wu" else "u" + final[1:]
+    elif initial in ("j", "q", "x") and final.startswith("u"):
+        final = "v" + final[1:]
+    # 拼写省略的韵腹：iu -> iou，ui -> uei，un -> uen
+    final = {"iu": "iou", "ui": "uei", "un": "uen"}.get(final, final)
+    return _RHYME_GROUPS.get(final)
+
+@lru_cache(maxsize=65536)
+def char_rhyme(char: str) -> Optional[str]:
+    """
+    单个汉字（折叠后）的韵部。只取最常用的读音：pypinyin 的多音字表里收有大量罕见读音
+    （如“月”也读 ru），全部计入会让几乎每个字都同时属于好几个韵部。
+    """
+    char = fold_chars(char)
+    if not char or not '一' <= char <= '鿿':
+        return None
+    return syllable_rhyme(pinyin(char, style=Style.NORMAL)[0][0])
+
+def are_chars_rhyming(char1: str, char2: str) -> bool:
+    """两个汉字是否押韵（同属一个韵部）"""
+    if not char1 or not char2:
+        return False
+    rhyme = char_rhyme(char1)
+    return rhyme is not None and rhyme == char_rhyme(char2)
+
+def are_chars_homophones_or_same(char1: str, char2: str) -> bool:
+    """
+    判断两个汉字是否相同（含繁简、异体），或者它们是否为游戏规则下的同音字（忽略声调）。
+    """
+    if not char1 or not char2:
+        return False
+    char1, char2 = fold_chars(char1), fold_chars(char2)
+    if not '一' <= char1 <= '鿿' or not '一' <= char2 <= '鿿':
+        return False # 不是有效汉字输入
+    if char1 == char2:
+        return True
+    # 检查两个拼音集合是否有交集
+    return not char_readings(char1).isdisjoint(char_readings(char2))
+
+def check_poetry_chain_valid(poetry1: str, poetry2: str) -> Tuple[bool, str]:
+    """检查诗词接龙是否有效（前一句尾字与后一句首字在规范形式下相同）"""
+    p1 = canonical_line(poetry1)
+    p2 = canonical_line(poetry2)
+
+    # 检查首尾字接龙
+    if p1 and p2 and p1[-1] == p2[0]:
+        return True, "首尾字接龙"
+
+    return False, "无效接龙"
+
+def check_rhyme_chain_valid(poetry1: str, poetry2: str) -> Tuple[bool, str]:
+    """检查韵脚接龙是否有效（两句尾字押韵，且不是同一句）"""
+    p1 = canonical_line(poetry1)
+    p2 = canonical_line(poetry2)
+
+    if p1 and p2 and p1 != p2 and are_chars_rhyming(p1[-1], p2[-1]):
+        return True, "韵脚接龙"
+
+    return False, "无效接龙"
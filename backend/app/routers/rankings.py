@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+import logging
 
 from ..database import get_db
 from ..models.rankings import Season, Ranking
@@ -14,6 +15,8 @@ from ..schemas.rankings import (
 )
 from ..dependencies import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()  # 移除prefix，在main.py中统一添加
 
 @router.get("/seasons", response_model=List[SeasonResponse])
@@ -40,8 +43,8 @@ async def create_season(
     current_user: User = Depends(get_current_user)
 ):
     """创建新赛季（仅管理员）"""
-    print(f"Received season data: {season}")  # 调试日志
-    print(f"Current user: {current_user}")    # 调试日志
+    logger.debug("Received season data: %s", season)
+    logger.debug("Current user: %s", current_user)
 
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="权限不足")
@@ -79,7 +82,7 @@ async def create_season(
         }
     except Exception as e:
         db.rollback()
-        print(f"Error creating season: {e}")  # 调试日志
+        logger.error("Error creating season: %s", e)
         raise HTTPException(status_code=500, detail=f"创建赛季失败: {str(e)}")
 
 @router.get("/rankings", response_model=RankingsResponse)
@@ -1,19 +1,19 @@
 from .user import User, UserCreate, UserUpdate, UserInDB, Token, TokenData
 from .battle import (
     BattleBase, BattleCreate, BattleUpdate, BattleResponse, 
-    ChainSubmitRequest, RoundRecord, ChainSubmitResponse
+    ChainSubmitRequest, RoundRecord, ChainSubmitResponse, BattleRoundDelta
 )
 from .poetry import (
     Poetry, PoetryCreate, PoetryUpdate, PoetryChain,
-    PoetryResponse, PoetryListResponse
+    PoetryResponse, PoetryListResponse, PoetryFacetsResponse
 )
 from .season import Season, SeasonCreate, SeasonUpdate
 
 __all__ = [
     "User", "UserCreate", "UserUpdate", "UserInDB", "Token", "TokenData",
     "BattleBase", "BattleCreate", "BattleUpdate", "BattleResponse",
-    "ChainSubmitRequest", "RoundRecord", "ChainSubmitResponse",
+    "ChainSubmitRequest", "RoundRecord", "ChainSubmitResponse", "BattleRoundDelta",
     "Poetry", "PoetryCreate", "PoetryUpdate", "PoetryChain",
-    "PoetryResponse", "PoetryListResponse",
+    "PoetryResponse", "PoetryListResponse", "PoetryFacetsResponse",
     "Season", "SeasonCreate", "SeasonUpdate"
 ] 
\ No newline at end of file
@@ -8,7 +8,7 @@ class BattleBase(BaseModel):
     season_id: Optional[int] = None
     score: Optional[int] = 0
     status: Optional[str] = "pending"  # pending, active, completed_win, completed_lose, aborted
-    battle_type: Optional[str] = None # e.g., "normal_chain", "smart_chain"
+    battle_type: Optional[str] = None # e.g., "normal_chain", "smart_chain", "rhyme_chain"
     current_question: Optional[str] = None
     expected_answer: Optional[str] = None # For normal_chain mode
     current_poetry_id: Optional[int] = None
@@ -18,7 +18,7 @@ class BattleBase(BaseModel):
 
 # 创建Battle时的请求模型
 class BattleCreate(BaseModel):
-    battle_type: str = Field(..., examples=["normal_chain", "smart_chain"])
+    battle_type: str = Field(..., examples=["normal_chain", "smart_chain", "rhyme_chain"])
 
 # 更新Battle时的请求模型 (如果需要一个独立的更新模型)
 class BattleUpdate(BaseModel):
@@ -57,4 +57,15 @@ class ChainSubmitResponse(BaseModel):
     next_question: Optional[str] = None
     ai_next_line: Optional[str] = None # For smart_chain, if AI provides the next line
     updated_battle_state: BattleResponse
-    current_round_record: Optional[RoundRecord] = None
\ No newline at end of file
+    current_round_record: Optional[RoundRecord] = None
+
+# 单轮的增量结果：只包含本轮记录与变化的字段，大小与回合数无关
+class BattleRoundDelta(BaseModel):
+    battle_id: int
+    is_correct: bool
+    message: str
+    round: Optional[RoundRecord] = None
+    score: int
+    status: str
+    current_round_num: int
+    next_question: Optional[str] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 class PoetryBase(BaseModel):
@@ -43,6 +43,18 @@ class PoetryListResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PoetryFacetCount(BaseModel):
+    dynasty: str
+    type: str
+    count: int
+
+class PoetryFacetsResponse(BaseModel):
+    success: bool
+    total: int
+    dynasties: Dict[str, int]
+    types: Dict[str, int]
+    combinations: List[PoetryFacetCount]
+
 
 class PoetryChain(BaseModel):
     poetry1: str  # 前一句诗词
@@ -67,4 +67,21 @@ class RankingResponse(RankingBase):
 
 class RankingsResponse(BaseModel):
     rankings: List[RankingResponse]
-    total: int 
\ No newline at end of file
+    total: int 
+
+# /api/v1/rankings 的返回结构
+class RankingEntry(BaseModel):
+    id: int
+    username: str
+    nickname: Optional[str] = None
+    avatar: Optional[str] = None
+    score: int = 0
+    totalBattles: int = 0
+    winCount: int = 0
+    loseCount: int = 0
+    winRate: float = 0.0
+
+class RankingListResponse(BaseModel):
+    success: bool
+    rankings: List[RankingEntry]
+    total: int
@@ -0,0 +1,65 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from sqlalchemy.orm import Session
+
+from ..core.database import SessionLocal
+from ..models import Battle
+
+logger = logging.getLogger(__name__)
+
+# 每轮可能变化、需要落库的对战字段
+PERSISTED_FIELDS = (
+    "score", "status", "current_question", "expected_answer", "current_poetry_id",
+    "rounds", "current_round_num", "battle_records", "used_lines",
+)
+
+def battle_snapshot(battle: Battle) -> Dict[str, Any]:
+    """对战当前状态的快照（battle_records、used_lines 复制一份，避免写线程与会话同时访问同一列表）"""
+    values = {field: getattr(battle, field) for field in PERSISTED_FIELDS}
+    values["battle_records"] = list(values["battle_records"] or [])
+    values["used_lines"] = list(values["used_lines"] or [])
+    return values
+
+class BattleWriter:
+    """
+    对战状态的单写线程：WebSocket 会话把每轮的状态快照交给它，
+    按提交顺序在同一个线程里逐条 UPDATE 落库，会话本身不持有数据库连接。
+    会话持有的是脱离 Session 的对战副本，UPDATE 带条件：库中对战须仍为 active 且回合号等于会话读到的回合号，
+    否则说明对战已被 HTTP 接口提交或放弃，不覆盖其结果。
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self._session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="battle-writer")
+
+    def save(self, battle: Battle, expected_round_num: int) -> Future:
+        """
+        提交对战当前状态的写入，expected_round_num 为本轮修改前的回合号。
+        返回的 Future 结果为是否写入成功；为 False 时对战已在别处变更，会话应停止使用手上的副本。
+        """
+        return self._executor.submit(self._write, battle.id, expected_round_num, battle_snapshot(battle))
+
+    def _write(self, battle_id: int, expected_round_num: int, values: Dict[str, Any]) -> bool:
+        db = self._session_factory()
+        try:
+            updated = db.query(Battle).filter(
+                Battle.id == battle_id,
+                Battle.status == "active",
+                Battle.current_round_num == expected_round_num,
+            ).update(values, synchronize_session=False)
+            db.commit()
+            if not updated:
+                logger.warning("Battle %s changed outside its session (expected active at round %s), not persisted.",
+                               battle_id, expected_round_num)
+            return bool(updated)
+        except Exception:
+            db.rollback()
+            logger.error("Failed to persist battle %s", battle_id, exc_info=True)
+            raise
+        finally:
+            db.close()
+
+# 全局单写线程
+battle_writer = BattleWriter(SessionLocal)
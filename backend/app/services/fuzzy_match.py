@@ -0,0 +1,91 @@
+"""
+诗句模糊匹配：对称删除（SymSpell）索引。
+
+建索引时为每个词条生成删去至多 k 个字的所有变体；查询时对查询串做同样的删除，
+与任一变体相同的词条即为候选，再用有界编辑距离精确校验。
+编辑距离不超过 k 的两串必有一个共同的删除变体，因此不会漏检；
+查询只需 O(len^k) 次哈希查找，与词条总数无关。代价是内存：k=1 时每个词条约占 len+1 个键。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein 编辑距离；超过 max_distance 时提前返回 max_distance + 1"""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+def delete_variants(term: str, max_deletes: int) -> Set[str]:
+    """term 本身及删去 1..max_deletes 个字后的所有变体（可删到空串，短词条间的替换才不会漏检）"""
+    if max_deletes == 1:
+        # 最常用的情形，省去逐层集合运算
+        return {term, *(term[:i] + term[i + 1:] for i in range(len(term)))}
+    variants = {term}
+    frontier = {term}
+    for _ in range(max_deletes):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+class SymmetricDeleteIndex:
+    """编辑距离不超过 max_distance 的模糊查找；词条只增不删，数据变更时整体重建"""
+
+    def __init__(self, terms: Iterable[str] = (), max_distance: int = 1):
+        self.max_distance = max_distance
+        self._terms: List[str] = []
+        # 删除变体 -> 词条序号；多数变体只对应一个词条，存 int 以节省内存，冲突时改存列表
+        self._variants: Dict[str, Any] = {}
+        for term in terms:
+            self.add(term)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, term: str):
+        term_id = len(self._terms)
+        self._terms.append(term)
+        variants = self._variants
+        for variant in delete_variants(term, self.max_distance):
+            existing = variants.setdefault(variant, term_id)
+            if existing == term_id:
+                continue
+            if type(existing) is list:
+                existing.append(term_id)
+            else:
+                variants[variant] = [existing, term_id]
+
+    def lookup(self, query: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """编辑距离不超过 max_distance（不超过建索引时的上限）的所有词条，按 (距离, 词条) 排序"""
+        k = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if not query:
+            return []
+        seen: Set[int] = set()
+        matches: List[Tuple[str, int]] = []
+        for variant in delete_variants(query, k):
+            ids = self._variants.get(variant)
+            if ids is None:
+                continue
+            for term_id in (ids if isinstance(ids, list) else (ids,)):
+                if term_id in seen:
+                    continue
+                seen.add(term_id)
+                term = self._terms[term_id]
+                distance = bounded_edit_distance(query, term, k)
+                if distance <= k:
+                    matches.append((term, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def closest(self, query: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """最接近的词条及其距离；同距离时取字典序最小者，保证结果稳定"""
+        matches = self.lookup(query, max_distance)
+        return matches[0] if matches else None
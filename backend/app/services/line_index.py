@@ -0,0 +1,361 @@
+import bisect
+import random
+import threading
+import time
+import logging
+from collections import Counter, defaultdict
+from itertools import accumulate
+from typing import Container, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models import Poetry
+from ..normalize import parse_poem_lines, normalize_line, char_readings, char_rhyme, fold_chars
+from .fuzzy_match import SymmetricDeleteIndex
+
+logger = logging.getLogger(__name__)
+
+# 接龙深度的计算上限：开场句只需保证还能接若干轮，更深的链没有区别
+CHAIN_DEPTH_LIMIT = 8
+
+class LineIndex:
+    """
+    诗词库的内存诗句索引，首次使用时从数据库构建：
+    - 诗句（规范形式，见 normalize.canonical_line）-> 所属诗词 id
+    - 首字 -> 诗句列表
+    - 读音 -> 以该读音开头的首字集合（用于同音字查找）
+    - 韵部（见 normalize.char_rhyme）-> 尾字属于该韵部的诗句列表（用于韵脚接龙）
+    - 接龙图：以某字结尾的诗句可以接多少句（出度），以及最多还能接几轮（深度，上限 CHAIN_DEPTH_LIMIT）
+    - 模糊匹配索引（LINE_FUZZY_INDEX_ENABLED 时在诗句索引构建后于后台线程构建）
+    诗词数据变更后调用 invalidate()，下次使用时重建。进程外的写入（爬虫脚本、SQL 导入、其他 worker）
+    不会调用 invalidate()：每隔 check_interval 秒比较一次诗词表的行数、最大 id 与最大更新时间，有变化时重建，
+    因此这类写入最多要过 check_interval 秒才能查到。检查与重建期间其他请求继续使用旧索引。
+    """
+
+    def __init__(self, check_interval: Optional[float] = None):
+        self.check_interval = settings.LINE_INDEX_CHECK_INTERVAL if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._built = False
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._lines: Dict[str, int] = {}
+        self._line_list: List[str] = []
+        self._by_first_char: Dict[str, List[str]] = {}
+        self._first_chars_by_reading: Dict[str, Set[str]] = {}
+        self._by_rhyme: Dict[str, List[str]] = {}
+        self._out_degree: Dict[str, int] = {}
+        self._depth: Dict[str, int] = {}
+        # (首字, 难度, 最短, 最长) -> 该首字诗句的累积权重，首次按该条件选句时计算
+        self._continuation_weights: Dict[Tuple[str, str, int, int], List[float]] = {}
+        self._fuzzy: Optional[SymmetricDeleteIndex] = None
+        self._fuzzy_building = False
+
+    def ensure_built(self, db: Session) -> "LineIndex":
+        if self._built:
+            # 已有其他线程在检查或重建时不等待，直接使用当前索引
+            if time.monotonic() - self._checked_at < self.check_interval or not self._lock.acquire(blocking=False):
+                return self
+            try:
+                if self._built and time.monotonic() - self._checked_at >= self.check_interval:
+                    self._rebuild_if_changed(db)
+            finally:
+                self._lock.release()
+            return self
+        with self._lock:
+            if not self._built:
+                self._build(db)
+        return self
+
+    def _rebuild_if_changed(self, db: Session):
+        try:
+            signature = _corpus_signature(db)
+        except Exception as e:
+            logger.warning("Failed to check the poetry table for changes, keeping the line index: %s", e)
+            self._checked_at = time.monotonic()
+            return
+        if signature == self._signature:
+            self._checked_at = time.monotonic()
+            return
+        logger.info("Poetry table changed outside this process (%s -> %s), rebuilding line index.", self._signature, signature)
+        self._build(db, signature)
+
+    def _build(self, db: Session, signature: Optional[Tuple] = None):
+        # 先取签名再读数据：读取期间的写入会在下次检查时触发重建
+        signature = _corpus_signature(db) if signature is None else signature
+        lines: Dict[str, int] = {}
+        by_first_char: Dict[str, List[str]] = defaultdict(list)
+        by_rhyme: Dict[str, List[str]] = defaultdict(list)
+        for poetry_id, content in db.query(Poetry.id, Poetry.content).yield_per(1000):
+            for raw_line in parse_poem_lines(content):
+                line = normalize_line(raw_line)
+                if len(line) < 2 or line in lines:
+                    continue
+                lines[line] = poetry_id
+                by_first_char[line[0]].append(line)
+                rhyme = char_rhyme(line[-1])
+                if rhyme:
+                    by_rhyme[rhyme].append(line)
+
+        first_chars_by_reading: Dict[str, Set[str]] = defaultdict(set)
+        for char in by_first_char:
+            for reading in char_readings(char):
+                first_chars_by_reading[reading].add(char)
+
+        self._lines = lines
+        self._line_list = list(lines)
+        self._by_first_char = dict(by_first_char)
+        self._first_chars_by_reading = dict(first_chars_by_reading)
+        self._by_rhyme = dict(by_rhyme)
+        self._out_degree, self._depth = _chain_graph(self._by_first_char, self._first_chars_by_reading)
+        self._continuation_weights = {}
+        self._fuzzy = None
+        self._signature = signature
+        self._checked_at = time.monotonic()
+        self._built = True
+        logger.info("Line index built: %d lines, %d distinct first chars, %d rhyme groups.",
+                    len(lines), len(by_first_char), len(by_rhyme))
+        if settings.LINE_FUZZY_INDEX_ENABLED and settings.LINE_FUZZY_MAX_DISTANCE > 0:
+            self._spawn_fuzzy_build(settings.LINE_FUZZY_MAX_DISTANCE)
+
+    def invalidate(self):
+        with self._lock:
+            self._built = False
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __contains__(self, line: str) -> bool:
+        return line in self._lines
+
+    def poetry_id_of(self, line: str) -> Optional[int]:
+        return self._lines.get(line)
+
+    def _chars_sounding_like(self, char: str) -> Set[str]:
+        """char 本身及与它同音的首字"""
+        chars = {char}
+        for reading in char_readings(char):
+            chars |= self._first_chars_by_reading.get(reading, set())
+        return chars
+
+    def lines_starting_with(self, char: str, homophones: bool = True) -> List[str]:
+        """以 char（或其同音字）开头的诗句"""
+        char = fold_chars(char)
+        chars = self._chars_sounding_like(char) if homophones else {char}
+        result: List[str] = []
+        for c in chars:
+            result.extend(self._by_first_char.get(c, ()))
+        return result
+
+    def out_degree(self, char: str) -> int:
+        """以 char 结尾的诗句之后可接的诗句数（首字与 char 相同或同音）；0 表示死路"""
+        char = fold_chars(char)
+        degree = self._out_degree.get(char)
+        if degree is None:
+            # 不是库中诗句的尾字（如用户或AI给出的库外诗句），现算
+            degree = sum(len(self._by_first_char.get(c, ())) for c in self._chars_sounding_like(char))
+        return degree
+
+    def continuation_depth(self, char: str) -> int:
+        """以 char 结尾时最多还能接几轮（不超过 CHAIN_DEPTH_LIMIT；不考虑诗句重复）"""
+        return self._depth.get(fold_chars(char), 0)
+
+    def random_opener(self, min_depth: int, min_len: int = 5, max_len: int = 7, attempts: int = 50,
+                      rng: Optional[random.Random] = None) -> Optional[str]:
+        """随机选取一句之后至少还能接 min_depth 轮的诗句；抽不到时退而返回抽到的深度最大的一句"""
+        best, best_depth = None, -1
+        for _ in range(attempts):
+            line = self.random_line(min_len=min_len, max_len=max_len, rng=rng)
+            if not line:
+                continue
+            depth = self._depth.get(line[-1], 0)
+            if depth >= min_depth:
+                return line
+            if depth > best_depth:
+                best, best_depth = line, depth
+        return best
+
+    def _cumulative_weights(self, first_char: str, difficulty: str, min_len: int, max_len: int) -> List[float]:
+        key = (first_char, difficulty, min_len, max_len)
+        weights = self._continuation_weights.get(key)
+        if weights is None:
+            weights = []
+            total = 0.0
+            for line in self._by_first_char.get(first_char, ()):
+                degree = self._out_degree.get(line[-1], 0)
+                if degree and min_len <= len(line) <= max_len:
+                    total += degree if difficulty == "easy" else 1 / degree if difficulty == "hard" else 1
+                weights.append(total)
+            self._continuation_weights[key] = weights
+        return weights
+
+    def pick_continuation(self, char: str, difficulty: str = "normal", min_len: int = 4, max_len: int = 8,
+                          exclude: Container[str] = (), attempts: int = 20,
+                          rng: Optional[random.Random] = None) -> Optional[str]:
+        """
+        本地出句：从以 char（或其同音字）开头、长度合适、不在 exclude 中的诗句里按所接诗句的出度加权随机选一句，
+        easy 权重为出度，hard 为出度的倒数，normal 为均匀；出度为 0（玩家无句可接）的诗句不选。
+        只有死路可走时从死路中均匀选取，没有诗句时返回 None。
+        """
+        chars = sorted(self._chars_sounding_like(fold_chars(char)))
+        groups = [(self._by_first_char[c], self._cumulative_weights(c, difficulty, min_len, max_len))
+                  for c in chars if c in self._by_first_char]
+        group_totals = list(accumulate(weights[-1] for _, weights in groups))
+        rng = rng or random
+        if group_totals and group_totals[-1]:
+            last_group = bisect.bisect_left(group_totals, group_totals[-1])
+            for _ in range(attempts):
+                target = rng.random() * group_totals[-1]
+                # 两级二分：先定首字，再在该首字的累积权重中定诗句；min 防止浮点舍入越界落到权重为 0 的诗句上
+                g = min(bisect.bisect_right(group_totals, target), last_group)
+                lines, weights = groups[g]
+                target -= group_totals[g - 1] if g else 0
+                line = lines[min(bisect.bisect_right(weights, target), bisect.bisect_left(weights, weights[-1]))]
+                if line not in exclude:
+                    return line
+            # 候选几乎都被排除时随机抽取很难命中，退回顺序查找
+            for lines, weights in groups:
+                for i, line in enumerate(lines):
+                    if weights[i] > (weights[i - 1] if i else 0) and line not in exclude:
+                        return line
+        dead_ends = [line for lines, _ in groups for line in lines
+                     if min_len <= len(line) <= max_len and line not in exclude]
+        return rng.choice(dead_ends) if dead_ends else None
+
+    def lines_rhyming_with(self, char: str) -> List[str]:
+        """尾字与 char 押韵（同属一个韵部）的诗句"""
+        return self._by_rhyme.get(char_rhyme(char), [])
+
+    def random_rhyming_line(self, char: str, exclude: Container[str] = (), attempts: int = 20,
+                            rng: Optional[random.Random] = None) -> Optional[str]:
+        """随机选取一句尾字与 char 押韵、且不在 exclude 中的诗句；没有时返回 None"""
+        candidates = self.lines_rhyming_with(char)
+        if not candidates:
+            return None
+        choice = (rng or random).choice
+        for _ in range(attempts):
+            line = choice(candidates)
+            if line not in exclude:
+                return line
+        # 候选几乎都被排除时随机抽取很难命中，退回顺序查找
+        return next((line for line in candidates if line not in exclude), None)
+
+    def closest_line(self, line: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """
+        库中与 line（规范形式）编辑距离最近的诗句及其距离，超过 max_distance
+        （默认 LINE_FUZZY_MAX_DISTANCE，0 表示关闭）时返回 None。
+        模糊索引较大（10 万首诗约需数秒、数百 MB），不在请求中构建：未开启 LINE_FUZZY_INDEX_ENABLED
+        或后台构建尚未完成时同样返回 None。
+        """
+        k = settings.LINE_FUZZY_MAX_DISTANCE if max_distance is None else max_distance
+        if k <= 0 or not line or not self._built:
+            return None
+        fuzzy = self._fuzzy
+        if fuzzy is None or fuzzy.max_distance < k:
+            return None
+        return fuzzy.closest(line, k)
+
+    def build_fuzzy(self, max_distance: int) -> SymmetricDeleteIndex:
+        """同步构建模糊索引；期间诗句索引被重建时丢弃结果"""
+        line_list = self._line_list
+        started_at = time.perf_counter()
+        fuzzy = SymmetricDeleteIndex(line_list, max_distance=max_distance)
+        with self._lock:
+            if self._line_list is line_list:
+                self._fuzzy = fuzzy
+        logger.info("Fuzzy line index built: %d lines, max distance %d, %.1fs.",
+                    len(fuzzy), max_distance, time.perf_counter() - started_at)
+        return fuzzy
+
+    def start_fuzzy_build(self, max_distance: int):
+        """在后台线程构建模糊索引（已在构建时不重复启动）"""
+        with self._lock:
+            self._spawn_fuzzy_build(max_distance)
+
+    def _spawn_fuzzy_build(self, max_distance: int):
+        # 调用方须持有 self._lock
+        if self._fuzzy_building:
+            return
+        self._fuzzy_building = True
+
+        def run():
+            try:
+                # 构建期间诗句索引被重建时结果被丢弃，按新的诗句重新构建
+                while self.build_fuzzy(max_distance) is not self._fuzzy:
+                    logger.info("Line index was rebuilt during the fuzzy build, building again.")
+            except Exception:
+                logger.exception("Failed to build fuzzy line index.")
+            finally:
+                with self._lock:
+                    self._fuzzy_building = False
+
+        threading.Thread(target=run, name="fuzzy-line-index", daemon=True).start()
+
+    def random_line(self, min_len: int = 1, max_len: int = 100, attempts: int = 20,
+                    rng: Optional[random.Random] = None) -> Optional[str]:
+        """随机选取一句长度在 [min_len, max_len] 内的诗句"""
+        if not self._line_list:
+            return None
+        choice = (rng or random).choice
+        for _ in range(attempts):
+            line = choice(self._line_list)
+            if min_len <= len(line) <= max_len:
+                return line
+        return None
+
+    def continuation_candidates(self, char: str, limit: int) -> List[str]:
+        """
+        预测以 char 接龙时最可能出现的用户诗句：
+        按尾字出现频率排序，每个尾字取一句代表诗句，最多返回 limit 句。
+        """
+        candidates = self.lines_starting_with(char)
+        last_char_counts = Counter(line[-1] for line in candidates)
+        representatives: Dict[str, str] = {}
+        for line in candidates:
+            representatives.setdefault(line[-1], line)
+        return [representatives[c] for c, _ in last_char_counts.most_common(limit)]
+
+def _corpus_signature(db: Session) -> Tuple:
+    """
+    诗词表的变化签名：行数、最大 id 与最大更新时间，新增、删除与修改都会改变其中之一。
+    更新时间只精确到秒，与上次最大更新时间同一秒内的修改要等到下一次变化时才会被发现。
+    """
+    return tuple(db.query(func.count(Poetry.id), func.max(Poetry.id), func.max(Poetry.updated_at)).one())
+
+def _chain_graph(by_first_char: Dict[str, List[str]],
+                 first_chars_by_reading: Dict[str, Set[str]]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    诗句接龙图（以某字结尾的诗句 -> 首字与该字相同或同音的诗句）在字一级的汇总：
+    每个尾字的出度，以及从该尾字出发的最长接龙轮数（迭代 CHAIN_DEPTH_LIMIT 轮，环路也按上限计）。
+    """
+    last_chars_by_first_char = {first: {line[-1] for line in lines} for first, lines in by_first_char.items()}
+    last_chars = set().union(*last_chars_by_first_char.values())
+    readings_of = {char: char_readings(char) for char in last_chars}
+
+    out_degree: Dict[str, int] = {}
+    for char in last_chars:
+        sounding = {char}.union(*(first_chars_by_reading.get(r, ()) for r in readings_of[char]))
+        out_degree[char] = sum(len(by_first_char.get(c, ())) for c in sounding)
+
+    depth = dict.fromkeys(last_chars, 0)
+    for _ in range(CHAIN_DEPTH_LIMIT):
+        # 以各首字开头的诗句接下去的最大深度，再按读音汇总，避免逐个枚举同音字
+        best_by_first = {first: max(depth[c] for c in lasts) for first, lasts in last_chars_by_first_char.items()}
+        best_by_reading = {r: max(best_by_first[c] for c in chars) for r, chars in first_chars_by_reading.items()}
+        next_depth: Dict[str, int] = {}
+        for char in last_chars:
+            if not out_degree[char]:
+                next_depth[char] = 0
+                continue
+            best = best_by_first.get(char, 0)
+            for r in readings_of[char]:
+                best = max(best, best_by_reading.get(r, 0))
+            next_depth[char] = best + 1
+        if next_depth == depth:
+            break
+        depth = next_depth
+    return out_degree, depth
+
+# 全局索引实例
+line_index = LineIndex()
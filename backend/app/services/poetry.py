@@ -2,6 +2,7 @@ from typing import Optional, List, Tuple
 from sqlalchemy.orm import Session
 from ..models.poetry import Poetry, Battle, Season
 from ..schemas.poetry import PoetryCreate, BattleCreate, SeasonCreate
+from ..normalize import check_poetry_chain_valid, check_rhyme_chain_valid
 import random
 
 def get_poetry(db: Session, poetry_id: int) -> Optional[Poetry]:
@@ -23,11 +24,11 @@ def check_poetry_chain(poetry1: str, poetry2: str) -> Tuple[bool, str]:
     返回: (是否可接龙, 接龙类型)
     """
     # 首尾字接龙
-    if poetry1[-1] == poetry2[0]:
+    if check_poetry_chain_valid(poetry1, poetry2)[0]:
         return True, "首尾字接龙"
     
-    # 韵脚接龙（简单实现，实际应该使用更复杂的韵脚判断）
-    if poetry1[-1] == poetry2[-1]:
+    # 韵脚接龙（尾字按《中华新韵》同属一个韵部）
+    if check_rhyme_chain_valid(poetry1, poetry2)[0]:
         return True, "韵脚接龙"
     
     return False, "无法接龙"
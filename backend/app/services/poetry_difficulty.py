@@ -0,0 +1,178 @@
+import math
+import random
+import threading
+import time
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models import Battle, Poetry
+from ..normalize import canonical_line, parse_poem_lines
+from .line_index import line_index
+
+logger = logging.getLogger(__name__)
+
+# 各项因素在难度分中的权重：诗句越长、用字越生僻、作者越冷门、历史答对率越低，越难
+DIFFICULTY_WEIGHTS = {"length": 0.2, "rarity": 0.35, "author": 0.2, "history": 0.25}
+# 历史答对率的平滑强度：相当于先验地按全局答对率答过这么多次，避免只答过一两次的诗词得分极端
+HISTORY_PRIOR_ATTEMPTS = 5
+
+def _percentile_ranks(values: Dict[int, float]) -> Dict[int, float]:
+    """把各诗词的原始指标换算为 [0, 1] 的百分位（并列取平均名次），使量纲不同的指标可以加权相加"""
+    if len(values) <= 1:
+        return dict.fromkeys(values, 0.5)
+    ordered = sorted(values, key=values.get)
+    ranks: Dict[int, float] = {}
+    start = 0
+    while start < len(ordered):
+        end = start
+        while end + 1 < len(ordered) and values[ordered[end + 1]] == values[ordered[start]]:
+            end += 1
+        rank = (start + end) / 2 / (len(ordered) - 1)
+        for poetry_id in ordered[start:end + 1]:
+            ranks[poetry_id] = rank
+        start = end + 1
+    return ranks
+
+def _history_error_rates(db: Session) -> Dict[int, float]:
+    """从对战回合记录统计每首诗作为题目时的答错率（经平滑），没有记录的诗词不在结果中"""
+    index = line_index.ensure_built(db)
+    attempts: Dict[int, int] = defaultdict(int)
+    wrong: Dict[int, int] = defaultdict(int)
+    for (records,) in db.query(Battle.battle_records).yield_per(500):
+        for record in records or []:
+            if record.get("user_answer") is None or record.get("is_correct") is None:
+                continue
+            poetry_id = index.poetry_id_of(canonical_line(record.get("question") or ""))
+            if poetry_id is None:
+                continue
+            attempts[poetry_id] += 1
+            wrong[poetry_id] += not record["is_correct"]
+    total_attempts = sum(attempts.values())
+    if not total_attempts:
+        return {}
+    prior = sum(wrong.values()) / total_attempts
+    return {poetry_id: (wrong[poetry_id] + prior * HISTORY_PRIOR_ATTEMPTS) / (count + HISTORY_PRIOR_ATTEMPTS)
+            for poetry_id, count in attempts.items()}
+
+def compute_difficulty_scores(db: Session) -> Dict[int, float]:
+    """
+    计算每首诗的难度分（0 最易，1 最难）：诗句平均长度、用字生僻度（按全库字频的平均信息量）、
+    作者冷门程度（全库收录作品数）和历史答错率各自换算为百分位后按 DIFFICULTY_WEIGHTS 加权。
+    没有历史记录的诗词按全局答错率计。
+    """
+    lines_by_poem: Dict[int, List[str]] = {}
+    author_of: Dict[int, str] = {}
+    char_counts: Counter = Counter()
+    for poetry_id, author, content in db.query(Poetry.id, Poetry.author, Poetry.content).yield_per(1000):
+        lines = [line for line in map(canonical_line, parse_poem_lines(content)) if line]
+        if not lines:
+            continue
+        lines_by_poem[poetry_id] = lines
+        author_of[poetry_id] = author
+        for line in lines:
+            char_counts.update(line)
+    if not lines_by_poem:
+        return {}
+
+    total_chars = sum(char_counts.values())
+    author_counts = Counter(author_of.values())
+    length: Dict[int, float] = {}
+    rarity: Dict[int, float] = {}
+    for poetry_id, lines in lines_by_poem.items():
+        chars = "".join(lines)
+        length[poetry_id] = len(chars) / len(lines)
+        rarity[poetry_id] = sum(math.log(total_chars / char_counts[c]) for c in chars) / len(chars)
+    author = {poetry_id: -author_counts[name] for poetry_id, name in author_of.items()}
+    error_rates = _history_error_rates(db)
+    default_error_rate = sum(error_rates.values()) / len(error_rates) if error_rates else 0.0
+    history = {poetry_id: error_rates.get(poetry_id, default_error_rate) for poetry_id in lines_by_poem}
+
+    factors = {"length": length, "rarity": rarity, "author": author, "history": history}
+    ranked = {name: _percentile_ranks(values) for name, values in factors.items()}
+    return {poetry_id: round(sum(weight * ranked[name][poetry_id] for name, weight in DIFFICULTY_WEIGHTS.items()), 4)
+            for poetry_id in lines_by_poem}
+
+def write_difficulty_scores(db, scores: Dict[int, float]):
+    """批量写入难度分（db 可以是 Session 或 Connection，由调用方提交）"""
+    if not scores:
+        return
+    statement = update(Poetry.__table__).where(Poetry.__table__.c.id == bindparam("poetry_id")) \
+        .values(difficulty_score=bindparam("score"))
+    db.execute(statement, [{"poetry_id": poetry_id, "score": score} for poetry_id, score in scores.items()])
+
+class DifficultySampler:
+    """
+    按难度分档的诗词 id 列表：按 difficulty_score（有索引）排序后等分为 POETRY_DIFFICULTY_LEVELS 档，
+    第 1 档最易。抽题时在档内随机取一个 id，O(1)，不再对全表 ORDER BY RAND()。
+    尚未计算难度分的诗词（如新收录的）归入中间一档。
+    首次使用时构建，crud 增删改时 invalidate()；超过 max_age 秒后重建一次，以纳入进程外重算的难度分。
+    """
+
+    def __init__(self, max_age: float = 600.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None
+        self._levels: List[List[int]] = []
+
+    def ensure_built(self, db: Session) -> "DifficultySampler":
+        if self._built_at is not None and time.monotonic() - self._built_at < self.max_age:
+            return self
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.max_age:
+                self._build(db)
+        return self
+
+    def _build(self, db: Session):
+        level_count = max(1, settings.POETRY_DIFFICULTY_LEVELS)
+        scored: List[int] = []
+        unscored: List[int] = []
+        rows = db.query(Poetry.id, Poetry.difficulty_score).order_by(Poetry.difficulty_score, Poetry.id)
+        for poetry_id, score in rows.yield_per(5000):
+            (unscored if score is None else scored).append(poetry_id)
+        levels = [scored[len(scored) * i // level_count:len(scored) * (i + 1) // level_count] for i in range(level_count)]
+        levels[level_count // 2].extend(unscored)
+        self._levels = levels
+        self._built_at = time.monotonic()
+        logger.info("Difficulty sampler built: %d poems in levels of %s (%d unscored).",
+                    len(scored) + len(unscored), [len(level) for level in levels], len(unscored))
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def level_count(self) -> int:
+        return len(self._levels)
+
+    def sample(self, level: Optional[int] = None, up_to: bool = False,
+               rng: Optional[random.Random] = None) -> Optional[int]:
+        """
+        随机选一首诗的 id：level 为难度档（从 1 开始，越界时取最近的一档），up_to=True 时在 1..level 档中选，
+        level 为 None 时在全部诗词中选；所选的档为空（如尚未计算难度分）时也退回全部诗词。没有诗词时返回 None。
+        """
+        levels = self._levels
+        if not levels:
+            return None
+        if level is None:
+            pools = levels
+        else:
+            level = min(max(level, 1), len(levels))
+            pools = levels[:level] if up_to else [levels[level - 1]]
+        total = sum(len(pool) for pool in pools)
+        if not total:
+            pools = levels
+            total = sum(len(pool) for pool in pools)
+        if not total:
+            return None
+        position = (rng or random).randrange(total)
+        for pool in pools:
+            if position < len(pool):
+                return pool[position]
+            position -= len(pool)
+
+# 全局抽题实例
+difficulty_sampler = DifficultySampler()
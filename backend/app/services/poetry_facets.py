@@ -0,0 +1,109 @@
+import threading
+import time
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Poetry
+
+logger = logging.getLogger(__name__)
+
+class PoetryFacets:
+    """
+    诗词库的计数缓存：总数、按朝代、按体裁以及按 (朝代, 体裁) 的诗词数。
+    首次使用时用一条 GROUP BY 构建，之后随 crud 中的增删改增量更新；
+    超过 max_age 秒后重建一次，以纳入进程外的写入（如爬虫脚本）。
+    """
+
+    def __init__(self, max_age: float = 600.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None
+        self._total = 0
+        self._by_pair: Dict[Tuple[str, str], int] = {}
+        self._by_dynasty: Dict[str, int] = {}
+        self._by_type: Dict[str, int] = {}
+
+    def ensure_built(self, db: Session) -> "PoetryFacets":
+        if self._built_at is not None and time.monotonic() - self._built_at < self.max_age:
+            return self
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.max_age:
+                self._build(db)
+        return self
+
+    def _build(self, db: Session):
+        rows = db.query(Poetry.dynasty, Poetry.type, func.count(Poetry.id)).group_by(Poetry.dynasty, Poetry.type).all()
+        by_pair: Dict[Tuple[str, str], int] = {}
+        by_dynasty: Dict[str, int] = defaultdict(int)
+        by_type: Dict[str, int] = defaultdict(int)
+        for dynasty, poetry_type, count in rows:
+            by_pair[(dynasty, poetry_type)] = count
+            by_dynasty[dynasty] += count
+            by_type[poetry_type] += count
+        self._by_pair = by_pair
+        self._by_dynasty = dict(by_dynasty)
+        self._by_type = dict(by_type)
+        self._total = sum(by_pair.values())
+        self._built_at = time.monotonic()
+        logger.info("Poetry facets built: %d poems, %d (dynasty, type) pairs.", self._total, len(by_pair))
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _apply(self, dynasty: str, poetry_type: str, delta: int):
+        # 尚未构建时无需维护，首次使用时会完整构建
+        if self._built_at is None:
+            return
+        for counts, key in ((self._by_pair, (dynasty, poetry_type)), (self._by_dynasty, dynasty), (self._by_type, poetry_type)):
+            value = counts.get(key, 0) + delta
+            if value > 0:
+                counts[key] = value
+            else:
+                counts.pop(key, None)
+        self._total += delta
+
+    def on_insert(self, dynasty: str, poetry_type: str):
+        with self._lock:
+            self._apply(dynasty, poetry_type, 1)
+
+    def on_delete(self, dynasty: str, poetry_type: str):
+        with self._lock:
+            self._apply(dynasty, poetry_type, -1)
+
+    def on_update(self, old: Tuple[str, str], new: Tuple[str, str]):
+        if old == new:
+            return
+        with self._lock:
+            self._apply(*old, -1)
+            self._apply(*new, 1)
+
+    def count(self, dynasty: Optional[str] = None, poetry_type: Optional[str] = None) -> int:
+        """按朝代/体裁筛选后的诗词数，O(1)"""
+        with self._lock:
+            if dynasty and poetry_type:
+                return self._by_pair.get((dynasty, poetry_type), 0)
+            if dynasty:
+                return self._by_dynasty.get(dynasty, 0)
+            if poetry_type:
+                return self._by_type.get(poetry_type, 0)
+            return self._total
+
+    def facets(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": self._total,
+                "dynasties": dict(self._by_dynasty),
+                "types": dict(self._by_type),
+                "combinations": [
+                    {"dynasty": dynasty, "type": poetry_type, "count": count}
+                    for (dynasty, poetry_type), count in sorted(self._by_pair.items())
+                ],
+            }
+
+# 全局计数缓存实例
+poetry_facets = PoetryFacets()
@@ -0,0 +1,52 @@
+import hashlib
+from typing import Iterable, List, Optional, Set
+
+from ..models import Battle
+from ..normalize import canonical_line
+
+def line_hash(line: str) -> int:
+    """
+    诗句规范形式的 48 位哈希，跨进程稳定（内置 hash 按进程加盐，不能落库）。
+    48 位在 JSON 数字（JavaScript 等只有 53 位整数精度）中不会失真，单局几百句的误判概率可以忽略。
+    """
+    return int.from_bytes(hashlib.blake2b(canonical_line(line).encode("utf-8"), digest_size=6).digest(), "big")
+
+class UsedLines:
+    """
+    一局对战中已出现过的诗句（题目、AI接句、玩家答对的诗句），按 line_hash 存放。
+    hashes 即 Battle.used_lines 列的 JSON 列表，新增时原地追加；集合用于 O(1) 判断。
+    """
+
+    def __init__(self, hashes: Optional[List[int]] = None):
+        self.hashes: List[int] = hashes if hashes is not None else []
+        self._set: Set[int] = set(self.hashes)
+
+    def __len__(self) -> int:
+        return len(self._set)
+
+    def __contains__(self, line: str) -> bool:
+        return bool(line) and line_hash(line) in self._set
+
+    def add(self, line: Optional[str]):
+        if not line or not canonical_line(line):
+            return
+        h = line_hash(line)
+        if h not in self._set:
+            self._set.add(h)
+            self.hashes.append(h)
+
+    def update(self, lines: Iterable[Optional[str]]):
+        for line in lines:
+            self.add(line)
+
+def used_lines_of(battle: Battle) -> UsedLines:
+    """
+    对战的已用诗句集合。同一个 Battle 实例上只从 JSON 列解析一次（WebSocket 会话跨轮复用同一实例）；
+    修改后需对 used_lines 列调用 flag_modified 才会落库。
+    """
+    used = battle.__dict__.get("_used_lines")
+    if used is None or used.hashes is not battle.used_lines:
+        used = UsedLines(list(battle.used_lines or []))
+        battle.used_lines = used.hashes
+        battle.__dict__["_used_lines"] = used
+    return used
@@ -0,0 +1,71 @@
+"""
+日志开销（调用线程上每条日志的耗时）：
+- 未开启的 DEBUG 日志：f-string 与惰性 %s 格式化
+- INFO 日志：同步 StreamHandler 写文件（原 basicConfig 方式）与 队列处理器（app.core.logs）
+- 按 0.1 采样的 INFO 日志
+- JSONFormatter 单条格式化耗时（发生在后台线程）
+
+    python benchmarks/bench_logging.py [--number 20000]
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.logs import ContextQueueHandler, JSONFormatter, SamplingFilter
+
+LINE = "床前明月光"
+PATTERN = "%床%前%明%月%光%"
+
+def bench_logger(handler: logging.Handler, level: int = logging.INFO) -> logging.Logger:
+    logger = logging.getLogger("bench")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+def per_call(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.number
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_handler = logging.StreamHandler(open(os.path.join(tmp, "sync.log"), "w", encoding="utf-8"))
+        sync_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger = bench_logger(sync_handler)
+
+        results = [
+            ("DEBUG off, f-string", per_call(lambda: logger.debug(f"[is_line_in_db] Query result for pattern '{PATTERN}' (original line: '{LINE}') in DB: {True}"), n)),
+            ("DEBUG off, lazy %s", per_call(lambda: logger.debug("[is_line_in_db] Query result for pattern '%s' (original line: '%s') in DB: %s", PATTERN, LINE, True), n)),
+            ("INFO, sync file handler", per_call(lambda: logger.info("User line '%s' passed all checks.", LINE), n)),
+        ]
+
+        # 队列处理器：只测调用线程入队的开销，队列不消费
+        queue_handler = ContextQueueHandler(queue.SimpleQueue())
+        logger = bench_logger(queue_handler)
+        results.append(("INFO, queue handler", per_call(lambda: logger.info("User line '%s' passed all checks.", LINE), n)))
+
+        queue_handler = ContextQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(SamplingFilter({"bench": 0.1}))
+        logger = bench_logger(queue_handler)
+        results.append(("INFO, queue handler, sampled 0.1", per_call(lambda: logger.info("User line '%s' passed all checks.", LINE), n)))
+
+        record = logging.LogRecord("app.llm_service", logging.INFO, __file__, 1, "User line '%s' passed all checks.", (LINE,), None)
+        record.trace_id, record.span_id = "0" * 32, "0" * 16
+        formatter = JSONFormatter()
+        results.append(("JSONFormatter.format (listener thread)", per_call(lambda: formatter.format(record), n)))
+
+    for name, micros in results:
+        print(f"{name:<40} {micros:8.2f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+对比 50 行排行榜 / 诗词列表分页的两种序列化路径：
+- 原路径：FastAPI 按 response_model 校验 -> jsonable_encoder -> 标准库 json（JSONResponse）
+- 新路径：由数据库行直接构造的 dict 交给 ORJSONResponse，跳过响应模型校验
+
+    python benchmarks/bench_serialization.py [--rows 50] [--number 2000]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.poetry import PoetryListResponse
+from app.schemas.rankings import RankingListResponse
+
+def ranking_page(rows: int) -> dict:
+    return {
+        "success": True,
+        "rankings": [
+            {"id": i, "username": f"user{i}", "nickname": f"玩家{i}", "avatar": None, "score": 1000 - i,
+             "totalBattles": 40 + i, "winCount": 20, "loseCount": 20 + i, "winRate": round(20 / (40 + i) * 100, 2)}
+            for i in range(rows)
+        ],
+        "total": 10000,
+    }
+
+def poetry_page(rows: int) -> dict:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    return {
+        "success": True,
+        "data": [
+            {"title": f"静夜思{i}", "author": "李白", "dynasty": "唐", "content": "床前明月光，疑是地上霜。举头望明月，低头思故乡。",
+             "type": "五言绝句", "tags": "思乡,月亮", "difficulty": 1, "id": i, "created_at": now, "updated_at": now}
+            for i in range(rows)
+        ],
+        "total": 10000,
+        "page": 1,
+        "pageSize": rows,
+    }
+
+def validated_json(adapter: TypeAdapter, content: dict) -> bytes:
+    # 与 FastAPI serialize_response 相同：先按响应模型校验，再 jsonable_encoder，最后标准库 json
+    value = adapter.validate_python(content)
+    return JSONResponse(jsonable_encoder(adapter.dump_python(value, mode="json"))).body
+
+def trusted_orjson(content: dict) -> bytes:
+    return ORJSONResponse(content).body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = [
+        ("rankings", TypeAdapter(RankingListResponse), ranking_page(args.rows)),
+        ("poetry list", TypeAdapter(PoetryListResponse), poetry_page(args.rows)),
+    ]
+    for name, adapter, content in cases:
+        baseline = min(timeit.repeat(lambda: validated_json(adapter, content), number=args.number, repeat=3)) / args.number
+        fast = min(timeit.repeat(lambda: trusted_orjson(content), number=args.number, repeat=3)) / args.number
+        print(f"{name:<12} {args.rows} rows: validate+json {baseline * 1e6:8.1f} us   orjson {fast * 1e6:8.1f} us   speedup {baseline / fast:5.1f}x")
+
+if __name__ == "__main__":
+    main()
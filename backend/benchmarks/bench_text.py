@@ -0,0 +1,107 @@
+"""
+每回合都会调用的文本处理函数的微基准（pytest-benchmark）：
+clean_llm_line（原 llm_service._clean_line）、normalize_line / canonical_line（带缓存）、parse_poem_lines、
+check_poetry_chain_valid、are_chars_homophones_or_same，以及 SymmetricDeleteIndex 的模糊诗句查找。
+输入为真实诗词正文，以及带前缀、括号、引号、客套话等干扰的 LLM 输出。
+
+本文件不在 tests/ 中，需显式指定路径运行；--benchmark-autosave 把结果（含 git commit 信息）保存到 .benchmarks/，
+之后的提交可与之对比，用数字验证优化效果：
+
+    pytest benchmarks/bench_text.py --benchmark-autosave
+    pytest benchmarks/bench_text.py --benchmark-compare                                  # 与最近一次保存的结果对比
+    pytest benchmarks/bench_text.py --benchmark-compare=0001 --benchmark-compare-fail=mean:10%
+    pytest-benchmark compare --group-by=name                                              # 查看历次结果
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.normalize import (are_chars_homophones_or_same, canonical_line, check_poetry_chain_valid, clean_llm_line,
+                           normalize_line, parse_poem_lines)
+from app.services.fuzzy_match import SymmetricDeleteIndex
+
+POEMS = [
+    "床前明月光，疑是地上霜。举头望明月，低头思故乡。",
+    "白日依山尽，黄河入海流。欲穷千里目，更上一层楼。",
+    "春眠不觉晓，处处闻啼鸟。夜来风雨声，花落知多少。",
+    "君不见黄河之水天上来，奔流到海不复回。\n君不见高堂明镜悲白发，朝如青丝暮成雪。",
+    "明月几时有？把酒问青天。不知天上宫阙，今夕是何年。我欲乘风归去，又恐琼楼玉宇，高处不胜寒。",
+    "寻寻觅觅，冷冷清清，凄凄惨惨戚戚。乍暖还寒时候，最难将息。三杯两盏淡酒，怎敌他、晚来风急！",
+]
+
+# LLM 实际返回的各种形态：纯诗句、带前缀/后缀、括号注释、中英文引号、英文解释、空白与换行
+LLM_OUTPUTS = [
+    "低头思故乡",
+    "好的，请看：举头望明月",
+    "我接的是：“月落乌啼霜满天”",
+    "答案是：『天街小雨润如酥』（韩愈《早春呈水部张十八员外》）",
+    "当然，这是下一句：酥手黄縢酒 [陆游·钗头凤] 你看如何？",
+    "\"酒入愁肠，化作相思泪\" (Fan Zhongyan)",
+    "没问题，请看下句：泪眼问花花不语{欧阳修}希望你喜欢。",
+    "  语罢暮天钟  \n",
+    "Here is the next line: 钟鼓馔玉不足贵",
+    "这是我的回答：《将进酒》——贵贱同一死，请指正。",
+    "好的，請看：「葡萄美酒夜光盃」",
+    "一",
+    "",
+]
+
+CHAIN_PAIRS = [
+    ("床前明月光，疑是地上霜。", "霜叶红于二月花。"),
+    ("白日依山尽，黄河入海流。", "流水落花春去也。"),
+    ("春眠不觉晓，处处闻啼鸟。", "花落知多少。"),
+    ("举头望明月", "月落乌啼霜满天"),
+]
+
+# 接龙判定中的尾字/首字对：相同、同音、多音字、不同音及非汉字输入
+CHAR_PAIRS = [
+    ("光", "光"), ("霜", "双"), ("流", "留"), ("乐", "月"), ("行", "航"),
+    ("长", "常"), ("月", "花"), ("天", "山"), ("a", "光"), ("鸟", "花"),
+]
+
+@pytest.mark.benchmark(group="clean")
+def test_clean_llm_line(benchmark):
+    benchmark(lambda: [clean_llm_line(text) for text in LLM_OUTPUTS])
+
+@pytest.mark.benchmark(group="clean")
+def test_normalize_line(benchmark):
+    benchmark(lambda: [normalize_line(text) for text in LLM_OUTPUTS])
+
+@pytest.mark.benchmark(group="clean")
+def test_canonical_line_cached(benchmark):
+    benchmark(lambda: [canonical_line(text) for text in LLM_OUTPUTS])
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_poem_lines(benchmark):
+    benchmark(lambda: [parse_poem_lines(poem) for poem in POEMS])
+
+@pytest.mark.benchmark(group="chain")
+def test_check_poetry_chain_valid(benchmark):
+    benchmark(lambda: [check_poetry_chain_valid(first, second) for first, second in CHAIN_PAIRS])
+
+@pytest.mark.benchmark(group="chain")
+def test_are_chars_homophones_or_same(benchmark):
+    benchmark(lambda: [are_chars_homophones_or_same(first, second) for first, second in CHAR_PAIRS])
+
+@pytest.fixture(scope="module")
+def fuzzy_corpus():
+    """20 万句 5/7 言合成诗句（约相当于 5 万首绝句）的模糊索引，以及错一个字/完全不相干的查询"""
+    rng = random.Random(0)
+    chars = "".join(sorted(set("".join(POEMS) + "".join(LLM_OUTPUTS)) - set("，。！？、\n （）[]{}『』“”\"《》——：")))
+    lines = sorted({"".join(rng.choice(chars) for _ in range(rng.choice((5, 7)))) for _ in range(200000)})
+    near_misses = [line[:2] + "某" + line[3:] for line in rng.sample(lines, 20)]
+    return SymmetricDeleteIndex(lines, max_distance=1), near_misses
+
+@pytest.mark.benchmark(group="fuzzy")
+def test_fuzzy_closest_near_miss(benchmark, fuzzy_corpus):
+    index, near_misses = fuzzy_corpus
+    benchmark(lambda: [index.closest(query) for query in near_misses])
+
+@pytest.mark.benchmark(group="fuzzy")
+def test_fuzzy_closest_unrelated(benchmark, fuzzy_corpus):
+    index, _ = fuzzy_corpus
+    benchmark(lambda: [index.closest(query) for query in ("我欲乘风归去", "大江东去浪淘尽", "人生得意须尽欢")])
@@ -0,0 +1,302 @@
+"""
+对战主流程的端到端压测。
+
+在子进程中启动后端（uvicorn）与本地桩 LLM（app.llm.stub_server），数据库为 SQLite 或本地 MySQL，
+并写入指定数量的合成诗词；随后由多个并发虚拟用户各自执行
+注册 -> 登录 -> 开始对战 -> N 次提交 -> 放弃（对战仍进行中时），
+按接口统计吞吐量与 p50/p95/p99 延迟，结果写成 JSON，并可与上一次结果对比发现性能退化：
+
+    python benchmarks/load_battle.py --poems 10000 --users 50 --rounds 5 --output results.json
+    python benchmarks/load_battle.py --database-url "mysql+pymysql://root:pw@localhost:3306/poetry_load?charset=utf8mb4" --poems 1000000
+    python benchmarks/load_battle.py --baseline results.json --max-regression 0.2   # 任一接口 p95 变慢超过 20% 时退出码为 1
+
+合成诗词由 --seed 决定；数据库中诗词数量与 --poems 相同时直接复用，不同时需加 --reseed 重建。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, func, insert, select
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.models import Base, Poetry
+
+# 合成诗句所用的常用字；字集较小，保证每个尾字都有足够多可接的诗句
+CHARS = (
+    "春花秋月夜风雨山水云天地日星江河湖海草木林竹松梅兰菊桃柳莺燕雁鹤马龙凤"
+    "人家门楼台亭阁城关路桥舟船楼窗灯酒茶琴书剑笛歌舞梦思愁情心意神魂泪笑"
+    "红白青黄绿紫金银玉石霜雪冰露烟雾尘沙波浪潮泉溪涧谷峰岭岩崖东西南北中"
+    "前后上下左右来去归行立坐看听闻见知问答言语声音光影色香香暖寒冷清明"
+    "一二三四五六七八九十百千万年岁时朝暮晨昏古今长短远近高低深浅新旧多少"
+)
+DYNASTIES = ("唐", "宋", "元", "明", "清")
+AUTHORS = ("李白", "杜甫", "王维", "白居易", "苏轼", "李清照", "辛弃疾", "陆游", "王安石", "杜牧")
+
+def synthetic_poems(count: int, seed: int) -> Iterator[Dict[str, Any]]:
+    """按 seed 生成 count 首四句的五言/七言合成诗，相同参数总是得到相同的诗"""
+    rng = random.Random(seed)
+    for i in range(count):
+        length = rng.choice((5, 7))
+        lines = ["".join(rng.choice(CHARS) for _ in range(length)) for _ in range(4)]
+        yield {
+            "title": f"拟作其{i + 1}",
+            "author": rng.choice(AUTHORS),
+            "dynasty": rng.choice(DYNASTIES),
+            "content": f"{lines[0]}，{lines[1]}。{lines[2]}，{lines[3]}。",
+            "type": "五言绝句" if length == 5 else "七言绝句",
+            "tags": None,
+            "difficulty": rng.randint(1, 3),
+        }
+
+def prepare_database(url: str, poems: int, seed: int, reseed: bool, batch_size: int = 5000) -> Dict[str, List[str]]:
+    """
+    建表并写入合成诗词，返回 首字 -> 诗句（每个首字最多 50 句）的答案表，
+    供虚拟用户在智能接龙中作答。
+    """
+    engine = create_engine(url)
+    if reseed:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(Poetry.id))).scalar()
+    if existing and existing != poems:
+        raise SystemExit(f"Database already has {existing} poems (requested {poems}); pass --reseed to rebuild it.")
+
+    answers: Dict[str, List[str]] = defaultdict(list)
+    batch: List[Dict[str, Any]] = []
+    started_at = time.perf_counter()
+    with engine.begin() as conn:
+        for poem in synthetic_poems(poems, seed):
+            for line in poem["content"].replace("。", "，").split("，"):
+                if line and len(answers[line[0]]) < 50:
+                    answers[line[0]].append(line)
+            if not existing:
+                batch.append(poem)
+                if len(batch) >= batch_size:
+                    conn.execute(insert(Poetry), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(Poetry), batch)
+    if not existing:
+        print(f"Seeded {poems} synthetic poems in {time.perf_counter() - started_at:.1f}s", file=sys.stderr)
+    engine.dispose()
+    return answers
+
+def start_process(command: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w", encoding="utf-8")
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def wait_healthy(url: str, process: subprocess.Popen, log_path: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(log_path, encoding="utf-8") as log:
+                raise SystemExit(f"Process exited early while waiting for {url}:\n{log.read()[-4000:]}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+class Recorder:
+    """按接口记录每个请求的耗时、状态码与错误数"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started_at = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.samples[name].append(time.perf_counter() - started_at)
+            self.statuses[name][type(e).__name__] += 1
+            self.errors[name] += 1
+            return None
+        self.samples[name].append(time.perf_counter() - started_at)
+        self.statuses[name][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+def pick_answer(battle: Dict[str, Any], answers: Dict[str, List[str]], rng: random.Random) -> str:
+    if battle["battle_type"] == "normal_chain":
+        return battle["expected_answer"]
+    candidates = answers.get(battle["current_question"][-1]) or ["无言以对"]
+    return rng.choice(candidates)
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, name: str, args, answers: Dict[str, List[str]], rng: random.Random):
+    password = "loadtest123"
+    await recorder.request(client, "register", "POST", "/api/v1/register",
+                           json={"username": name, "password": password, "email": f"{name}@loadtest.io"})
+    response = await recorder.request(client, "login", "POST", "/api/v1/token", data={"username": name, "password": password})
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for _ in range(args.battles):
+        battle_type = rng.choice(("normal_chain", "smart_chain")) if args.battle_type == "mixed" else args.battle_type
+        response = await recorder.request(client, "start", "POST", "/api/v1/battles/start", json={"battle_type": battle_type}, headers=headers)
+        if response is None:
+            continue
+        battle = response.json()
+        for _ in range(args.rounds):
+            if battle["status"] != "active":
+                break
+            response = await recorder.request(client, f"submit:{battle_type}", "POST", f"/api/v1/battles/{battle['id']}/submit",
+                                              json={"answer": pick_answer(battle, answers, rng)}, headers=headers)
+            if response is None:
+                break
+            battle = response.json()["updated_battle_state"]
+        if battle["status"] == "active":
+            await recorder.request(client, "abort", "POST", f"/api/v1/battles/{battle['id']}/abort", headers=headers)
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """最近秩百分位数"""
+    index = max(0, min(len(sorted_samples) - 1, int(round(fraction * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+def summarize(recorder: Recorder, duration: float) -> Dict[str, Any]:
+    endpoints = {}
+    for name, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        endpoints[name] = {
+            "requests": len(ordered),
+            "errors": recorder.errors[name],
+            "statuses": dict(recorder.statuses[name]),
+            "throughput_rps": round(len(ordered) / duration, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+    total = sum(len(samples) for samples in recorder.samples.values())
+    return {
+        "duration_s": round(duration, 2),
+        "requests": total,
+        "errors": sum(recorder.errors.values()),
+        "throughput_rps": round(total / duration, 2),
+        "endpoints": endpoints,
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """返回 p95 相对基线变慢超过 max_regression 的接口"""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous and previous["p95_ms"] > 0 and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+async def run_load(base_url: str, args, answers: Dict[str, List[str]]) -> Dict[str, Any]:
+    recorder = Recorder()
+    run_id = f"{int(time.time()) % 100000:05d}"
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        async def staggered(i: int):
+            await asyncio.sleep(args.ramp_up * i / args.users)
+            await virtual_user(client, recorder, f"lt{run_id}u{i}", args, answers, random.Random(args.seed * 100003 + i))
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(staggered(i) for i in range(args.users)))
+        duration = time.perf_counter() - started_at
+    return summarize(recorder, duration)
+
+def print_table(results: Dict[str, Any]):
+    print(f"{'endpoint':<22}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in results["endpoints"].items():
+        print(f"{name:<22}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"total: {results['requests']} requests, {results['errors']} errors, "
+          f"{results['throughput_rps']} req/s over {results['duration_s']}s")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--poems", type=int, default=10000)
+    parser.add_argument("--reseed", action="store_true", help="drop and recreate all tables before seeding")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--battles", type=int, default=1, help="battles per virtual user")
+    parser.add_argument("--rounds", type=int, default=5, help="submits per battle")
+    parser.add_argument("--battle-type", choices=("normal_chain", "smart_chain", "mixed"), default="mixed")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which virtual users start")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--stub-port", type=int, default=8301)
+    parser.add_argument("--stub-latency", type=float, default=0.3)
+    parser.add_argument("--stub-jitter", type=float, default=0.1)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="previous --output file to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="load_battle_")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    answers = prepare_database(database_url, args.poems, args.seed, args.reseed)
+
+    env = dict(os.environ,
+               DATABASE_URL=database_url,
+               LLM_PROVIDER="stub",
+               LLM_STUB_URL=f"http://127.0.0.1:{args.stub_port}/v1/chat/completions",
+               LOG_LEVEL="WARNING",
+               TRACING_ENABLED="false")
+    stub_log, app_log = os.path.join(workdir, "stub.log"), os.path.join(workdir, "app.log")
+    processes = []
+    try:
+        processes.append(start_process(
+            [sys.executable, "-m", "app.llm.stub_server", "--port", str(args.stub_port), "--database-url", database_url,
+             "--latency", str(args.stub_latency), "--jitter", str(args.stub_jitter),
+             "--error-rate", str(args.stub_error_rate), "--seed", str(args.seed)], env, stub_log))
+        wait_healthy(f"http://127.0.0.1:{args.stub_port}/health", processes[-1], stub_log)
+        processes.append(start_process(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"], env, app_log))
+        base_url = f"http://127.0.0.1:{args.port}"
+        wait_healthy(f"{base_url}/health", processes[-1], app_log)
+
+        results = asyncio.run(run_load(base_url, args, answers))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    results["config"] = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    results["config"]["database"] = database_url.split("://", 1)[0]
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"server logs: {workdir}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.poetry_difficulty import compute_difficulty_scores, write_difficulty_scores
+
+def compute_difficulty():
+    """重算全部诗词的难度分；历史答对率随对战积累而变化，可定期运行（如每天一次）"""
+    db = SessionLocal()
+    try:
+        scores = compute_difficulty_scores(db)
+        write_difficulty_scores(db, scores)
+        db.commit()
+        print(f"已更新 {len(scores)} 首诗词的难度分，运行中的服务将在抽题缓存过期后使用新的分档。")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    compute_difficulty()
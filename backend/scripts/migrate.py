@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+from sqlalchemy import Table, Column, String, DateTime, MetaData, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from app.core.database import engine
+from app.models import Battle, Season, Poetry
+from app.services.used_lines import UsedLines
+from app.services.poetry_difficulty import compute_difficulty_scores, write_difficulty_scores
+from sqlalchemy.orm import Session
+
+# 迁移记录表，记录已执行过的迁移编号
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def _create_model_indexes(conn: Connection, model, names):
+    """按名称创建模型 __table_args__ 中声明的索引，已存在的跳过"""
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(model.__tablename__)}
+    for index in model.__table__.indexes:
+        if index.name in names and index.name not in existing:
+            index.create(bind=conn)
+            print(f"  创建索引 {model.__tablename__}.{index.name}")
+
+def _add_model_columns(conn: Connection, model, names):
+    """按名称添加模型中声明的列（均为可空列），已存在的跳过"""
+    existing = {column["name"] for column in inspect(conn).get_columns(model.__tablename__)}
+    for name in names:
+        if name in existing:
+            continue
+        column_type = model.__table__.c[name].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {name} {column_type}"))
+        print(f"  添加列 {model.__tablename__}.{name}")
+
+# 热点查询对应的索引（定义见各模型的 __table_args__）
+HOT_QUERY_INDEXES = {
+    Battle: {"ix_battles_user_status", "ix_battles_season_user"},
+    Season: {"ix_seasons_status_id"},
+    Poetry: {"ix_poetry_dynasty_type", "ix_poetry_type", "ix_poetry_title_author"},
+}
+
+def upgrade_0001_hot_query_indexes(conn: Connection):
+    """热点查询的复合索引"""
+    for model, names in HOT_QUERY_INDEXES.items():
+        _create_model_indexes(conn, model, names)
+
+def upgrade_0002_battle_used_lines(conn: Connection):
+    """对战的已用诗句集合（battles.used_lines），并为进行中的对战按回合记录回填"""
+    _add_model_columns(conn, Battle, ["used_lines"])
+    table = Battle.__table__
+    active = conn.execute(select(table.c.id, table.c.current_question, table.c.battle_records)
+                          .where(table.c.status == "active")).all()
+    for battle_id, current_question, records in active:
+        used = UsedLines()
+        for record in records or []:
+            used.add(record.get("question"))
+            if record.get("is_correct"):
+                used.add(record.get("user_answer"))
+        used.add(current_question)
+        conn.execute(table.update().where(table.c.id == battle_id).values(used_lines=used.hashes))
+    if active:
+        print(f"  回填 {len(active)} 场进行中对战的已用诗句")
+
+def upgrade_0003_poetry_difficulty_score(conn: Connection):
+    """诗词的预计算难度分（poetry.difficulty_score）及其索引，并计算一次"""
+    _add_model_columns(conn, Poetry, ["difficulty_score"])
+    _create_model_indexes(conn, Poetry, {"ix_poetry_difficulty_score"})
+    with Session(bind=conn) as db:
+        scores = compute_difficulty_scores(db)
+    write_difficulty_scores(conn, scores)
+    print(f"  计算 {len(scores)} 首诗词的难度分")
+
+# 按顺序排列的迁移列表: (版本号, 升级函数)
+MIGRATIONS = [
+    ("0001_hot_query_indexes", upgrade_0001_hot_query_indexes),
+    ("0002_battle_used_lines", upgrade_0002_battle_used_lines),
+    ("0003_poetry_difficulty_score", upgrade_0003_poetry_difficulty_score),
+]
+
+def migrate(bind=engine):
+    migration_metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"执行迁移 {version}: {upgrade.__doc__}")
+        with bind.begin() as conn:
+            upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.now()))
+    print("数据库迁移完成！")
+
+if __name__ == "__main__":
+    migrate()
@@ -5,6 +5,7 @@ import json
 from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
 import time
 import os
+import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -16,6 +17,9 @@ from sqlalchemy.orm import sessionmaker, Session as DbSession # 使用别名以
 from app.models import Poetry 
 from app.core.database import Base as AppBase # 如果需要创建表 (通常不需要，主应用会做)
 from app.core.config import settings
+from app.core.logs import configure_logging
+
+logger = logging.getLogger("spider")
 
 # 新的目标网站
 BASE_URL = 'https://gushici.china.com'
@@ -27,7 +31,6 @@ headers = {
     'Referer': BASE_URL
 }
 
-print("Initializing spider for gushici.china.com...")
 
 def requests_retry_session(
     retries=5,
@@ -58,7 +61,7 @@ def save_poem_to_db(db: DbSession, poem_data: dict):
     try:
         existing_poem = db.query(Poetry).filter_by(title=poem_data['title'], author=poem_data['author']).first()
         if existing_poem:
-            print(f"  Poem '{poem_data['title']}' by {poem_data['author']} already exists in DB. Skipping.")
+            logger.debug("Poem '%s' by %s already exists in DB. Skipping.", poem_data['title'], poem_data['author'])
             return False
         
         new_poem = Poetry(
@@ -72,10 +75,10 @@ def save_poem_to_db(db: DbSession, poem_data: dict):
         )
         db.add(new_poem)
         # db.commit() # 单独提交可能效率低，改为批量提交
-        print(f"  Added to DB session: {poem_data.get('title')}")
+        logger.debug("Added to DB session: %s", poem_data.get('title'))
         return True
     except Exception as e:
-        print(f"Error saving poem '{poem_data.get('title')}' to DB session: {e}")
+        logger.error("Error saving poem '%s' to DB session: %s", poem_data.get('title'), e)
         # db.rollback() # 如果是单独提交，则需要回滚
         return False
 
@@ -84,7 +87,7 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
     global page_poems_data # 使用全局列表来收集当前页面的数据，稍后批量处理
     page_poems_data = [] # 清空上一页的数据
 
-    print(f"Fetching poems from: {page_url}")
+    logger.info("Fetching poems from: %s", page_url)
     try:
         session = requests_retry_session()
         req = session.get(page_url, headers=headers, timeout=30)
@@ -93,10 +96,10 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
         
         poem_titles_h3 = soup.find_all('h3')
         if not poem_titles_h3:
-            print("Could not find any poem title (h3 tags) on the page.")
+            logger.warning("Could not find any poem title (h3 tags) on the page.")
             return 0
 
-        print(f"Found {len(poem_titles_h3)} potential poem entries (h3 tags) on the page.")
+        logger.info("Found %d potential poem entries (h3 tags) on the page.", len(poem_titles_h3))
         
         parsed_count = 0
         for h3_tag in poem_titles_h3:
@@ -114,7 +117,7 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
             author_dynasty_text_node_content = ""
             current_node = h3_tag.next_sibling
             processed_author_node = None 
-            print(f"\n--- Processing H3: {title_text[:30]}...") # DEBUG
+            logger.debug("--- Processing H3: %.30s", title_text)
 
             while current_node:
                 if hasattr(current_node, 'name') and current_node.name: 
@@ -128,21 +131,21 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
                     if (current_tag_name == 'p' and 'item_txt' in current_tag_classes) or \
                        (current_tag_name == 'div' and any(cls in current_tag_classes for cls in ['item_info', 'side_focus_name'])):
                         candidate_text = current_node.get_text(strip=True)
-                        print(f"    Text from '{current_tag_name}.{'.'.join(current_tag_classes) if current_tag_classes else ''}': '{candidate_text}'") # DEBUG
+                        logger.debug("Text from '%s.%s': '%s'", current_tag_name, '.'.join(current_tag_classes), candidate_text)
                         if '·' in candidate_text: 
                             author_dynasty_text_node_content = candidate_text
                             processed_author_node = current_node 
-                            print(f"    Found Author/Dynasty Candidate in Tag '{current_tag_name}.{'.'.join(current_tag_classes)}': '{author_dynasty_text_node_content}'") # DEBUG
+                            logger.debug("Found Author/Dynasty Candidate in Tag '%s.%s': '%s'", current_tag_name, '.'.join(current_tag_classes), author_dynasty_text_node_content)
                             break
                     elif current_tag_name == 'span': # Handle <span>-作者·朝代</span>
                         candidate_text = current_node.get_text(strip=True)
-                        print(f"    Text from 'span': '{candidate_text}'") # DEBUG
+                        logger.debug("Text from 'span': '%s'", candidate_text)
                         if candidate_text.startswith('-'):
                             candidate_text = candidate_text[1:].strip()
                         if '·' in candidate_text:
                             author_dynasty_text_node_content = candidate_text
                             processed_author_node = current_node
-                            print(f"    Found Author/Dynasty Candidate in Tag 'span': '{author_dynasty_text_node_content}'") # DEBUG
+                            logger.debug("Found Author/Dynasty Candidate in Tag 'span': '%s'", author_dynasty_text_node_content)
                             break
                 elif isinstance(current_node, str): 
                     stripped_text = current_node.strip()
@@ -150,7 +153,7 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
                         if '·' in stripped_text and not author_dynasty_text_node_content: # Only use text node if no tagged version found yet
                             author_dynasty_text_node_content = stripped_text
                             processed_author_node = current_node # Though this is a text node, we mark its position
-                            print(f"    Found Author/Dynasty Candidate in Text Node: '{author_dynasty_text_node_content}'") # DEBUG
+                            logger.debug("Found Author/Dynasty Candidate in Text Node: '%s'", author_dynasty_text_node_content)
                             break
                 
                 if hasattr(current_node, 'name') and current_node.name == 'div' and \
@@ -173,27 +176,34 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
             
             poem_item_data['author'] = author
             poem_item_data['dynasty'] = dynasty
-            print(f"    Parsed Author: '{author}', Dynasty: '{dynasty}'") # DEBUG
+            logger.debug("Parsed Author: '%s', Dynasty: '%s'", author, dynasty)
 
             # 3. 内容
             content_text = ""
             content_div_found = None
             # Start searching for content AFTER the h3 tag OR after the processed_author_node if one was found
             start_search_for_content_node = processed_author_node if processed_author_node else h3_tag
-            print(f"    Starting content search after node: {type(start_search_for_content_node)}, tag: {getattr(start_search_for_content_node, 'name', 'N/A')}, text hint: '{start_search_for_content_node.get_text(strip=True)[:30]}...'") # DEBUG
+            # 逐节点的调试日志参数需要遍历 DOM，只在开启 DEBUG 时计算
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            if debug_enabled:
+                logger.debug("Starting content search after node: %s, tag: %s, text hint: '%.30s'", type(start_search_for_content_node),
+                             getattr(start_search_for_content_node, 'name', 'N/A'), start_search_for_content_node.get_text(strip=True))
             
             current_sibling_for_content = start_search_for_content_node.next_sibling
             while current_sibling_for_content:
-                print(f"    Content search - current sibling: type={type(current_sibling_for_content)}, name='{getattr(current_sibling_for_content, 'name', 'N/A')}', classes={getattr(current_sibling_for_content, 'attrs', {}).get('class', 'N/A')}, text(short)='{str(current_sibling_for_content)[:50].strip() if isinstance(current_sibling_for_content, str) else (getattr(current_sibling_for_content, 'get_text', lambda strip: '')(strip=True)[:30] + '...' if hasattr(current_sibling_for_content, 'name') else '') }'") # DEBUG
+                if debug_enabled:
+                    logger.debug("Content search - current sibling: type=%s, name='%s', classes=%s, text(short)='%s'", type(current_sibling_for_content),
+                                 getattr(current_sibling_for_content, 'name', 'N/A'), getattr(current_sibling_for_content, 'attrs', {}).get('class', 'N/A'),
+                                 str(current_sibling_for_content)[:50].strip() if isinstance(current_sibling_for_content, str) else (getattr(current_sibling_for_content, 'get_text', lambda strip: '')(strip=True)[:30] + '...' if hasattr(current_sibling_for_content, 'name') else ''))
                 if hasattr(current_sibling_for_content, 'name') and current_sibling_for_content.name == 'div':
                     # Check for 'item_info', 'side_focus_txt', or fallback 'content'/'contson'
                     current_classes = current_sibling_for_content.get('class', [])
                     if any(cls in current_classes for cls in ['item_info', 'side_focus_txt', 'content', 'contson']):
                         content_div_found = current_sibling_for_content
-                        print(f"      Found POTENTIAL content div with classes: {current_classes}!") # DEBUG
+                        logger.debug("Found POTENTIAL content div with classes: %s", current_classes)
                         break
                 if hasattr(current_sibling_for_content, 'name') and current_sibling_for_content.name == 'h3': # Stop if we hit the next poem's title
-                    print("      Hit next H3, stopping content search for current poem.") # DEBUG
+                    logger.debug("Hit next H3, stopping content search for current poem.")
                     break
                 current_sibling_for_content = current_sibling_for_content.next_sibling
 
@@ -206,7 +216,7 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
                 content_text = re.sub(r'\\(.*?\\)', '', content_text)
                 content_text = re.sub(r'\\[.*?\\]', '', content_text)
                 content_text = content_text.replace('!', '！').replace('?', '？')
-            print(f"    Parsed Content (first 50 chars after cleaning): '{content_text[:50]}...'") # DEBUG
+            logger.debug("Parsed Content (first 50 chars after cleaning): '%.50s'", content_text)
             
             poem_item_data['content'] = content_text if content_text else "无内容"
             
@@ -225,28 +235,28 @@ def crawl_poems(page_url: str, db: DbSession): # 接收db会话
             if title_ok and author_ok and content_ok:
                 if save_poem_to_db(db, poem_item_data):
                     parsed_count += 1
-                    print(f"  Successfully parsed & added to DB session: {poem_item_data.get('title')} by {poem_item_data.get('author')}") # 更明确的成功信息
+                    logger.info("Successfully parsed & added to DB session: %s by %s", poem_item_data.get('title'), poem_item_data.get('author'))
             else:
-                print(f"  Skipped entry: Title='{poem_item_data.get('title')}', Author='{poem_item_data.get('author')}', Content isempty= {not content_ok}")
-                if not title_ok: print("    Reason: Title missing or invalid.")
-                if not author_ok: print("    Reason: Author missing.") # "未知作者" 是可接受的，但完全没有提取到author (empty string)不行
-                if not content_ok: print("    Reason: Content missing or invalid.")
+                # "未知作者" 是可接受的，但完全没有提取到author (empty string)不行
+                reasons = [reason for ok, reason in ((title_ok, "title missing or invalid"), (author_ok, "author missing"),
+                                                     (content_ok, "content missing or invalid")) if not ok]
+                logger.info("Skipped entry: Title='%s', Author='%s', reasons: %s", poem_item_data.get('title'), poem_item_data.get('author'), ", ".join(reasons))
             
         
-        print(f"Finished parsing page. Successfully parsed and attempted to add {parsed_count} poems to DB session.")
+        logger.info("Finished parsing page. Successfully parsed and attempted to add %d poems to DB session.", parsed_count)
         return parsed_count
 
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching page {page_url}: {e}")
+        logger.error("Error fetching page %s: %s", page_url, e)
         return 0
     except Exception as e:
-        print(f"An unexpected error occurred with {page_url}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("An unexpected error occurred with %s: %s", page_url, e)
         return 0
 
 # --- 主程序执行 ---
 if __name__ == "__main__":
+    configure_logging(log_format="text")
+    logger.info("Initializing spider for gushici.china.com...")
     # 设置数据库连接
     engine = create_engine(settings.get_database_url)
     # AppBase.metadata.create_all(bind=engine) # 确保表已创建, 通常在主应用启动时执行一次即可
@@ -265,39 +275,37 @@ if __name__ == "__main__":
             # 使用新的URL分页格式: https://gushici.china.com/shici/0_0_0_PAGE.html
             current_url = f"{BASE_URL}/shici/0_0_0_{page_num}.html"
             
-            print(f"\n--- Processing Page {page_num} ({current_url}) ---")
+            logger.info("--- Processing Page %d (%s) ---", page_num, current_url)
             
             parsed_on_page = crawl_poems(current_url, db) # Pass db session
             total_poems_added_to_session += parsed_on_page
             
             if parsed_on_page == 0:
                 empty_page_streak += 1
-                print(f"No new poems found or added from page {page_num}. Consecutive empty pages: {empty_page_streak}")
+                logger.info("No new poems found or added from page %d. Consecutive empty pages: %d", page_num, empty_page_streak)
                 if empty_page_streak >= consecutive_empty_pages_limit:
-                    print(f"Reached {consecutive_empty_pages_limit} consecutive empty pages. Stopping pagination.")
+                    logger.info("Reached %d consecutive empty pages. Stopping pagination.", consecutive_empty_pages_limit)
                     break # 达到连续空页面上限，停止
             else:
                 empty_page_streak = 0 # 重置连续空页面计数
             
             # Delay only if we are continuing to the next page and it's not the last one in the current batch
             if page_num < (start_page + max_pages_to_crawl - 1) and empty_page_streak < consecutive_empty_pages_limit:
-                print(f"Waiting for 2 seconds before fetching next page...")
+                logger.debug("Waiting for 2 seconds before fetching next page...")
                 time.sleep(2) # 尊重服务器, 避免请求过于频繁
 
         if total_poems_added_to_session > 0:
             db.commit() # 提交所有事务
-            print(f"\nSuccessfully committed {total_poems_added_to_session} new poems to the database from {max_pages_to_crawl} pages (or fewer if pagination ended early).")
+            logger.info("Successfully committed %d new poems to the database from %d pages (or fewer if pagination ended early).", total_poems_added_to_session, max_pages_to_crawl)
         else:
-            print(f"\nNo new poems were added to the database session to commit after attempting to crawl {max_pages_to_crawl} pages.")
+            logger.info("No new poems were added to the database session to commit after attempting to crawl %d pages.", max_pages_to_crawl)
 
     except Exception as e:
-        print(f"An error occurred during the crawl or DB commit process: {e}")
+        logger.exception("An error occurred during the crawl or DB commit process: %s", e)
         db.rollback() # 回滚所有未提交的更改
-        import traceback
-        traceback.print_exc()
     finally:
         db.close()
-        print("Database session closed.")
+        logger.info("Database session closed.")
 
     # 移除旧的 JSON Lines 文件写入逻辑
     # print(f"\nFetched details for {len(all_poems_data)} poems from the first page.")
@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, Battle
+from app.services.battle_session import BattleWriter
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    with factory() as db:
+        db.add(Battle(id=1, user_id=1, season_id=1, battle_type="normal_chain", status="active",
+                      current_question="白日依山尽", current_round_num=1, battle_records=[], used_lines=[]))
+        db.commit()
+    return factory
+
+def _detached_battle(factory) -> Battle:
+    with factory() as db:
+        battle = db.get(Battle, 1)
+        db.expunge(battle)
+    return battle
+
+def _stored_battle(factory) -> Battle:
+    with factory() as db:
+        return db.get(Battle, 1)
+
+def test_round_is_written_when_battle_is_unchanged(session_factory):
+    writer = BattleWriter(session_factory)
+    battle = _detached_battle(session_factory)
+    battle.score, battle.rounds, battle.current_round_num = 10, 1, 2
+    battle.current_question = "黄河入海流"
+    assert writer.save(battle, expected_round_num=1).result() is True
+    stored = _stored_battle(session_factory)
+    assert (stored.score, stored.current_round_num, stored.current_question) == (10, 2, "黄河入海流")
+
+    battle.current_round_num = 3
+    assert writer.save(battle, expected_round_num=2).result() is True
+
+def test_aborted_battle_is_not_reactivated(session_factory):
+    writer = BattleWriter(session_factory)
+    battle = _detached_battle(session_factory)
+    with session_factory() as db:
+        db.get(Battle, 1).status = "aborted"
+        db.commit()
+
+    battle.score, battle.current_round_num = 10, 2
+    assert writer.save(battle, expected_round_num=1).result() is False
+    stored = _stored_battle(session_factory)
+    assert (stored.status, stored.score, stored.current_round_num) == ("aborted", 0, 1)
+
+def test_round_submitted_elsewhere_is_not_overwritten(session_factory):
+    writer = BattleWriter(session_factory)
+    battle = _detached_battle(session_factory)
+    with session_factory() as db:
+        stored = db.get(Battle, 1)
+        stored.score, stored.current_round_num = 5, 2
+        db.commit()
+
+    battle.score, battle.current_round_num = 10, 2
+    assert writer.save(battle, expected_round_num=1).result() is False
+    assert _stored_battle(session_factory).score == 5
@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+
+import pytest
+
+from app.services.fuzzy_match import SymmetricDeleteIndex, bounded_edit_distance
+
+def edit_distance(a: str, b: str) -> int:
+    rows = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1, rows[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+    return rows[-1][-1]
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("床前明月光", "床前明月光", 0),
+    ("床前明月光", "床前名月光", 1),   # 错一个字
+    ("床前明月光", "床前明光", 1),     # 漏一个字
+    ("床前明月光", "床前明月光辉", 1), # 多一个字
+    ("床前明月光", "窗前明月光辉", 2),
+    ("床前明月光", "低头思故乡", 3),   # 超过上限时返回 上限 + 1
+])
+def test_bounded_edit_distance(a, b, expected):
+    assert bounded_edit_distance(a, b, 2) == expected
+
+@pytest.mark.parametrize("max_distance", [1, 2])
+def test_lookup_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    alphabet = "春花秋月山水风云"
+    corpus = sorted({"".join(rng.choice(alphabet) for _ in range(rng.randint(2, 7))) for _ in range(300)})
+    index = SymmetricDeleteIndex(corpus, max_distance=max_distance)
+    for _ in range(100):
+        query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8)))
+        expected = sorted((term, d) for term in corpus for d in [edit_distance(query, term)] if d <= max_distance)
+        assert sorted(index.lookup(query)) == expected, query
+
+def test_closest_prefers_smallest_distance():
+    index = SymmetricDeleteIndex(["床前明月光", "疑是地上霜", "举头望明月"], max_distance=1)
+    assert index.closest("床前名月光") == ("床前明月光", 1)
+    assert index.closest("举头望明月") == ("举头望明月", 0)
+    assert index.closest("低头思故乡") is None
@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+
+import httpx
+
+from app.core.http_cache import CacheRule, HTTPCacheMiddleware, LRUBackend, ResponseCache
+
+class CountingApp:
+    """最小的 ASGI 应用：/poetry 返回 200，/poetry/missing 返回 404，记录实际进入路由的次数"""
+
+    def __init__(self):
+        self.calls = 0
+        self.version = 1
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        status = 404 if scope["path"].endswith("/missing") else 200
+        body = json.dumps({"version": self.version, "query": scope["query_string"].decode()}).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+def _client(app, cache):
+    middleware = HTTPCacheMiddleware(app, cache, [CacheRule(r"^/poetry", "poetry", ttl=60, max_age=30)])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test")
+
+def _run(coro):
+    return asyncio.run(coro)
+
+def test_second_request_is_served_from_cache():
+    app, cache = CountingApp(), ResponseCache(LRUBackend(16))
+
+    async def scenario():
+        async with _client(app, cache) as client:
+            first = await client.get("/poetry?page=1")
+            second = await client.get("/poetry?page=1")
+            other_query = await client.get("/poetry?page=2")
+        return first, second, other_query
+
+    first, second, other_query = _run(scenario())
+    assert first.status_code == second.status_code == 200
+    assert first.headers["x-cache"] == "MISS" and second.headers["x-cache"] == "HIT"
+    assert first.json() == second.json()
+    assert first.headers["etag"] == second.headers["etag"]
+    assert second.headers["cache-control"] == "public, max-age=30"
+    assert second.headers["content-type"] == "application/json"
+    assert other_query.headers["x-cache"] == "MISS"
+    assert app.calls == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_conditional_requests_get_304():
+    app, cache = CountingApp(), ResponseCache(LRUBackend(16))
+
+    async def scenario():
+        async with _client(app, cache) as client:
+            first = await client.get("/poetry")
+            by_etag = await client.get("/poetry", headers={"If-None-Match": first.headers["etag"]})
+            by_weak_etag = await client.get("/poetry", headers={"If-None-Match": "W/" + first.headers["etag"]})
+            by_date = await client.get("/poetry", headers={"If-Modified-Since": first.headers["last-modified"]})
+            stale_etag = await client.get("/poetry", headers={"If-None-Match": '"other"'})
+            bad_date = await client.get("/poetry", headers={"If-Modified-Since": "not a date"})
+        return first, by_etag, by_weak_etag, by_date, stale_etag, bad_date
+
+    first, by_etag, by_weak_etag, by_date, stale_etag, bad_date = _run(scenario())
+    for response in (by_etag, by_weak_etag, by_date):
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == first.headers["etag"]
+    assert stale_etag.status_code == 200 and bad_date.status_code == 200
+    assert app.calls == 1
+    assert cache.stats()["not_modified"] == 3
+
+def test_invalidate_makes_the_tag_miss():
+    app, cache = CountingApp(), ResponseCache(LRUBackend(16))
+
+    async def scenario():
+        async with _client(app, cache) as client:
+            first = await client.get("/poetry")
+            app.version = 2
+            cached = await client.get("/poetry")
+            cache.invalidate("poetry")
+            fresh = await client.get("/poetry")
+            revalidated = await client.get("/poetry", headers={"If-None-Match": first.headers["etag"]})
+        return first, cached, fresh, revalidated
+
+    first, cached, fresh, revalidated = _run(scenario())
+    assert cached.json()["version"] == 1
+    assert fresh.headers["x-cache"] == "MISS" and fresh.json()["version"] == 2
+    assert fresh.headers["etag"] != first.headers["etag"]
+    assert revalidated.status_code == 200  # 旧 ETag 不再匹配
+    assert app.calls == 2
+
+def test_non_200_and_uncached_routes_pass_through():
+    app, cache = CountingApp(), ResponseCache(LRUBackend(16))
+
+    async def scenario():
+        async with _client(app, cache) as client:
+            missing = [await client.get("/poetry/missing") for _ in range(2)]
+            other = [await client.get("/seasons") for _ in range(2)]
+            posted = await client.post("/poetry")
+        return missing, other, posted
+
+    missing, other, posted = _run(scenario())
+    assert [r.status_code for r in missing] == [404, 404]
+    assert all("x-cache" not in r.headers for r in missing + other + [posted])
+    assert app.calls == 5
+    assert cache.stats()["stores"] == 0
+
+def test_lru_backend_evicts_oldest_and_expired_entries():
+    backend = LRUBackend(max_entries=2)
+    backend.set("a", {"v": 1}, ttl=60)
+    backend.set("b", {"v": 2}, ttl=60)
+    assert backend.get("a") == {"v": 1}  # a 变为最近使用
+    backend.set("c", {"v": 3}, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+    backend.set("d", {"v": 4}, ttl=0)
+    assert backend.get("d") is None
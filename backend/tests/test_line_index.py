@@ -0,0 +1,177 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import random
+import time
+from collections import Counter
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Base, Poetry
+from app.services.line_index import LineIndex, line_index
+from app.llm_service import is_line_in_db, judge_user_line_by_ai
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add_all([
+            Poetry(title="靜夜思", author="李白", dynasty="唐", content="牀前明月光，疑是地上霜。舉頭望明月，低頭思故鄉。", type="五言绝句"),
+            Poetry(title="登鹳雀楼", author="王之涣", dynasty="唐", content="白日依山尽，黄河入海流。欲穷千里目，更上一层楼。", type="五言绝句"),
+        ])
+        session.commit()
+        yield session
+    # is_line_in_db 使用全局索引，避免影响其他测试
+    line_index.invalidate()
+
+def test_index_is_keyed_by_folded_lines(db):
+    index = LineIndex().ensure_built(db)
+    assert "床前明月光" in index
+    assert "举头望明月" in index
+    assert "低头思故乡" in index
+    assert "舉頭望明月" not in index  # 查询方需先取规范形式
+    assert index.poetry_id_of("欲穷千里目") is not None
+
+def test_lines_starting_with_folds_the_query_char(db):
+    index = LineIndex().ensure_built(db)
+    assert "举头望明月" in index.lines_starting_with("舉", homophones=False)
+    assert "疑是地上霜" in index.lines_starting_with("宜")  # 同音字
+
+def test_is_line_in_db_matches_any_script(db):
+    assert is_line_in_db("举头望明月", db)
+    assert is_line_in_db("舉頭望明月。", db)
+    assert is_line_in_db("更上一層樓", db)
+    assert not is_line_in_db("明月光", db)  # 整句匹配，不再是子序列
+    assert not is_line_in_db("", db)
+
+def test_lines_rhyming_with(db):
+    index = LineIndex().ensure_built(db)
+    assert set(index.lines_rhyming_with("香")) == {"床前明月光", "疑是地上霜", "低头思故乡"}
+    assert index.lines_rhyming_with("知") == []
+
+def test_random_rhyming_line_excludes_given_lines(db):
+    index = LineIndex().ensure_built(db)
+    for _ in range(20):
+        assert index.random_rhyming_line("流", exclude={"黄河入海流"}) == "更上一层楼"
+    assert index.random_rhyming_line("流", exclude={"黄河入海流", "更上一层楼"}) is None
+    assert index.random_rhyming_line("知") is None
+
+def test_closest_line(db):
+    index = LineIndex().ensure_built(db)
+    index.build_fuzzy(1)
+    assert index.closest_line("举头望名月") == ("举头望明月", 1)
+    assert index.closest_line("举头望名月", max_distance=0) is None
+    assert index.closest_line("春眠不觉晓") is None
+
+def test_closest_line_never_builds_the_fuzzy_index(db):
+    index = LineIndex().ensure_built(db)
+    assert index.closest_line("举头望名月") is None
+    time.sleep(0.05)
+    assert index._fuzzy is None and not index._fuzzy_building
+
+def test_fuzzy_index_is_built_in_background_when_enabled(db, monkeypatch):
+    monkeypatch.setattr(settings, "LINE_FUZZY_INDEX_ENABLED", True)
+    index = LineIndex().ensure_built(db)
+    for _ in range(100):
+        if index.closest_line("举头望名月"):
+            break
+        time.sleep(0.01)
+    assert index.closest_line("举头望名月") == ("举头望明月", 1)
+
+def test_judge_suggests_the_closest_line(db):
+    line_index.ensure_built(db).build_fuzzy(1)
+    is_correct, message = asyncio.run(judge_user_line_by_ai("功名一举", "举头望名月", db))
+    assert not is_correct and "您是不是想说'举头望明月'" in message
+    # 最近的诗句首字接不上上一句时不提示
+    is_correct, message = asyncio.run(judge_user_line_by_ai("白日依山尽", "尽头望明月", db))
+    assert not is_correct and "您是不是想说" not in message
+
+# 接龙图：雨/语 -> 色、钟；色/涩 -> 花（死路）、中；钟/中 -> 船、贵（死路）、水（死路）；船 -> 月（死路）
+CHAIN_LINES = ["山中一夜雨", "雨过天青色", "语罢暮天钟", "钟声到客船", "钟鼓馔玉不足贵", "中流击水", "色是空中花", "涩雨入山中", "船头望明月"]
+
+@pytest.fixture(scope="module")
+def chain_index():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add(Poetry(title="接龙", author="佚名", dynasty="唐", content="，".join(CHAIN_LINES) + "。", type="杂诗"))
+        session.commit()
+        yield LineIndex().ensure_built(session)
+
+def test_out_degree_counts_homophone_continuations(chain_index):
+    assert chain_index.out_degree("雨") == 2      # 雨过天青色、语罢暮天钟
+    assert chain_index.out_degree("中") == 3      # 钟声到客船、钟鼓馔玉不足贵、中流击水
+    assert chain_index.out_degree("月") == 0
+    assert chain_index.out_degree("鍾") == 3      # 库中没有的尾字现算，且先折叠字形
+
+def test_continuation_depth(chain_index):
+    assert chain_index.continuation_depth("月") == 0
+    assert chain_index.continuation_depth("船") == 1
+    assert chain_index.continuation_depth("钟") == 2
+    assert chain_index.continuation_depth("色") == 3
+    assert chain_index.continuation_depth("雨") == 4
+
+def test_random_opener_respects_min_depth(chain_index):
+    rng = random.Random(1)
+    assert chain_index.random_opener(4, rng=rng) == "山中一夜雨"
+    assert chain_index.random_opener(9, rng=rng) == "山中一夜雨"  # 达不到时取深度最大的一句
+
+def test_pick_continuation_avoids_dead_ends(chain_index):
+    rng = random.Random(2)
+    assert {chain_index.pick_continuation("色", rng=rng) for _ in range(50)} == {"涩雨入山中"}
+    # 只剩死路时仍从死路中选
+    assert chain_index.pick_continuation("船", rng=rng) == "船头望明月"
+    assert chain_index.pick_continuation("花", rng=rng) is None
+
+def test_pick_continuation_skips_excluded_lines(chain_index):
+    rng = random.Random(4)
+    assert {chain_index.pick_continuation("雨", exclude={"语罢暮天钟"}, rng=rng) for _ in range(50)} == {"雨过天青色"}
+    assert chain_index.pick_continuation("雨", exclude={"语罢暮天钟", "雨过天青色"}, rng=rng) is None
+    assert chain_index.pick_continuation("船", exclude={"船头望明月"}, rng=rng) is None
+
+@pytest.mark.parametrize("difficulty, expected_share", [("easy", 2 / 5), ("normal", 1 / 2), ("hard", 3 / 5)])
+def test_pick_continuation_weights_by_out_degree(chain_index, difficulty, expected_share):
+    # 雨过天青色 -> 色（出度 2），语罢暮天钟 -> 钟（出度 3）
+    rng = random.Random(3)
+    picks = Counter(chain_index.pick_continuation("雨", difficulty, rng=rng) for _ in range(3000))
+    assert set(picks) == {"雨过天青色", "语罢暮天钟"}
+    assert picks["雨过天青色"] / 3000 == pytest.approx(expected_share, abs=0.05)
+
+def _fresh_db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = Session(engine)
+    session.add(Poetry(title="登鹳雀楼", author="王之涣", dynasty="唐", content="白日依山尽，黄河入海流。", type="五言绝句"))
+    session.commit()
+    return session
+
+def test_index_picks_up_writes_made_outside_the_process():
+    db = _fresh_db()
+    index = LineIndex(check_interval=0).ensure_built(db)
+    assert "欲穷千里目" not in index
+    # 不经过 crud（如爬虫脚本或另一个 worker）写入，不会调用 invalidate()
+    poem = Poetry(title="登鹳雀楼", author="王之涣", dynasty="唐", content="欲穷千里目，更上一层楼。", type="五言绝句")
+    db.add(poem)
+    db.commit()
+    assert "欲穷千里目" in index.ensure_built(db)
+    poem.content = "春眠不觉晓，处处闻啼鸟。"
+    poem.updated_at = datetime(2100, 1, 1)  # 更新时间精确到秒，测试中显式推后
+    db.commit()
+    assert "春眠不觉晓" in index.ensure_built(db)
+    assert "欲穷千里目" not in index
+
+def test_index_is_not_checked_again_within_the_interval():
+    db = _fresh_db()
+    index = LineIndex(check_interval=3600).ensure_built(db)
+    db.add(Poetry(title="春晓", author="孟浩然", dynasty="唐", content="春眠不觉晓，处处闻啼鸟。", type="五言绝句"))
+    db.commit()
+    assert "春眠不觉晓" not in index.ensure_built(db)
+    index.invalidate()
+    assert "春眠不觉晓" in index.ensure_built(db)
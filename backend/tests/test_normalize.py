@@ -0,0 +1,137 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+import re
+
+import pytest
+
+from app.normalize import (are_chars_homophones_or_same, are_chars_rhyming, canonical_line, char_rhyme, check_poetry_chain_valid,
+                           check_rhyme_chain_valid, clean_llm_line, fold_chars, syllable_rhyme)
+
+def legacy_clean_line(line: str) -> str:
+    """重写前 llm_service._clean_line 的原样副本，作为 clean_llm_line 输出一致性的参照"""
+    if not line:
+        return ""
+    line = re.sub(r"[（\(\[].*?[）\)\]]", "", line)
+    line = re.sub(r"\{.*?\}", "", line)
+    common_prefixes = [
+        "好的，请看：", "好的，这句是：", "请看：", "这句是：",
+        "我接的是：", "我的是：", "答案是：", "当然，这是下一句：",
+        "没问题，请看下句：", "我来了：", "这是我的回答：", "诗句是："
+    ]
+    common_suffixes = [
+        "你看如何？", "怎么样？", "希望你喜欢。", "请指正。"
+    ]
+    for prefix in common_prefixes:
+        if re.match(f"^{re.escape(prefix)}", line, re.IGNORECASE):
+            line = line[len(prefix):].lstrip()
+    for suffix in common_suffixes:
+        if line.lower().endswith(suffix.lower()):
+            line = line[:-len(suffix)].rstrip()
+    line = line.replace('"', '').replace("'", "").replace("`", "")
+    cleaned = "".join(re.findall(r'[一-鿿]+', line))
+    if len(cleaned) <= 1 and cleaned not in ['一', '二', '三', '四', '五', '六', '七', '八', '九', '十']:
+        return ""
+    return cleaned.strip()
+
+# 记录下来的真实输入：LLM 回复与用户作答
+RECORDED = [
+    "低头思故乡",
+    "好的，请看：举头望明月",
+    "我接的是：“月落乌啼霜满天”",
+    "答案是：『天街小雨润如酥』（韩愈《早春呈水部张十八员外》）",
+    "当然，这是下一句：酥手黄縢酒 [陆游·钗头凤] 你看如何？",
+    "\"酒入愁肠，化作相思泪\" (Fan Zhongyan)",
+    "没问题，请看下句：泪眼问花花不语{欧阳修}希望你喜欢。",
+    "  语罢暮天钟  \n",
+    "Here is the next line: 钟鼓馔玉不足贵",
+    "这是我的回答：《将进酒》——贵贱同一死，请指正。",
+    "好的，请看：请看：  重复的前缀也会剥掉",
+    "诗句是：（注释未闭合 春风又绿江南岸",
+    "{甲(乙}丙)",
+    "{外(里)}剩下",
+    "（多行\n注释）换行之后",
+    "一", "二", "月", "a", "", "   ", "（）", "怎么样？", "请指正。请指正。",
+    "ＡＢＣ全角字母与数字１２３",
+    "𠀀扩展区汉字不算",
+]
+
+FRAGMENTS = [
+    "好的，请看：", "请看：", "答案是：", "诗句是：", "你看如何？", "怎么样？", "请指正。", "希望你喜欢。",
+    "（", "）", "(", ")", "[", "]", "{", "}", "\"", "'", "`", "“", "”", "《", "》", "，", "。", " ", "\n",
+    "床前明月光", "疑是地上霜", "一", "十", "Li Bai", "ok", "２", "İ",
+]
+
+@pytest.mark.parametrize("text", RECORDED)
+def test_clean_llm_line_matches_legacy_on_recorded_inputs(text):
+    assert clean_llm_line(text) == legacy_clean_line(text)
+
+def test_clean_llm_line_matches_legacy_on_generated_inputs():
+    rng = random.Random(20240601)
+    for _ in range(20000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 8)))
+        assert clean_llm_line(text) == legacy_clean_line(text), text
+
+@pytest.mark.parametrize("text, expected", [
+    ("床前明月光。", "床前明月光"),
+    ("好的，請看：「葡萄美酒夜光盃」", "葡萄美酒夜光杯"),
+    ("牀前明月光", "床前明月光"),
+    ("欲窮千里目（王之渙）", "欲穷千里目"),
+    ("\uf9d1\uf9d1", "六六"),  # CJK 兼容表意文字
+    ("abc", ""),
+])
+def test_canonical_line_folds_traditional_and_variants(text, expected):
+    assert canonical_line(text) == expected
+
+def test_fold_chars_leaves_simplified_text_untouched():
+    text = "当然，这是下一句：酥手黄縢酒"
+    assert fold_chars(text) is text
+
+@pytest.mark.parametrize("char1, char2, expected", [
+    ("光", "光", True),
+    ("雲", "云", True),     # 繁简同字
+    ("霜", "双", True),     # 同音
+    ("乐", "月", True),     # 多音字 yue
+    ("光", "鸟", False),    # 读音字母有重合但不同音
+    ("月", "花", False),
+    ("a", "光", False),
+])
+def test_are_chars_homophones_or_same(char1, char2, expected):
+    assert are_chars_homophones_or_same(char1, char2) is expected
+
+def test_check_poetry_chain_valid():
+    assert check_poetry_chain_valid("床前明月光，疑是地上霜。", "霜葉紅於二月花。") == (True, "首尾字接龙")
+    assert check_poetry_chain_valid("举头望明月", "低头思故乡") == (False, "无效接龙")
+    assert check_poetry_chain_valid("", "低头思故乡") == (False, "无效接龙")
+
+@pytest.mark.parametrize("syllable, expected", [
+    ("hua", "麻"), ("shuo", "波"), ("xue", "皆"), ("yue", "皆"), ("huai", "开"), ("gui", "微"),
+    ("xiao", "豪"), ("liu", "尤"), ("you", "尤"), ("yuan", "寒"), ("chun", "文"), ("jun", "文"),
+    ("guang", "唐"), ("ming", "庚"), ("yong", "庚"), ("yi", "齐"), ("ju", "齐"), ("lv", "齐"), ("er", "齐"),
+    ("shi", "支"), ("zi", "支"), ("wu", "姑"), ("ng", None),
+])
+def test_syllable_rhyme(syllable, expected):
+    assert syllable_rhyme(syllable) == expected
+
+def test_char_rhyme_uses_the_common_reading_after_folding():
+    assert char_rhyme("月") == "皆"  # 不计罕见读音 ru
+    assert char_rhyme("鄉") == char_rhyme("乡") == "唐"
+    assert char_rhyme("a") is None
+
+@pytest.mark.parametrize("char1, char2, expected", [
+    ("光", "霜", True),
+    ("花", "涯", True),
+    ("知", "西", False),   # 舌尖元音 -i 不与 i 相押
+    ("月", "光", False),
+    ("月", "目", False),
+    ("", "光", False),
+])
+def test_are_chars_rhyming(char1, char2, expected):
+    assert are_chars_rhyming(char1, char2) is expected
+
+def test_check_rhyme_chain_valid():
+    assert check_rhyme_chain_valid("床前明月光", "低頭思故鄉。") == (True, "韵脚接龙")
+    assert check_rhyme_chain_valid("床前明月光", "床前明月光") == (False, "无效接龙")
+    assert check_rhyme_chain_valid("床前明月光", "举头望明月") == (False, "无效接龙")
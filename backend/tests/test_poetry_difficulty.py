@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models import Base, Battle, Poetry
+from app.services.line_index import line_index
+from app.services.poetry_difficulty import (DifficultySampler, _history_error_rates, _percentile_ranks,
+                                            compute_difficulty_scores, write_difficulty_scores)
+
+def rounds(question, *results):
+    return [{"round_num": i + 1, "question": question, "user_answer": "某句", "is_correct": ok} for i, ok in enumerate(results)]
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add_all([
+            Poetry(id=1, title="静夜思", author="李白", dynasty="唐", content="床前明月光，疑是地上霜。举头望明月，低头思故乡。", type="诗"),
+            Poetry(id=2, title="望庐山瀑布", author="李白", dynasty="唐", content="日照香炉生紫烟，遥看瀑布挂前川。飞流直下三千尺，疑是银河落九天。", type="诗"),
+            Poetry(id=3, title="登鹳雀楼", author="王之涣", dynasty="唐", content="白日依山尽，黄河入海流。欲穷千里目，更上一层楼。", type="诗"),
+            Poetry(id=4, title="杂句", author="无名氏", dynasty="唐", content="鼯鼪窥蟪蛄，蘼芜缀葳蕤。", type="诗"),
+            Battle(user_id=1, season_id=1, battle_type="normal_chain", status="completed_lose",
+                   battle_records=rounds("床前明月光", True, True, True) + rounds("白日依山尽", False, False, False)
+                   + [{"round_num": 7, "question": "白日依山尽", "user_answer": None, "is_correct": None}]),
+        ])
+        session.commit()
+        yield session
+    line_index.invalidate()
+
+def test_percentile_ranks_average_ties():
+    assert _percentile_ranks({1: 1.0, 2: 2.0, 3: 2.0, 4: 5.0}) == {1: 0.0, 2: 0.5, 3: 0.5, 4: 1.0}
+    assert _percentile_ranks({1: 3.0}) == {1: 0.5}
+
+def test_history_error_rates_are_smoothed_towards_the_global_rate(db):
+    # 全局答错率 3/6 = 0.5，按 5 次先验平滑；未作答的回合不计
+    assert _history_error_rates(db) == {1: pytest.approx(2.5 / 8), 3: pytest.approx(5.5 / 8)}
+
+def test_difficulty_scores(db):
+    scores = compute_difficulty_scores(db)
+    assert set(scores) == {1, 2, 3, 4}
+    assert all(0 <= score <= 1 for score in scores.values())
+    assert scores[4] == max(scores.values())  # 生僻字、冷门作者
+    assert scores[3] > scores[1]              # 同为五言绝句，登鹳雀楼历史答错率更高
+
+def test_sampler_buckets_by_score(db):
+    write_difficulty_scores(db, {1: 0.1, 2: 0.5, 3: 0.4, 4: 0.9})
+    db.add(Poetry(id=5, title="新收录", author="佚名", dynasty="宋", content="新诗一句，尚未评分。", type="词"))
+    db.commit()
+    sampler = DifficultySampler().ensure_built(db)
+    rng = random.Random(5)
+    draws = lambda *args, **kwargs: {sampler.sample(*args, rng=rng, **kwargs) for _ in range(100)}
+    assert sampler.level_count() == 3
+    assert draws(1) == {1}
+    assert draws(2) == {3, 5}          # 未评分的诗词归入中间档
+    assert draws(3) == {2, 4}
+    assert draws(2, up_to=True) == {1, 3, 5}
+    assert draws(0) == {1} and draws(99) == {2, 4}
+    assert draws() == {1, 2, 3, 4, 5}
+
+def test_unscored_corpus_serves_every_level():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add_all([Poetry(id=i, title="无题", author="佚名", dynasty="唐", content="一句，两句。", type="诗") for i in (7, 8)])
+        session.commit()
+        sampler = DifficultySampler().ensure_built(session)
+    # 尚未计算难度分时全部在中间档，其他档为空时退回全部诗词
+    assert {sampler.sample(1, rng=random.Random(i)) for i in range(20)} == {7, 8}
+
+def test_empty_sampler_returns_none():
+    assert DifficultySampler().sample(1) is None
@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models import Base, Poetry
+from app.services.poetry_facets import PoetryFacets
+
+DYNASTIES = ["唐", "宋", "元"]
+TYPES = ["五言绝句", "七言律诗", "词"]
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        for i in range(12):
+            session.add(Poetry(title=f"诗{i}", author="佚名", dynasty=DYNASTIES[i % 3], type=TYPES[i % 2],
+                               content="白日依山尽，黄河入海流。"))
+        session.commit()
+        yield session
+
+def _real_count(db, dynasty=None, poetry_type=None) -> int:
+    query = db.query(Poetry)
+    if dynasty:
+        query = query.filter(Poetry.dynasty == dynasty)
+    if poetry_type:
+        query = query.filter(Poetry.type == poetry_type)
+    return query.count()
+
+def _assert_matches_database(facets, db):
+    for dynasty in DYNASTIES + [None]:
+        for poetry_type in TYPES + [None]:
+            assert facets.count(dynasty, poetry_type) == _real_count(db, dynasty, poetry_type), (dynasty, poetry_type)
+
+def test_built_counts_match_group_by(db):
+    facets = PoetryFacets().ensure_built(db)
+    _assert_matches_database(facets, db)
+    summary = facets.facets()
+    assert summary["total"] == 12
+    assert sum(item["count"] for item in summary["combinations"]) == 12
+
+def test_incremental_updates_track_real_counts(db):
+    facets = PoetryFacets().ensure_built(db)
+    rng = random.Random(7)
+    for step in range(60):
+        poems = db.query(Poetry).all()
+        action = rng.choice(["insert", "delete", "update"]) if poems else "insert"
+        # 与 crud 中一样：先提交数据库写入，再增量更新计数
+        if action == "insert":
+            poem = Poetry(title=f"新{step}", author="佚名", dynasty=rng.choice(DYNASTIES), type=rng.choice(TYPES),
+                          content="欲穷千里目，更上一层楼。")
+            db.add(poem)
+            db.commit()
+            facets.on_insert(poem.dynasty, poem.type)
+        elif action == "delete":
+            poem = rng.choice(poems)
+            old_facet = (poem.dynasty, poem.type)
+            db.delete(poem)
+            db.commit()
+            facets.on_delete(*old_facet)
+        else:
+            poem = rng.choice(poems)
+            old_facet = (poem.dynasty, poem.type)
+            poem.dynasty, poem.type = rng.choice(DYNASTIES), rng.choice(TYPES)
+            db.commit()
+            facets.on_update(old_facet, (poem.dynasty, poem.type))
+        _assert_matches_database(facets, db)
+
+def test_hooks_before_build_are_ignored_and_rebuild_picks_up_outside_writes(db):
+    facets = PoetryFacets(max_age=0)
+    facets.on_insert("唐", "词")  # 尚未构建，首次使用时完整构建
+    assert facets.ensure_built(db).count() == 12
+    # 进程外的写入（如爬虫脚本）不经过 crud，超过 max_age 后重建时纳入
+    db.add(Poetry(title="外部", author="佚名", dynasty="宋", type="词", content="明月几时有。"))
+    db.commit()
+    assert facets.ensure_built(db).count("宋", "词") == _real_count(db, "宋", "词")
+    facets.invalidate()
+    _assert_matches_database(facets.ensure_built(db), db)
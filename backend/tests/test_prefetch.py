@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from app.llm.prefetch import PrefetchBuffer
+from app.llm.resilience import CircuitBreaker, UpstreamGuard
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_results_are_taken_by_last_char():
+    buffer = PrefetchBuffer(ttl=60, max_workers=2)
+    buffer.schedule(1, ["白日依山尽", "黄河入海流"], lambda line: "AI:" + line)
+    _wait_for(lambda: buffer.stats()["buffered"] == 2)
+    assert buffer.take(1, "流") == "AI:黄河入海流"
+    assert buffer.take(1, "流") is None
+    assert buffer.stats()["hits"] == 1 and buffer.stats()["misses"] == 1
+
+def test_results_of_an_older_question_are_dropped():
+    buffer = PrefetchBuffer(ttl=60, max_workers=1)
+    buffer.schedule(1, ["白日依山尽"], lambda line: (time.sleep(0.05), "旧")[1])
+    buffer.schedule(1, ["黄河入海流"], lambda line: "新")
+    _wait_for(lambda: buffer.stats()["buffered"] == 1)
+    time.sleep(0.1)
+    assert buffer.take(1, "尽") is None
+    assert buffer.take(1, "流") == "新"
+
+def test_prune_drops_battles_that_were_never_discarded():
+    buffer = PrefetchBuffer(ttl=0.05, max_workers=1)
+    buffer.schedule(1, ["白日依山尽"], lambda line: None)
+    buffer.schedule(2, ["黄河入海流"], lambda line: "AI")
+    _wait_for(lambda: buffer.stats()["buffered"] == 1)
+    time.sleep(0.1)
+    buffer.schedule(3, [], lambda line: None)
+    assert buffer.stats()["battles"] == 1
+    assert buffer.stats()["buffered"] == 0
+
+def test_guard_headroom_reserves_slots_for_interactive_requests():
+    guard = UpstreamGuard(max_concurrency=4, queue_timeout=1, rate=100, burst=100, breaker=CircuitBreaker(5, 30))
+    assert guard.has_headroom(reserve=2)
+    guard._counters["in_flight"] = 1
+    assert guard.has_headroom(reserve=2)
+    guard._counters["in_flight"] = 2
+    assert not guard.has_headroom(reserve=2)
@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.llm.prompt import Conversation, PromptStats, estimate_tokens
+
+def test_estimate_tokens_weights_chinese_above_ascii():
+    assert estimate_tokens("") == 4
+    assert estimate_tokens("白日依山尽") == int(5 * 0.6) + 4
+    assert estimate_tokens("hello world") == int(11 * 0.3) + 4
+    assert estimate_tokens("白日，abc") == int(3 * 0.6 + 3 * 0.3) + 4
+    assert estimate_tokens("床前明月光" * 10) > estimate_tokens("abcde" * 10)
+
+def test_messages_start_with_the_fixed_prefix():
+    conversation = Conversation("系统提示", "首个提示", token_budget=1000)
+    assert conversation.messages() == [
+        {"role": "system", "content": "系统提示"},
+        {"role": "user", "content": "首个提示"},
+    ]
+    conversation.add_turn("回答一", "纠正一")
+    messages = conversation.messages()
+    assert messages[:2] == [{"role": "system", "content": "系统提示"}, {"role": "user", "content": "首个提示"}]
+    assert [m["content"] for m in messages[2:]] == ["回答一", "纠正一"]
+    assert [m["role"] for m in messages[2:]] == ["assistant", "user"]
+
+def test_oldest_turns_are_dropped_at_the_budget():
+    prefix_tokens = estimate_tokens("系统提示") + estimate_tokens("首个提示")
+    turn_tokens = estimate_tokens("回答一") + estimate_tokens("纠正一")
+    conversation = Conversation("系统提示", "首个提示", token_budget=prefix_tokens + 2 * turn_tokens)
+    for n in "一二三":
+        conversation.add_turn("回答" + n, "纠正" + n)
+    contents = [m["content"] for m in conversation.messages()]
+    assert contents == ["系统提示", "首个提示", "回答二", "纠正二", "回答三", "纠正三"]
+    assert sum(estimate_tokens(c) for c in contents) <= conversation.token_budget
+
+def test_latest_turn_is_kept_even_over_budget():
+    conversation = Conversation("系统提示" * 20, "首个提示", token_budget=10)
+    conversation.add_turn("回答一", "纠正一")
+    conversation.add_turn("回答二", "纠正二")
+    contents = [m["content"] for m in conversation.messages()]
+    assert contents[2:] == ["回答二", "纠正二"]
+
+def test_prompt_stats_summarizes_by_kind_and_attempt():
+    stats = PromptStats(maxlen=10)
+    messages = [{"role": "user", "content": "白日依山尽"}]
+    stats.record("response", 1, messages, 0.2, {"prompt_tokens": 12, "prompt_cache_hit_tokens": 8})
+    stats.record("response", 1, messages, 0.4, None)
+    record = stats.record("response", 2, messages + messages, 0.1, None)
+    assert record["estimated_tokens"] == 2 * estimate_tokens("白日依山尽")
+    summary = stats.summary()
+    assert summary["response#1"] == {"count": 2, "avg_estimated_tokens": float(estimate_tokens("白日依山尽")), "avg_latency": 0.3}
+    assert summary["response#2"]["count"] == 1
+    assert stats.recent(1)[0]["attempt"] == 2
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine, func, case, desc, text
+from sqlalchemy.orm import Session
+
+from app.models import Base, User, Battle, Season, Poetry
+from scripts.migrate import migrate, HOT_QUERY_INDEXES
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    # 模拟旧库：删除模型声明的复合索引，再由迁移脚本补建
+    for model, names in HOT_QUERY_INDEXES.items():
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.drop(bind=engine)
+    migrate(bind=engine)
+    with Session(engine) as session:
+        yield session
+
+def explain(db: Session, query) -> str:
+    """返回 SQLite EXPLAIN QUERY PLAN 的文本结果"""
+    statement = query.statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+def test_active_battle_uses_index(db):
+    plan = explain(db, db.query(Battle).filter(Battle.user_id == 1, Battle.status == "active"))
+    assert "ix_battles_user_status" in plan
+
+def test_rankings_by_season_uses_covering_index(db):
+    query = db.query(
+        User.id,
+        func.sum(Battle.score).label("score"),
+        func.count(Battle.id).label("totalBattles"),
+        func.sum(case((Battle.status == "win", 1), else_=0)).label("winCount"),
+    ).join(Battle, User.id == Battle.user_id).filter(Battle.season_id == 1).group_by(User.id).order_by(desc("score"))
+    plan = explain(db, query)
+    assert "COVERING INDEX ix_battles_season_user" in plan
+
+def test_active_season_uses_index_without_sort(db):
+    plan = explain(db, db.query(Season).filter(Season.status == "active").order_by(Season.id.desc()).limit(1))
+    assert "ix_seasons_status_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_username_lookup_uses_index(db):
+    plan = explain(db, db.query(User).filter(User.username == "y123"))
+    assert "USING INDEX" in plan
+
+@pytest.mark.parametrize("filters", [
+    {"dynasty": "唐"},
+    {"type": "诗"},
+    {"dynasty": "唐", "type": "诗"},
+])
+def test_poetry_filters_use_index(db, filters):
+    plan = explain(db, db.query(Poetry).filter_by(**filters))
+    assert "USING INDEX ix_poetry_" in plan
+
+def test_spider_dedup_uses_index(db):
+    plan = explain(db, db.query(Poetry).filter_by(title="静夜思", author="李白"))
+    assert "ix_poetry_title_author" in plan
+
+def test_difficulty_buckets_use_index_without_sort(db):
+    plan = explain(db, db.query(Poetry.id, Poetry.difficulty_score).order_by(Poetry.difficulty_score, Poetry.id))
+    assert "ix_poetry_difficulty_score" in plan
+    assert "TEMP B-TREE" not in plan
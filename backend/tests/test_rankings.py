@@ -0,0 +1,55 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app.main 在导入时连接数据库并初始化数据，在子进程中以临时 SQLite 库导入，不影响其他测试
+RANKINGS_SCRIPT = """
+import asyncio
+from collections import namedtuple
+from decimal import Decimal
+
+from app.main import get_rankings
+
+Row = namedtuple("Row", "id username nickname avatar score totalBattles winCount loseCount")
+
+class FakeQuery:
+    # 模拟 MySQL(pymysql) 的结果：SUM 为 Decimal
+    rows = [Row(1, "libai", "李白", None, Decimal("120"), 3, Decimal("2"), Decimal("1")),
+            Row(2, "dufu", None, None, None, 0, None, None)]
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def count(self):
+        return len(self.rows)
+
+    def all(self):
+        return self.rows
+
+class FakeSession:
+    def query(self, *columns):
+        return FakeQuery()
+
+response = asyncio.run(get_rankings(season=None, page=1, pageSize=10, db=FakeSession()))
+print(response.status_code)
+print(response.body.decode("utf-8"))
+"""
+
+def test_rankings_serialize_decimal_sums(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'rankings.db'}", LOG_LEVEL="WARNING")
+    completed = subprocess.run([sys.executable, "-c", RANKINGS_SCRIPT], cwd=BACKEND_DIR, env=env,
+                               capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    status_line, body = completed.stdout.strip().splitlines()[-2:]
+    assert status_line == "200"
+    data = json.loads(body)
+    assert data["success"] and data["total"] == 2
+    first, second = data["rankings"]
+    assert first["score"] == 120 and first["winCount"] == 2 and first["loseCount"] == 1
+    assert first["winRate"] == 66.67
+    assert second["score"] == 0 and second["winRate"] == 0
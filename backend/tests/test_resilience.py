@@ -0,0 +1,143 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+import pytest
+
+from app.llm.resilience import CircuitBreaker, TokenBucket, UpstreamGuard, UpstreamUnavailable
+
+def _guard(**kwargs) -> UpstreamGuard:
+    options = dict(max_concurrency=2, queue_timeout=1.0, rate=100.0, burst=100,
+                   breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30.0))
+    options.update(kwargs)
+    return UpstreamGuard(**options)
+
+def _fail():
+    raise ConnectionError("upstream down")
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_success()  # 成功后重新计数
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_guard_rejects_while_breaker_is_open():
+    guard = _guard()
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            guard.call(_fail)
+    with pytest.raises(UpstreamUnavailable):
+        guard.call(lambda: "ok")
+    metrics = guard.metrics()
+    assert metrics["breaker_state"] == CircuitBreaker.OPEN
+    assert metrics["rejected_open"] == 1
+    assert metrics["in_flight"] == 0
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # 试探请求进行中，其余请求仍被拒绝
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_cancel_returns_the_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.cancel()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+def test_bucket_times_out_when_empty():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    started_at = time.monotonic()
+    assert not bucket.acquire(timeout=0.1)
+    assert time.monotonic() - started_at < 0.5  # 等不到令牌时立即返回，不会睡满补充间隔
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(rate=50.0, burst=1)
+    assert bucket.try_acquire()
+    started_at = time.monotonic()
+    assert bucket.acquire(timeout=1.0)
+    assert time.monotonic() - started_at >= 0.01
+
+def test_guard_rate_limit_rejection_cancels_the_trial():
+    guard = _guard(rate=0.01, burst=1, queue_timeout=0.05,
+                   breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    assert guard.call(lambda: "ok") == "ok"
+    guard.breaker.record_failure()
+    time.sleep(0.06)
+    with pytest.raises(UpstreamUnavailable):
+        guard.call(lambda: "ok")
+    assert guard.metrics()["rejected_rate"] == 1
+    assert guard.breaker.allow()  # 被限流的请求没有真正试探上游，名额已归还
+
+def test_queue_timeout_raises_upstream_unavailable():
+    guard = _guard(max_concurrency=1, queue_timeout=0.05)
+    release = threading.Event()
+    holder = threading.Thread(target=guard.call, args=(lambda: release.wait(2),))
+    holder.start()
+    while guard.metrics()["in_flight"] == 0:
+        time.sleep(0.005)
+    try:
+        with pytest.raises(UpstreamUnavailable):
+            guard.call(lambda: "ok")
+        assert guard.metrics()["rejected_busy"] == 1
+        assert guard.metrics()["queued"] == 0
+    finally:
+        release.set()
+        holder.join()
+    assert guard.call(lambda: "ok") == "ok"
+
+def test_hedged_requests_never_exceed_max_concurrency():
+    guard = _guard(max_concurrency=2, hedge_enabled=True, hedge_min_delay=0.02, queue_timeout=0.05)
+    lock = threading.Lock()
+    running = [0, 0]  # 当前并发数、峰值
+
+    def slow():
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return "ok"
+
+    assert guard.call(slow) == "ok"
+    assert guard.metrics()["hedges"] == 1
+    # 落败的请求仍在运行并占着名额，新请求只能占用剩下的一个，且没有名额再对冲
+    assert guard.call(slow) == "ok"
+    assert running[1] <= 2
+    time.sleep(0.15)
+    assert guard.metrics()["in_flight"] == 0
+    assert guard.metrics()["hedges"] <= 2
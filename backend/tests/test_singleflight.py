@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+import pytest
+
+from app.llm.singleflight import SingleFlight
+
+def _run_concurrently(flight, key, fn, count):
+    """启动 count 个线程同时调用 flight.do，返回 (结果列表, 异常列表)"""
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            value = flight.do(key, fn)
+            with lock:
+                results.append(value)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def _wait_for_followers(flight, key, followers, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while flight.stats().get(key, {}).get("max_fanout", 0) < followers + 1:
+        assert time.monotonic() < deadline, "followers did not join the in-flight call"
+        time.sleep(0.005)
+
+def test_concurrent_callers_share_the_leader_result():
+    flight = SingleFlight("test", max_wait=5)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return "白日依山尽"
+
+    threads, results, errors = _run_concurrently(flight, "尽", fn, 4)
+    _wait_for_followers(flight, "尽", 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["白日依山尽"] * 4
+    assert not errors
+    assert len(calls) == 1
+    assert flight.stats()["尽"] == {"leaders": 1, "shared": 3, "timeouts": 0, "max_fanout": 4}
+    assert flight.in_flight() == 0
+
+def test_leader_exception_is_raised_to_followers():
+    flight = SingleFlight("test", max_wait=5)
+    release = threading.Event()
+
+    def fn():
+        release.wait(2)
+        raise ValueError("upstream failed")
+
+    threads, results, errors = _run_concurrently(flight, "流", fn, 3)
+    _wait_for_followers(flight, "流", 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert len(errors) == 3 and all(isinstance(e, ValueError) for e in errors)
+    assert flight.stats()["流"]["shared"] == 2
+    # 失败的调用结束后不再占用 key，下一次调用重新请求上游
+    assert flight.do("流", lambda: "黄河入海流") == "黄河入海流"
+    assert flight.stats()["流"]["leaders"] == 2
+
+def test_follower_calls_upstream_itself_after_max_wait():
+    flight = SingleFlight("test", max_wait=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("目", lambda: release.wait(2) and "leader"))
+    leader.start()
+    while not flight.in_flight():
+        time.sleep(0.005)
+
+    started_at = time.monotonic()
+    assert flight.do("目", lambda: "follower") == "follower"
+    assert time.monotonic() - started_at < 1
+    release.set()
+    leader.join()
+    stats = flight.stats()["目"]
+    assert stats["timeouts"] == 1
+    assert stats["shared"] == 0
+    assert stats["leaders"] == 1
+
+def test_sequential_calls_and_keys_are_counted_separately():
+    flight = SingleFlight("test", max_wait=1)
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("a", lambda: 2) == 2
+    assert flight.do("b", lambda: 3) == 3
+    stats = flight.stats()
+    assert stats["a"] == {"leaders": 2, "shared": 0, "timeouts": 0, "max_fanout": 0}
+    assert stats["b"]["leaders"] == 1
+    # 返回的是快照，修改它不影响内部计数
+    stats["a"]["leaders"] = 100
+    assert flight.stats()["a"]["leaders"] == 2
+
+def test_arguments_are_passed_to_the_function():
+    flight = SingleFlight("test", max_wait=1)
+    assert flight.do("k", lambda a, b=0: a + b, 1, b=2) == 3
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"])
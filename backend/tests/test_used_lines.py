@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.models import Base, Battle
+from app.services.used_lines import UsedLines, line_hash, used_lines_of
+from scripts.migrate import migrate
+
+def test_line_hash_uses_the_canonical_form():
+    assert line_hash("床前明月光") == line_hash("牀前明月光。")
+    assert line_hash("床前明月光") != line_hash("疑是地上霜")
+    assert 0 <= line_hash("床前明月光") < 2 ** 48
+
+def test_used_lines_add_and_contains():
+    used = UsedLines()
+    used.add("好的，请看：举头望明月")
+    used.add("舉頭望明月")  # 同一句，不重复记录
+    used.add(None)
+    used.add("。")
+    assert "举头望明月" in used
+    assert "低头思故乡" not in used
+    assert "" not in used
+    assert len(used) == 1 and len(used.hashes) == 1
+
+def test_used_lines_of_shares_the_json_list_with_the_battle():
+    battle = Battle(battle_type="smart_chain", used_lines=[line_hash("床前明月光")])
+    used = used_lines_of(battle)
+    assert "床前明月光" in used
+    assert used_lines_of(battle) is used  # 同一实例只解析一次
+    used.add("疑是地上霜")
+    assert battle.used_lines == [line_hash("床前明月光"), line_hash("疑是地上霜")]
+    # 列被整体替换（如 refresh 后）时重新解析
+    battle.used_lines = []
+    assert "床前明月光" not in used_lines_of(battle)
+
+def test_migration_adds_column_and_backfills_active_battles():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # 模拟旧库：没有 used_lines 列
+        conn.execute(text("ALTER TABLE battles DROP COLUMN used_lines"))
+        conn.execute(text(
+            "INSERT INTO battles (id, user_id, season_id, battle_type, status, current_question, battle_records) VALUES "
+            "(1, 1, 1, 'smart_chain', 'active', '低头思故乡', :records), "
+            "(2, 1, 1, 'smart_chain', 'completed_lose', NULL, :records)"
+        ), {"records": '[{"round_num": 1, "question": "床前明月光", "user_answer": "光阴似箭", "is_correct": false}, '
+                       '{"round_num": 2, "question": "举头望明月", "user_answer": "月落乌啼霜满天", "is_correct": true}]'})
+    migrate(bind=engine)
+    assert "used_lines" in {column["name"] for column in inspect(engine).get_columns("battles")}
+    with Session(engine) as session:
+        active = used_lines_of(session.get(Battle, 1))
+        assert all(line in active for line in ["床前明月光", "举头望明月", "月落乌啼霜满天", "低头思故乡"])
+        assert "光阴似箭" not in active  # 答错的诗句不算用过
+        assert session.get(Battle, 2).used_lines is None
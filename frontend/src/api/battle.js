@@ -43,6 +43,41 @@ export function submitBattleAnswer(battleId, answer) {
   })
 }
 
+// Opens the WebSocket channel for an ongoing battle.
+// Authenticates once on open; afterwards send {type: 'submit', answer} / {type: 'abort'}
+// and receive judgement, token and round (per-round delta) messages via onMessage.
+export function openBattleSocket(battleId, onMessage) {
+  const token = localStorage.getItem('token')
+  const socket = new WebSocket(`ws://localhost:8000/api/v1/battles/${battleId}/ws`)
+  socket.onopen = () => socket.send(JSON.stringify({ type: 'auth', token }))
+  socket.onmessage = event => onMessage(JSON.parse(event.data))
+  return {
+    submit: answer => socket.send(JSON.stringify({ type: 'submit', answer })),
+    abort: () => socket.send(JSON.stringify({ type: 'abort' })),
+    close: () => socket.close(),
+    socket
+  }
+}
+
+// Submits an answer and receives only this round's delta
+// (round record, score, status, next question); fetch the full state with getBattle()
+export function submitBattleAnswerCompact(battleId, answer) {
+  return request({
+    url: `/api/v1/battles/${battleId}/submit`,
+    method: 'post',
+    params: { compact: true },
+    data: { answer: answer }
+  })
+}
+
+// Full battle state including all round records (served with an ETag)
+export function getBattle(battleId) {
+  return request({
+    url: `/api/v1/battles/${battleId}`,
+    method: 'get'
+  })
+}
+
 // General update for a battle (if still needed, distinct from submitting an answer)
 export function updateBattle(battleId, data) {
   return request({
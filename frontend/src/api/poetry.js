@@ -62,6 +62,11 @@ export const getPoetryDetail = (id) => {
   return api.get(`/${id}`);
 };
 
+// 获取诗词总数及按朝代、体裁的诗词数
+export const getPoetryFacets = () => {
+  return api.get('/facets');
+};
+
 // Removed getFavorites and toggleFavorite functions
 // // 获取收藏列表
 // export const getFavorites = () => {